@@ -0,0 +1,142 @@
+"""
+자동 분석 깊이 (컨텍스트 청크 수 자동 결정)
+- 점수 하락: 검색 점수가 최고점 대비 크게 떨어지거나 바로 앞 청크보다 급격히 떨어지면 거기서 멈춤
+- 지연 목표: 최근 모델 응답 시간으로 "청크 수 → 응답 시간" 을 추정해 p95 목표를 넘지 않는 청크 수로 제한
+- 요청마다 고른 깊이와 이유를 기록 (답변 메타 정보/사이드바 표시)
+"""
+import os
+import threading
+import time
+from collections import deque
+
+# 응답 시간 p95 목표 (초)
+DEFAULT_TARGET_P95 = float(os.environ.get("NOTEBOOK_AI_TARGET_P95", "12"))
+
+# 응답 시간 추정에 쓰는 최근 요청 수 / 추정을 시작하는 최소 요청 수
+LATENCY_WINDOW = 50
+MIN_OBSERVATIONS = 5
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+class LatencyTracker:
+    """
+    최근 모델 응답 시간 기록 (앱 전체 공유, 스레드 안전)
+    - observe(청크 수, 초) 로 기록
+    - budget(target): p95 가 target 을 넘지 않을 것으로 보이는 최대 청크 수 (기록이 부족하면 None)
+    """
+
+    def __init__(self, window=LATENCY_WINDOW, min_observations=MIN_OBSERVATIONS):
+        self.min_observations = min_observations
+        self._samples = deque(maxlen=window)   # (청크 수, 초)
+        self._lock = threading.Lock()
+
+    def observe(self, chunks, seconds):
+        with self._lock:
+            self._samples.append((chunks, seconds))
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def p95(self):
+        return percentile([seconds for _, seconds in self.samples()], 0.95)
+
+    def budget(self, target):
+        """
+        p95 목표 안의 최대 청크 수
+        - 청크 수가 두 가지 이상이면 초 = a + b × 청크 수 를 최소제곱으로 맞추고
+          잔차의 p95 를 여유로 더해 목표 안에 드는 청크 수를 구함
+        - 청크 수가 한 가지뿐이면 응답 시간이 청크 수에 비례한다고 보고 p95 비율로 줄임
+        """
+        import numpy as np  # 자동 깊이를 쓸 때만 필요 (앱 첫 화면에서 불러오지 않음)
+
+        samples = self.samples()
+        if len(samples) < self.min_observations:
+            return None
+        chunks = np.array([c for c, _ in samples], dtype=np.float64)
+        seconds = np.array([s for _, s in samples], dtype=np.float64)
+        if np.unique(chunks).size >= 2:
+            slope, intercept = np.polyfit(chunks, seconds, 1)
+            if slope > 0:
+                margin = percentile((seconds - (intercept + slope * chunks)).tolist(), 0.95)
+                return int((target - intercept - max(margin, 0.0)) // slope)
+        p95 = percentile(seconds.tolist(), 0.95)
+        if p95 <= target:
+            return None
+        return int(float(np.median(chunks)) * target / p95)
+
+
+class DepthController:
+    """
+    요청별 컨텍스트 청크 수 결정
+    - choose(점수 목록): 점수 하락 지점과 지연 예산 중 작은 쪽 (min_chunks 이상, max_chunks 이하)
+    - observe(): 답변 생성 후 실제 응답 시간 기록
+    - decisions(): 최근 결정 기록
+    """
+
+    def __init__(self, tracker, target_p95=DEFAULT_TARGET_P95, min_chunks=4, max_chunks=25,
+                 score_floor=0.25, cliff_ratio=0.5, history=100):
+        self.tracker = tracker
+        self.target_p95 = target_p95
+        self.min_chunks = min_chunks
+        self.max_chunks = max_chunks
+        self.score_floor = score_floor
+        self.cliff_ratio = cliff_ratio
+        self._decisions = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def score_cut(self, scores):
+        """
+        점수 하락 지점 (여기까지의 청크만 사용)
+        - 최고점의 score_floor 배 미만이거나 바로 앞 점수의 cliff_ratio 배 미만이면 멈춤
+        """
+        if not scores or scores[0] <= 0:
+            return len(scores)
+        for i in range(1, len(scores)):
+            if i < self.min_chunks:
+                continue
+            if scores[i] < scores[0] * self.score_floor or scores[i] < scores[i - 1] * self.cliff_ratio:
+                return i
+        return len(scores)
+
+    def choose(self, scores, label=""):
+        """
+        scores(내림차순 검색 점수) → 결정 {"chunks", "candidates", "score_cut", "budget", "reason", ...}
+        - reason: "점수 하락" / "지연 목표" / "최대 깊이" / "후보 전체"
+        """
+        cut = self.score_cut(scores)
+        budget = self.tracker.budget(self.target_p95)
+        limit = self.max_chunks if budget is None else max(self.min_chunks, min(self.max_chunks, budget))
+        chunks = min(cut, limit, len(scores))
+        if chunks < cut:
+            reason = "지연 목표" if limit < self.max_chunks else "최대 깊이"
+        elif cut < len(scores):
+            reason = "점수 하락"
+        else:
+            reason = "최대 깊이" if chunks >= self.max_chunks else "후보 전체"
+        decision = {
+            "chunks": chunks,
+            "candidates": len(scores),
+            "score_cut": cut,
+            "budget": budget,
+            "target_p95": self.target_p95,
+            "reason": reason,
+            "label": label,
+            "time": time.time(),
+        }
+        with self._lock:
+            self._decisions.append(decision)
+        return decision
+
+    def observe(self, decision, seconds):
+        """결정한 깊이로 답변을 만드는 데 걸린 시간 기록"""
+        decision["seconds"] = seconds
+        self.tracker.observe(decision["chunks"], seconds)
+
+    def decisions(self):
+        with self._lock:
+            return list(self._decisions)
@@ -1,11 +1,62 @@
 import streamlit as st
-import google.generativeai as genai
-import PyPDF2
 import os
 import time
-import pandas as pd
 from datetime import datetime
 import json
+import uuid
+from collections import deque
+
+from model_clients import ModelClients
+from notebook_core import (
+    get_adaptive_context, get_fts_store, get_retrieval_client, read_document, retrieve_context
+)
+from conversation_memory import ConversationMemory
+from speculative import SpeculativePrecomputer, TokenBucket
+from llm_executor import LLMExecutor, RequestCancelled, wait_future
+from adaptive_depth import DEFAULT_TARGET_P95, DepthController, LatencyTracker
+from hedged_requests import HEDGE_BY_DEFAULT, HEDGE_MAX_RATE, HedgePolicy
+from profiling import PROFILE_BY_DEFAULT, profile_request
+from pdf_extraction import ENGINE_LABELS, available_engines
+from upload_ingest import from_uploaded_file
+
+# 답변 생성 모델 (앞에서부터 시도, 실패하면 다음 모델)
+CANDIDATE_MODELS = [
+    "gemini-2.0-flash-exp",      # 최신 모델 우선
+    "gemini-1.5-flash",
+    "gemini-1.5-flash-001",
+    "gemini-flash-latest"
+]
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+# 프롬프트에 넣는 대화 메모리 토큰 한도
+MEMORY_TOKEN_CAP = 600
+
+# 화면에 바로 그리는 최근 메시지 수 / '이전 대화 더 보기' 한 번에 펼치는 메시지 수
+RECENT_MESSAGES = 12
+HISTORY_PAGE = 12
+
+# 접힌 대화 목록의 한 줄 요약 길이
+PREVIEW_CHARS = 60
+
+# Gemini 분당 요청 한도 (백그라운드 미리 계산은 이 중 여유분만 사용)
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", "15"))
+
+# LLM 작업자 수 (앱 전체) / 세션당 동시 실행 한도
+LLM_MAX_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", "8"))
+LLM_MAX_PER_SESSION = 2
+
+# 환영 메시지의 추천 질문 (업로드 직후 백그라운드에서 미리 답변 준비)
+SUGGESTED_QUESTIONS = [
+    "각 보험사의 암 진단금과 수술비를 비교해줘",
+    "특약 내용의 차이점을 표로 보여줘",
+    "보장 제외 항목은 뭐가 있어?"
+]
 
 # ==========================================
 # 페이지 설정
@@ -67,133 +118,105 @@ st.markdown('<div class="subtitle">여러 보험사의 약관을 한 번에 비
 # ==========================================
 @st.cache_resource
 def configure_api():
-    """API 키 설정 (캐싱으로 성능 향상)"""
+    """
+    API 키 확인 + Gemini 클라이언트 예열 시작 (프로세스당 한 번)
+    - google.generativeai 로드/모델 생성/연결은 백그라운드 스레드에서 (첫 화면 표시를 막지 않음)
+    - 반환: ModelClients (키가 없거나 오류면 None)
+    """
     try:
         if "GEMINI_API_KEY" in st.secrets:
-            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-            return True
+            return ModelClients(st.secrets["GEMINI_API_KEY"], CANDIDATE_MODELS, GENERATION_CONFIG).start()
         else:
             st.error("🔑 Secrets에 GEMINI_API_KEY가 설정되지 않았습니다.")
             st.info("💡 Streamlit Cloud에서 Settings > Secrets에 API 키를 추가하세요.")
-            return False
+            return None
     except Exception as e:
         st.error(f"❌ API 키 설정 오류: {str(e)}")
-        return False
+        return None
 
-if not configure_api():
+model_clients = configure_api()
+if model_clients is None:
     st.stop()
 
 # ==========================================
 # 유틸리티 함수들
 # ==========================================
 
-@st.cache_data(show_spinner=False)
-def extract_text_from_pdf(file_bytes, filename):
-    """PDF에서 텍스트 추출 (캐싱 적용)"""
-    try:
-        from io import BytesIO
-        pdf_file = BytesIO(file_bytes)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        text = ""
-        total_pages = len(pdf_reader.pages)
-        
-        for i, page in enumerate(pdf_reader.pages):
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-        
-        return text, total_pages, None
-    except Exception as e:
-        return "", 0, str(e)
-
-def get_smart_context(full_text, query, max_chunks=15):
+def answer_question(corpus, question, search_query, file_names, max_chunks,
+                    retrieval_mode, synonyms, history="", cancel_event=None, locate=None, depth=None,
+                    snippet_padding=None, hedge=None):
     """
-    스마트 컨텍스트 검색 (개선된 버전)
-    - 키워드 매칭 강화
-    - TF-IDF 스타일 스코어링
+    검색 → 프롬프트 생성 → AI 응답
+    - Streamlit 호출이 없어 작업자 스레드/백그라운드 미리 계산에서도 사용
+    - depth(DepthController) 가 있으면 자동 분석 깊이 (max_chunks 대신), 응답 시간을 기록
+    - snippet_padding 이 있으면 청크 전체 대신 적중 문장 구간만 프롬프트에 넣음
+    - hedge(HedgePolicy) 가 있으면 첫 토큰이 늦을 때 다음 후보 모델에도 보내는 헤지 요청
+    - 관련 내용이 없으면 None
     """
-    if not full_text or not query:
-        return ""
-    
-    chunk_size = 2500  # 더 큰 청크로 컨텍스트 향상
-    overlap = 500  # 중복 영역 추가
-    
-    chunks = []
-    for i in range(0, len(full_text), chunk_size - overlap):
-        chunk = full_text[i:i+chunk_size]
-        if chunk.strip():
-            chunks.append(chunk)
-    
-    # 검색어 전처리
-    query_keywords = [word.lower() for word in query.split() if len(word) > 1]
-    
-    scored_chunks = []
-    for chunk in chunks:
-        chunk_lower = chunk.lower()
-        score = 0
-        
-        # 키워드별 가중치 부여
-        for keyword in query_keywords:
-            count = chunk_lower.count(keyword)
-            # 빈도가 높을수록 높은 점수
-            score += count * (1 + len(keyword) / 10)
-        
-        if score > 0:
-            scored_chunks.append((score, chunk))
-    
-    # 점수순 정렬
-    scored_chunks.sort(key=lambda x: x[0], reverse=True)
-    
-    # 상위 청크 선택
-    top_chunks = [chunk for score, chunk in scored_chunks[:max_chunks]]
-    
-    return "\n\n━━━━━━━━━━━━━━━━━━\n\n".join(top_chunks)
-
-def generate_ai_response(prompt, temperature=0.3):
-    """
-    AI 응답 생성 (폴백 모델 지원)
-    """
-    candidate_models = [
-        "gemini-2.0-flash-exp",      # 최신 모델 우선
-        "gemini-1.5-flash",          
-        "gemini-1.5-flash-001",      
-        "gemini-flash-latest"        
-    ]
-    
-    generation_config = {
-        "temperature": temperature,
-        "top_p": 0.95,
-        "top_k": 40,
-        "max_output_tokens": 8192,
+    decision = None
+    if depth is not None:
+        relevant_context, span_ids, decision = get_adaptive_context(
+            corpus, search_query, depth, retrieval_mode, synonyms, locate=locate, snippet_padding=snippet_padding
+        )
+    else:
+        relevant_context, span_ids = retrieve_context(
+            corpus, search_query, max_chunks, retrieval_mode, synonyms, locate=locate, snippet_padding=snippet_padding
+        )
+    if not relevant_context.strip():
+        return None
+    if cancel_event is not None and cancel_event.is_set():
+        raise RequestCancelled()
+
+    analysis_prompt = create_comparison_prompt(relevant_context, question, file_names, history=history)
+
+    start_time = time.time()
+    response_text, model_used = model_clients.generate(analysis_prompt, cancel_event=cancel_event, hedge=hedge)
+    elapsed_time = time.time() - start_time
+    if decision is not None:
+        depth.observe(decision, elapsed_time)
+    return {
+        "response_text": response_text,
+        "model_used": model_used,
+        "span_ids": span_ids,
+        "elapsed_time": elapsed_time,
+        "depth": decision
     }
-    
-    last_error = None
-    for model_name in candidate_models:
-        try:
-            model = genai.GenerativeModel(
-                model_name=model_name,
-                generation_config=generation_config
-            )
-            response = model.generate_content(prompt)
-            
-            # 안전 필터 체크
-            if hasattr(response, 'prompt_feedback'):
-                if response.prompt_feedback.block_reason:
-                    continue
-            
-            return response.text, model_name
-            
-        except Exception as e:
-            last_error = e
-            continue
-    
-    raise Exception(f"모든 모델 시도 실패. 마지막 오류: {str(last_error)}")
 
-def create_comparison_prompt(context, question, file_names):
+@st.cache_resource
+def get_rate_limiter():
+    """앱 전체 공유 레이트 리미터"""
+    return TokenBucket(GEMINI_RPM)
+
+@st.cache_resource
+def get_latency_tracker():
+    """최근 모델 응답 시간 (앱 전체 공유, 자동 분석 깊이의 지연 예산 계산용)"""
+    return LatencyTracker()
+
+@st.cache_resource
+def get_precomputer():
+    """추천 질문 미리 계산 작업자 (앱 전체 공유)"""
+    return SpeculativePrecomputer(get_rate_limiter(), reserve_ratio=0.5, max_per_hour=30)
+
+@st.cache_resource
+def get_llm_executor():
+    """채팅 질문 처리 작업자 풀 (앱 전체 공유)"""
+    return LLMExecutor(max_workers=LLM_MAX_WORKERS, max_per_session=LLM_MAX_PER_SESSION)
+
+@st.cache_resource
+def get_hedge_policy():
+    """헤지 요청 판단/기록 (앱 전체 공유, 헤지 요청도 레이트 리미터에서 차감)"""
+    return HedgePolicy(get_rate_limiter())
+
+def create_comparison_prompt(context, question, file_names, history=""):
     """
     비교 분석을 위한 최적화된 프롬프트 생성
+    - history: 대화 메모리 블록 (후속 질문 해석용, 토큰 한도 적용됨)
     """
+    history_section = f"""
+🗂️ **이전 대화 요약** (후속 질문은 이 맥락을 이어서 해석)
+{history}
+""" if history else ""
+
     prompt = f"""
 당신은 **보험 약관 분석 전문가**입니다.
 
@@ -202,7 +225,7 @@ def create_comparison_prompt(context, question, file_names):
 
 📚 **제공된 약관 내용**
 {context}
-
+{history_section}
 ❓ **사용자 질문**
 {question}
 
@@ -220,6 +243,7 @@ def create_comparison_prompt(context, question, file_names):
 3. **정확성 우선**
    - 약관에 없는 내용은 절대 지어내지 말 것
    - 불명확한 부분은 "약관에 명시 안 됨" 표기
+   - 머리말에 "공통 조항 동일"로 표시된 파일은 그 구간의 공통 조항을 같은 내용으로 가지고 있음
 
 4. **추가 분석**
    - 표 아래에 핵심 인사이트 3가지 요약
@@ -259,7 +283,7 @@ with st.sidebar:
         # 파일 정보 표시
         with st.expander("📄 업로드된 파일 목록", expanded=True):
             for idx, file in enumerate(uploaded_files, 1):
-                file_size = len(file.getvalue()) / 1024  # KB
+                file_size = file.size / 1024  # KB (내용을 복사하지 않고 업로드 정보에서)
                 st.write(f"{idx}. **{file.name}** ({file_size:.1f} KB)")
     
     st.divider()
@@ -268,12 +292,109 @@ with st.sidebar:
     st.subheader("⚙️ 분석 옵션")
     analysis_depth = st.select_slider(
         "분석 깊이",
-        options=["빠른 분석", "표준", "상세 분석"],
-        value="표준"
+        options=["자동", "빠른 분석", "표준", "상세 분석"],
+        value="자동",
+        help="자동: 검색 점수가 떨어지는 지점까지만 사용하고, 응답이 느려지면 목표 시간 안으로 줄임"
+    )
+    target_p95 = DEFAULT_TARGET_P95
+    if analysis_depth == "자동":
+        target_p95 = st.slider("🎯 목표 응답 시간 (p95, 초)", 3, 60, int(DEFAULT_TARGET_P95))
+        tracker = get_latency_tracker()
+        if tracker.samples():
+            st.caption(f"최근 응답 p95 {tracker.p95():.1f}초 (요청 {len(tracker.samples())}개)")
+        recent = st.session_state.depth_controller.decisions()[-5:] if "depth_controller" in st.session_state else []
+        if recent:
+            with st.expander("📏 최근 자동 깊이"):
+                for decision in reversed(recent):
+                    seconds = f", {decision['seconds']:.1f}초" if "seconds" in decision else ""
+                    st.caption(f"청크 {decision['chunks']}/{decision['candidates']}개 · {decision['reason']}{seconds}"
+                               f" — {decision['label'][:30]}")
+    
+    retrieval_mode = st.radio(
+        "🔎 검색 방식",
+        options=["키워드", "하이브리드"],
+        horizontal=True,
+        help="하이브리드: 키워드 매칭 + 의미 유사도 검색 (표현이 다른 약관도 함께 검색)"
+    )
+    
+    use_synonyms = st.checkbox(
+        "🔁 동의어 확장 검색",
+        value=True,
+        help="진단금/진단비, 암/악성신생물처럼 보험사마다 다른 표현도 함께 검색"
+    )
+    
+    use_snippets = st.checkbox(
+        "✂️ 관련 문장만 보내기",
+        value=True,
+        help="청크 전체 대신 검색어가 나온 문장과 앞뒤 문장만 AI 에 보냄 (검색어가 한곳에 모인 청크 우선). "
+             "토큰이 절반 이하로 줄지만, 답의 근거가 검색어 없는 문장에 있으면 놓칠 수 있음 "
+             "(약관 골든셋 상위 10개 재현율 0.94 → 0.91)"
+    )
+    snippet_padding = st.slider("앞뒤로 붙일 문장 수", 0, 3, 1) if use_snippets else None
+    
+    search_store = st.radio(
+        "🗄️ 키워드 검색 저장소",
+        options=["메모리", "SQLite FTS5"],
+        horizontal=True,
+        help="SQLite FTS5: 읽은 약관을 로컬 DB에 저장해 다시 올릴 때 색인을 재사용합니다 (키워드 검색에 적용)"
     )
     
     include_recommendations = st.checkbox("💡 추천 사항 포함", value=True)
     
+    pdf_engine = st.selectbox(
+        "📑 PDF 추출 엔진",
+        options=["auto"] + available_engines(),
+        format_func=lambda name: "자동 (빠른 엔진 우선)" if name == "auto" else ENGINE_LABELS[name],
+        help="새로 올리는 PDF에 적용됩니다. 선택한 엔진이 실패하면 다른 엔진으로 자동 전환합니다."
+    )
+    
+    # 헤지 요청 (세션별 토글, NOTEBOOK_AI_HEDGE=1 이면 기본으로 켜짐)
+    hedging = st.toggle(
+        "⚡ 헤지 요청",
+        value=HEDGE_BY_DEFAULT,
+        help="첫 모델이 평소(최근 첫 토큰 시간 p90)보다 늦으면 다음 후보 모델에도 같은 질문을 보내고 먼저 온 답변을 사용 "
+             f"(최근 요청의 {HEDGE_MAX_RATE:.0%} 이내, 요청이 한 번 더 나가므로 비용이 늘 수 있음)"
+    )
+    if hedging:
+        hedge_stats = get_hedge_policy().stats()
+        if hedge_stats["requests"]:
+            st.caption(
+                f"헤지 {hedge_stats['hedged']}/{hedge_stats['requests']}회 ({hedge_stats['hedge_rate']:.0%}), "
+                f"헤지 모델 승 {hedge_stats['hedge_wins']}회 · 추가 요청 {hedge_stats['extra_calls']}회, "
+                f"토큰 약 {hedge_stats['extra_input_tokens'] + hedge_stats['extra_output_tokens']:,}개"
+            )
+            st.caption(
+                f"응답 p50/p95: 헤지 안 함 {hedge_stats['plain_p50']:.1f}/{hedge_stats['plain_p95']:.1f}초, "
+                f"헤지 {hedge_stats['hedged_p50']:.1f}/{hedge_stats['hedged_p95']:.1f}초"
+            )
+    
+    # 프로파일링 모드 (세션별 토글, NOTEBOOK_AI_PROFILE=1 이면 기본으로 켜짐)
+    if "profiles" not in st.session_state:
+        st.session_state.profiles = deque(maxlen=20)
+    profiling = st.toggle(
+        "🩺 프로파일링 모드",
+        value=PROFILE_BY_DEFAULT,
+        key="debug_mode",
+        help="질문/업로드마다 cProfile 호출 프로파일과 tracemalloc 할당 상위를 기록하고 .prof 파일로 저장 (오류 상세도 표시)"
+    )
+    if profiling and st.session_state.profiles:
+        with st.expander(f"🩺 최근 프로파일 {len(st.session_state.profiles)}개"):
+            for report in reversed(list(st.session_state.profiles)[-5:]):
+                st.markdown(f"**{report.summary()}**")
+                if report.note:
+                    st.caption(report.note)
+                if report.functions:
+                    st.dataframe(report.functions, use_container_width=True, hide_index=True)
+                if report.allocations:
+                    st.dataframe(report.allocations, use_container_width=True, hide_index=True)
+                if report.path and os.path.exists(report.path):
+                    with open(report.path, "rb") as f:
+                        st.download_button(
+                            "⬇️ .prof (snakeviz/tuna/flameprof)", f.read(),
+                            file_name=os.path.basename(report.path), key=f"prof_{report.path}"
+                        )
+                st.caption(f"📁 {report.alloc_path}")
+    
     st.divider()
     
     # 사용 가이드
@@ -328,51 +449,151 @@ if not uploaded_files:
 # 파일 처리 및 분석
 # ==========================================
 
+# NumPy/SciPy 를 쓰는 검색 모듈은 파일이 올라온 뒤에 불러옴 (빈 화면 첫 표시를 가볍게)
+from dense_retrieval import get_default_embedder
+from segmented_corpus import SegmentedCorpus
+from fts_store import FTSView
+from retrieval_client import DocumentsMissing, RetrievalUnavailable
+
 # 진행 상태 표시
 progress_bar = st.progress(0)
 status_text = st.empty()
 
-combined_text = ""
-file_names = []
-file_stats = []
+# 검색 서비스를 쓰면 적재/색인/검색은 서비스가 맡고, 이 복제본은 파일별 통계만 가짐
+retrieval = get_retrieval_client()
+
+# 세션별 증분 코퍼스: 새로 올라온 파일만 읽고 색인, 빠진 파일은 툼스톤 처리
+# (보험사 간 공통 조항은 검색 결과에서 한 부만 남기고 해당 보험사를 함께 표시)
+if "corpus" not in st.session_state:
+    st.session_state.corpus = SegmentedCorpus(chunk_size=2500, overlap=500, dedup=True) if retrieval is None else None
+    st.session_state.file_records = {}
+corpus = st.session_state.corpus
+file_records = st.session_state.file_records
 
-# 파일 읽기
+new_files = [f for f in uploaded_files if f.file_id not in file_records]
+
+# 새 파일 읽기
 status_text.text("📄 파일을 읽는 중...")
-for idx, uploaded_file in enumerate(uploaded_files):
-    progress = (idx + 1) / len(uploaded_files)
+for idx, uploaded_file in enumerate(new_files):
+    progress = (idx + 1) / len(new_files)
     progress_bar.progress(progress)
     
-    file_names.append(uploaded_file.name)
-    content = ""
-    pages = 0
-    error = None
+    # 프로파일링 모드면 파일 하나의 읽기/추출을 측정
+    with profile_request("업로드", uploaded_file.name, profiling, sink=st.session_state.profiles):
+        document = None
+        pages = 0
+        error = None
+        engine_used = "-"
     
-    try:
-        if uploaded_file.name.endswith(".pdf"):
-            file_bytes = uploaded_file.getvalue()
-            content, pages, error = extract_text_from_pdf(file_bytes, uploaded_file.name)
-        else:
-            content = uploaded_file.read().decode("utf-8")
-            pages = len(content.split('\n'))
-        
-        if error:
-            st.warning(f"⚠️ {uploaded_file.name}: {error}")
-        
-        # 파일별 구분자 추가
-        combined_text += f"\n\n{'='*50}\n"
-        combined_text += f"[파일: {uploaded_file.name}]\n"
-        combined_text += f"{'='*50}\n\n"
-        combined_text += content
+        try:
+            # 파일마다 한 번만 읽으며 해시 계산 (업로드 버퍼를 복사하지 않고 추출기/서비스에 넘김)
+            upload = from_uploaded_file(uploaded_file)
+            is_pdf = upload.is_pdf
+            if retrieval is not None:
+                # 같은 내용의 파일을 다른 복제본이 이미 올렸으면 업로드/추출 없이 정보만 받음
+                info = retrieval.ingest(uploaded_file.name, upload, "pdf" if is_pdf else "txt",
+                                        None if pdf_engine == "auto" else pdf_engine)
+                pages, error, engine_used = info["pages"], info["error"], info["engine"]
+                chars, original_chars = info["chars"], info["original_chars"]
+            else:
+                document, pages, error, engine_used = read_document(upload, pdf_engine)
+                chars = len(document.text) if document else 0
+                original_chars = document.stats["original_chars"] if document else 0
         
-        file_stats.append({
-            "파일명": uploaded_file.name,
-            "페이지/줄": pages,
-            "크기": f"{len(uploaded_file.getvalue()) / 1024:.1f} KB",
-            "글자수": len(content)
-        })
+            content = document.text if document else ""
+            file_records[uploaded_file.file_id] = {
+                "name": uploaded_file.name,
+                "key": upload.key,
+                "content": content,
+                "chars": chars,
+                "document": document if is_pdf else None,
+                "error": error,
+                "stats": {
+                    "파일명": uploaded_file.name,
+                    "페이지/줄": pages,
+                    "크기": f"{upload.size / 1024:.1f} KB",
+                    "글자수": chars,
+                    "정리로 줄어든 글자": f"{1 - chars / original_chars:.1%}" if original_chars else "-",
+                    "추출 엔진": engine_used or "-"
+                }
+            }
         
-    except Exception as e:
-        st.error(f"❌ {uploaded_file.name} 처리 실패: {str(e)}")
+        except Exception as e:
+            st.error(f"❌ {uploaded_file.name} 처리 실패: {str(e)}")
+
+# 업로드 목록에서 빠진 파일 기록 정리
+current_ids = {f.file_id for f in uploaded_files}
+for file_id in [fid for fid in file_records if fid not in current_ids]:
+    del file_records[file_id]
+
+records = [file_records[f.file_id] for f in uploaded_files if f.file_id in file_records]
+file_names = [record["name"] for record in records]
+file_stats = [record["stats"] for record in records]
+
+for record in records:
+    if record["error"]:
+        st.warning(f"⚠️ {record['name']}: {record['error']}")
+
+if retrieval is not None:
+    # 서비스가 재시작되어 문서가 없어졌으면 이 세션에 올라온 파일로 다시 적재 (검색 중에도 같은 함수 사용)
+    uploads_by_key = {file_records[f.file_id]["key"]: f for f in uploaded_files if f.file_id in file_records}
+
+    def restore_documents(keys, uploads=uploads_by_key, engine=None if pdf_engine == "auto" else pdf_engine):
+        for key in keys:
+            uploaded_file = uploads.get(key)
+            if uploaded_file is not None:
+                upload = from_uploaded_file(uploaded_file)
+                retrieval.ingest(uploaded_file.name, upload, "pdf" if upload.is_pdf else "txt", engine)
+
+    # 서비스 코퍼스 (같은 파일 목록이면 다른 복제본/세션과 색인 공유, 페이지/공통 조항 정보는 검색 결과에 포함)
+    status_text.text("🗂️ 검색 서비스에서 코퍼스를 여는 중...")
+    try:
+        corpus = retrieval.open_corpus([r["key"] for r in records if r["chars"]],
+                                       chunk_size=2500, overlap=500, dedup=True, restore=restore_documents)
+    except DocumentsMissing as e:
+        # 다시 적재하지 못한 파일은 기록을 지워 다음 실행에서 새로 올림
+        for file_id in [fid for fid, record in file_records.items() if record["key"] in e.keys]:
+            del file_records[file_id]
+        st.error(f"❌ 검색 서비스에 없는 파일이 있습니다. 다시 시도해 주세요: {e}")
+        st.stop()
+    except RetrievalUnavailable as e:
+        st.error(f"❌ 검색 서비스 오류: {e}")
+        st.stop()
+    locate_span = corpus.locate
+    search_corpus = corpus
+else:
+    # 구간 ID(파일 해시 앞 8자리#청크 번호) → 원래 PDF 페이지 범위
+    page_maps = {r["key"][:8]: r["document"] for r in records if r.get("document") is not None}
+
+    def locate_span(span_id, page_maps=page_maps, chunk_size=corpus.chunk_size,
+                    chunk_step=corpus.chunk_size - corpus.overlap):
+        key, _, index = span_id.partition("#")
+        document = page_maps.get(key)
+        if document is None or not index.isdigit():
+            return None
+        start = int(index) * chunk_step
+        return document.page_range(start, start + chunk_size)
+
+    # 코퍼스 동기화 (추가/삭제된 파일만 반영)
+    status_text.text("🗂️ 검색 인덱스를 갱신하는 중...")
+    corpus.sync([(r["key"], r["name"], r["content"]) for r in records if r["content"]])
+
+    # SQLite FTS5 저장소: 처음 보는 파일만 적재 (파일 해시가 같으면 기존 색인 재사용)
+    search_corpus = corpus
+    if search_store == "SQLite FTS5":
+        status_text.text("🗄️ SQLite 검색 저장소에 적재하는 중...")
+        fts_store = get_fts_store()
+        for r in records:
+            if r["content"] and r["key"] not in fts_store:
+                page_spans = r["document"].page_spans() if r.get("document") is not None else None
+                fts_store.add_document(r["key"], r["name"], r["content"], page_spans)
+        if retrieval_mode == "키워드":
+            search_corpus = FTSView(fts_store, [r["key"] for r in records if r["content"]], corpus.shared_files)
+
+    # 하이브리드 검색: 임베딩이 없는 세그먼트만 임베딩/ANN 인덱스 준비
+    if retrieval_mode == "하이브리드":
+        status_text.text("🧠 의미 검색 인덱스를 준비하는 중...")
+        corpus.enable_dense(get_default_embedder() if corpus.embedder is None else corpus.embedder)
 
 progress_bar.empty()
 status_text.empty()
@@ -395,8 +616,46 @@ if file_stats:
     
     # 상세 통계 (접기 가능)
     with st.expander("📊 파일별 상세 정보"):
-        df_stats = pd.DataFrame(file_stats)
-        st.dataframe(df_stats, use_container_width=True)
+        st.dataframe(file_stats, use_container_width=True)
+    
+    # 보험사 간 공통 조항 (검색 시 한 부만 사용)
+    shared_clauses = corpus.shared_clauses()
+    if shared_clauses:
+        with st.expander(f"🔁 공통 조항 {len(shared_clauses)}개 (검색 시 한 부만 사용)"):
+            for title, names in shared_clauses[:30]:
+                st.write(f"- **{title}** — {', '.join(names)}")
+
+# 분석 깊이에 따른 청크 수 조정
+chunk_map = {
+    "빠른 분석": 8,
+    "표준": 15,
+    "상세 분석": 25
+}
+max_chunks = chunk_map.get(analysis_depth, 15)
+
+# 자동 분석 깊이 (수동 설정을 고르면 위 청크 수를 그대로 사용)
+depth = None
+if analysis_depth == "자동":
+    if "depth_controller" not in st.session_state:
+        st.session_state.depth_controller = DepthController(get_latency_tracker())
+    depth = st.session_state.depth_controller
+    depth.target_p95 = target_p95
+
+# 추천 질문 미리 계산 (같은 파일/설정이면 세션 간 결과 공유)
+precomputer = get_precomputer()
+depth_signature = ("자동", target_p95) if depth is not None else max_chunks
+spec_signature = (tuple(corpus.document_keys()), depth_signature, retrieval_mode, use_synonyms, search_store,
+                  snippet_padding)
+if file_stats:
+    precompute_depth = DepthController(get_latency_tracker(), target_p95) if depth is not None else None
+    precomputer.schedule(
+        spec_signature,
+        SUGGESTED_QUESTIONS,
+        lambda q: answer_question(
+            search_corpus, q, q, file_names, max_chunks, retrieval_mode, use_synonyms, locate=locate_span,
+            depth=precompute_depth, snippet_padding=snippet_padding
+        )
+    )
 
 st.divider()
 
@@ -405,6 +664,13 @@ st.divider()
 # ==========================================
 
 # 세션 상태 초기화
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory(max_tokens=MEMORY_TOKEN_CAP)
+memory = st.session_state.memory
+executor = get_llm_executor()
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
     
@@ -417,95 +683,227 @@ if "messages" not in st.session_state:
 궁금하신 내용을 자유롭게 질문해주세요!
 
 **추천 질문:**
-- "각 보험사의 암 진단금과 수술비를 비교해줘"
-- "특약 내용의 차이점을 표로 보여줘"
-- "보장 제외 항목은 뭐가 있어?"
+{chr(10).join([f'- "{q}"' for q in SUGGESTED_QUESTIONS])}
 """
     st.session_state.messages.append({
         "role": "assistant",
-        "content": welcome_msg
+        "content": welcome_msg,
+        "preview": "안녕하세요! 👋"
     })
 
-# 메시지 표시
-for message in st.session_state.messages:
+def message_preview(content):
+    """접힌 대화 목록에 쓰는 한 줄 요약 (첫 내용 줄, 마크다운 기호 제거)"""
+    for line in content.splitlines():
+        line = line.strip().lstrip("#>*-|• ").replace("**", "").strip()
+        if line:
+            return line if len(line) <= PREVIEW_CHARS else line[:PREVIEW_CHARS] + "…"
+    return ""
+
+def add_message(role, content, **extra):
+    """대화에 메시지 추가 (한 줄 요약은 추가할 때 한 번만 만들어 메시지에 저장)"""
+    st.session_state.messages.append(dict(role=role, content=content, preview=message_preview(content), **extra))
+
+def render_message(message):
+    """메시지 하나 그리기"""
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+        
+        # 메타 정보
+        if message.get("meta"):
+            for col, caption in zip(st.columns(len(message["meta"])), message["meta"]):
+                with col:
+                    st.caption(caption)
+        if message.get("search_query"):
+            st.caption(f"🔗 이전 질문과 이어서 검색: {message['search_query']}")
+        
+        # 추천 사항 추가
+        if message.get("recommend"):
+            with st.expander("💡 AI 추천 사항"):
+                st.info("더 궁금한 점이 있으시면 구체적으로 질문해주세요!")
+
+def show_more_history():
+    st.session_state.history_shown = st.session_state.get("history_shown", RECENT_MESSAGES) + HISTORY_PAGE
+
+def show_recent_history():
+    st.session_state.history_shown = RECENT_MESSAGES
+
+@st.fragment
+def show_history():
+    """
+    대화 기록 표시
+    - 최근 메시지만 그리고 이전 대화는 접어 둠 (대화가 길어져도 매 실행마다 그리는 양이 일정)
+    - 접힌 대화는 바로 앞 HISTORY_PAGE 개의 한 줄 요약만 보여 주고, 요청하면 그만큼 펼침
+    - 펼치기/접기는 이 부분만 다시 실행 (파일 처리 등 앱 전체를 다시 실행하지 않음)
+    """
+    messages = st.session_state.messages
+    shown = min(len(messages), st.session_state.get("history_shown", RECENT_MESSAGES))
+    hidden = len(messages) - shown
+    if hidden:
+        with st.expander(f"🗂️ 접힌 이전 대화 {hidden}개"):
+            for message in messages[max(0, hidden - HISTORY_PAGE):hidden]:
+                icon = "🙋" if message["role"] == "user" else "🤖"
+                st.caption(f"{icon} {message.get('preview') or message_preview(message['content'])}")
+        st.button(f"⬆️ 이전 대화 {min(hidden, HISTORY_PAGE)}개 더 보기", on_click=show_more_history)
+    elif shown > RECENT_MESSAGES:
+        st.button("⬇️ 최근 대화만 보기", on_click=show_recent_history)
+    
+    for message in messages[hidden:]:
+        render_message(message)
+
+# 메시지 표시
+show_history()
+
+# 직전 요청의 경고/오류 (다음 질문 전까지 표시)
+if st.session_state.get("chat_alert"):
+    kind, text, error = st.session_state.chat_alert
+    with st.chat_message("assistant"):
+        if kind == "warning":
+            st.warning(text)
+        else:
+            st.error(text)
+            st.error(f"오류 세부정보: {str(error)}")
+            
+            # 에러 로깅
+            if st.session_state.get("debug_mode", False):
+                st.exception(error)
+
+def finish_request(pending, request):
+    """완료된 요청 결과를 대화에 반영"""
+    st.session_state.pending_request = None
+    if request.status == "cancelled":
+        return
+    if request.status == "failed":
+        st.session_state.chat_alert = ("error", "❌ 분석 중 오류가 발생했습니다", request.error)
+        return
+    
+    result = request.result
+    if result is None:
+        st.session_state.chat_alert = ("warning", "⚠️ 질문과 관련된 내용을 찾을 수 없습니다. 다른 질문을 시도해보세요.", None)
+        return
+    
+    if result.get("precomputed"):
+        elapsed_caption = f"⏱️ 미리 준비된 답변 (생성 {result['elapsed_time']:.2f}초)"
+    else:
+        elapsed_caption = f"⏱️ 소요시간: {result['elapsed_time']:.2f}초"
+    if result.get("depth"):
+        depth_caption = f"📏 분석 깊이: 자동 · 청크 {result['depth']['chunks']}개 ({result['depth']['reason']})"
+    else:
+        depth_caption = f"📏 분석 깊이: {pending['analysis_depth']}"
+    
+    # 메시지 저장
+    add_message(
+        "assistant",
+        result["response_text"],
+        meta=[
+            f"⚡ 모델: {result['model_used']}",
+            elapsed_caption,
+            depth_caption
+        ],
+        search_query=pending["search_query"] if pending["search_query"] != pending["prompt"] else None,
+        recommend=pending["recommend"]
+    )
+    memory.record(pending["prompt"], result["response_text"], result["span_ids"], pending["search_query"])
+
+@st.fragment(run_every=0.5)
+def show_pending_answer():
+    """
+    진행 중인 요청 표시 (0.5초마다 이 부분만 다시 그림)
+    - 완료되면 대화에 반영하고 전체 화면 갱신
+    """
+    pending = st.session_state.get("pending_request")
+    if pending is None:
+        return
+    
+    request = executor.poll(pending["request_id"])
+    if request is None or request.finished:
+        if request is not None:
+            finish_request(pending, request)
+        else:
+            st.session_state.pending_request = None
+        st.rerun()
+    
+    with st.chat_message("assistant"):
+        if request.status == "queued":
+            st.markdown(f"⏳ 차례를 기다리는 중... ({request.queue_time:.0f}초)")
+        elif pending["precomputed"]:
+            st.markdown("⚡ 미리 준비한 답변을 가져오는 중...")
+        else:
+            st.markdown("🔍 약관을 분석하는 중...")
+        if st.button("⏹️ 답변 취소", key=f"cancel_{pending['request_id']}"):
+            executor.cancel(pending["request_id"])
+            st.session_state.pending_request = None
+            add_message("assistant", "⏹️ 답변 생성을 취소했습니다.")
+            st.rerun()
 
 # 사용자 입력
 if prompt := st.chat_input("💬 질문을 입력하세요... (예: 암 진단금 비교해줘)"):
+    st.session_state.chat_alert = None
+    
+    # 답변을 기다리던 질문이 있으면 새 질문으로 대체 (submit 에서 이전 요청 취소)
+    if st.session_state.get("pending_request"):
+        add_message("assistant", "⏹️ 새 질문이 들어와 이전 질문의 답변 생성을 취소했습니다.")
+        with st.chat_message("assistant"):
+            st.markdown("⏹️ 새 질문이 들어와 이전 질문의 답변 생성을 취소했습니다.")
+    
     # 사용자 메시지 추가
     with st.chat_message("user"):
         st.markdown(prompt)
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    add_message("user", prompt)
     
-    # AI 응답 생성
-    with st.chat_message("assistant"):
-        msg_placeholder = st.empty()
-        msg_placeholder.markdown("🔍 약관을 분석하는 중...")
-        
-        try:
-            # 분석 깊이에 따른 청크 수 조정
-            chunk_map = {
-                "빠른 분석": 8,
-                "표준": 15,
-                "상세 분석": 25
-            }
-            max_chunks = chunk_map.get(analysis_depth, 15)
-            
-            # 컨텍스트 추출
-            with st.spinner("📚 관련 내용을 찾는 중..."):
-                relevant_context = get_smart_context(
-                    combined_text, 
-                    prompt, 
-                    max_chunks=max_chunks
+    # 후속 질문이면 직전 주제 키워드로 검색어 보완
+    search_query = memory.resolve_query(prompt)
+    history = memory.prompt_section()
+    
+    # 첫 질문이 추천 질문이면 미리 계산된 답변 사용
+    # (대기 중인 작업은 취소하고 직접 계산, 계산 중이면 그 결과를 기다림)
+    future = precomputer.lookup(spec_signature, prompt) if not memory.turns else None
+    precomputed = future is not None and not future.cancel()
+    
+    hedge_policy = get_hedge_policy() if hedging else None
+    
+    def run_question(cancel_event, future=future, precomputed=precomputed, profiles=st.session_state.profiles,
+                     hedge_policy=hedge_policy):
+        # 프로파일링 모드면 작업자 스레드 안에서 검색 ~ 답변 생성 전체를 측정
+        with profile_request("질문", prompt, profiling, sink=profiles):
+            if precomputed:
+                try:
+                    result = wait_future(future, cancel_event)
+                    return dict(result, precomputed=True) if result else None
+                except RequestCancelled:
+                    raise
+                except Exception:
+                    pass
+            with precomputer.foreground():
+                get_rate_limiter().record()
+                return answer_question(
+                    search_corpus,
+                    prompt,
+                    search_query,
+                    file_names,
+                    max_chunks,
+                    retrieval_mode,
+                    use_synonyms,
+                    history=history,
+                    cancel_event=cancel_event,
+                    locate=locate_span,
+                    depth=depth,
+                    snippet_padding=snippet_padding,
+                    hedge=hedge_policy
                 )
-            
-            if not relevant_context.strip():
-                msg_placeholder.warning("⚠️ 질문과 관련된 내용을 찾을 수 없습니다. 다른 질문을 시도해보세요.")
-                st.stop()
-            
-            # 프롬프트 생성
-            analysis_prompt = create_comparison_prompt(
-                relevant_context,
-                prompt,
-                file_names
-            )
-            
-            # AI 응답 생성
-            start_time = time.time()
-            response_text, model_used = generate_ai_response(analysis_prompt)
-            elapsed_time = time.time() - start_time
-            
-            # 응답 표시
-            msg_placeholder.markdown(response_text)
-            
-            # 메타 정보
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.caption(f"⚡ 모델: {model_used}")
-            with col2:
-                st.caption(f"⏱️ 소요시간: {elapsed_time:.2f}초")
-            with col3:
-                st.caption(f"📏 분석 깊이: {analysis_depth}")
-            
-            # 추천 사항 추가
-            if include_recommendations and "추천" not in prompt.lower():
-                with st.expander("💡 AI 추천 사항"):
-                    st.info("더 궁금한 점이 있으시면 구체적으로 질문해주세요!")
-            
-            # 메시지 저장
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response_text
-            })
-            
-        except Exception as e:
-            msg_placeholder.error("❌ 분석 중 오류가 발생했습니다")
-            st.error(f"오류 세부정보: {str(e)}")
-            
-            # 에러 로깅
-            if st.session_state.get("debug_mode", False):
-                st.exception(e)
+    
+    # AI 응답 생성 (작업자 풀에서 실행, 화면은 기다리지 않음)
+    request_id = executor.submit(st.session_state.session_id, run_question, label=prompt)
+    st.session_state.pending_request = {
+        "request_id": request_id,
+        "prompt": prompt,
+        "search_query": search_query,
+        "precomputed": precomputed,
+        "analysis_depth": analysis_depth,
+        "recommend": include_recommendations and "추천" not in prompt.lower()
+    }
+
+if st.session_state.get("pending_request"):
+    show_pending_answer()
 
 # ==========================================
 # 푸터
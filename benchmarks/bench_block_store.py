@@ -0,0 +1,127 @@
+"""
+블록 압축 본문 저장 벤치마크
+- 저장 크기: 청크 본문을 그대로 저장(이전 FTS 저장소, 겹침 포함) vs 문서 본문 UTF-8 vs 블록 압축 (압축 방식 × 블록 크기)
+- 구간 읽기 지연: 임의 청크 구간 (2500자)
+  - 기준: SQLite TEXT 열에서 청크 본문 읽기 (이전 방식)
+  - 블록 압축: 캐시 없이(매번 블록 풀기) / LRU 적중
+- FTS 저장소 검색 지연: 블록 캐시를 비운 첫 검색 vs 반복 검색
+- 문서는 샘플 PDF 를 보험사명/문단 순서를 바꿔 여러 개로 (약관처럼 문서끼리 겹치는 문구가 많음)
+
+사용법: python benchmarks/bench_block_store.py [문서 수] [PDF 경로]
+"""
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from block_store import _HAS_ZSTD, BlockCache, compress_blocks, read_span  # noqa: E402
+from fts_store import FTSStore  # noqa: E402
+from pdf_extraction import extract_pages  # noqa: E402
+from sparse_retrieval import chunk_spans  # noqa: E402
+from text_normalization import normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+CODECS = ["zlib"] + (["zstd"] if _HAS_ZSTD else [])
+BLOCK_SIZES = [4096, 16384, 65536]
+CHUNK_SIZE = 2500
+OVERLAP = 500
+FETCHES = 2000
+
+QUERIES = [["유방암", "가족력", "위험"], ["두통", "어지럼증", "원인"], ["혈압", "복용", "시간"], ["당뇨", "식이요법"]]
+
+INSURERS = ["가나", "다라", "마바", "사아", "자차", "카타", "파하", "한빛", "새솔", "온누리"]
+
+
+def variant(text, n):
+    """문서마다 다른 본문 (보험사명/문서 번호 삽입, 문단 순서 회전)"""
+    paragraphs = text.split("\n")
+    shift = (n * 37) % max(len(paragraphs), 1)
+    body = "\n".join(paragraphs[shift:] + paragraphs[:shift])
+    return f"{INSURERS[n % len(INSURERS)]}생명 약관 제{n}호\n{body}"
+
+
+def timed(fn, samples):
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        fn(*sample)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1e6, sorted(latencies)[int(len(latencies) * 0.95)] * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PDF
+    pages, _ = extract_pages(path)
+    base = normalize_pages(pages).text
+    texts = [variant(base, n) for n in range(count)]
+    spans = [chunk_spans(text, CHUNK_SIZE, OVERLAP) for text in texts]
+    rng = random.Random(0)
+    samples = [(d, *spans[d][rng.randrange(len(spans[d]))]) for d in (rng.randrange(count) for _ in range(FETCHES))]
+
+    raw = sum(len(text.encode("utf-8")) for text in texts)
+    chunked = sum(len(texts[d][s:e].encode("utf-8")) for d in range(count) for s, e in spans[d])
+    print(f"문서 {count}개 ({sum(map(len, texts)):,}자), 청크 {CHUNK_SIZE}자/겹침 {OVERLAP}자")
+    print(f"  청크 본문 그대로 (이전)  {chunked / 1e6:7.2f} MB")
+    print(f"  문서 본문 UTF-8          {raw / 1e6:7.2f} MB  ({chunked / raw:.2f}배 작음)")
+
+    workdir = tempfile.mkdtemp(prefix="bench-blocks-")
+    try:
+        # 기준: SQLite TEXT 열에서 청크 읽기
+        plain = sqlite3.connect(os.path.join(workdir, "plain.db"))
+        plain.execute("CREATE TABLE chunks (doc INTEGER, start INTEGER, text TEXT, PRIMARY KEY (doc, start))")
+        plain.executemany("INSERT INTO chunks VALUES (?, ?, ?)",
+                          [(d, s, texts[d][s:e]) for d in range(count) for s, e in spans[d]])
+        plain.commit()
+        p50, p95 = timed(lambda d, s, e: plain.execute(
+            "SELECT text FROM chunks WHERE doc = ? AND start = ?", (d, s)).fetchone(), samples)
+        print(f"\n구간 읽기 ({FETCHES}회, 중앙값/p95)")
+        print(f"  SQLite TEXT 열 (이전)               {p50:7.1f}µs {p95:7.1f}µs")
+
+        for codec in CODECS:
+            for block_chars in BLOCK_SIZES:
+                blocks = [compress_blocks(text, block_chars, codec) for text in texts]
+                size = sum(len(b) for doc in blocks for b in doc)
+
+                def fetch(d, s, e, cache):
+                    return read_span(d, s, e, lambda numbers: {n: blocks[d][n] for n in numbers},
+                                     cache, codec, block_chars)
+
+                cold = BlockCache(max_blocks=0)
+                warm = BlockCache()
+                for sample in samples:
+                    fetch(*sample, warm)
+                assert all(fetch(d, s, e, cold) == texts[d][s:e] for d, s, e in samples[:50])
+                c50, c95 = timed(lambda d, s, e: fetch(d, s, e, cold), samples)
+                w50, w95 = timed(lambda d, s, e: fetch(d, s, e, warm), samples)
+                print(f"  {codec:<4} 블록 {block_chars:>6}자  {size / 1e6:6.2f} MB "
+                      f"(이전 대비 {chunked / size:4.1f}배 작음)  "
+                      f"캐시 없음 {c50:6.1f}µs {c95:6.1f}µs  LRU {w50:5.1f}µs {w95:5.1f}µs")
+
+        # FTS 저장소 (기본 설정)
+        store = FTSStore(os.path.join(workdir, "corpus.db"))
+        for n, text in enumerate(texts):
+            store.add_document(f"d{n:015d}", f"doc-{n}.pdf", text)
+        stats = store.stats()
+        keys = store.document_keys()[-5:]
+        store.block_cache.clear()
+        cold = [timed(lambda q: store.search(q, 15, keys), [(q,)])[0] for q in QUERIES]
+        warm = [timed(lambda q: store.search(q, 15, keys), [(q,)] * 5)[0] for q in QUERIES]
+        print(f"\nFTS 저장소 ({store.codec}, 블록 {store.block_chars}자): 본문 {stats['text_bytes'] / 1e6:.2f} MB "
+              f"(블록 {stats['blocks']:,}개, 이전 방식 청크 본문 {chunked / 1e6:.2f} MB)")
+        print(f"  파일 5개 범위 검색  첫 검색(캐시 비움) {statistics.median(cold) / 1000:6.1f}ms"
+              f"  반복 {statistics.median(warm) / 1000:6.1f}ms")
+        store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
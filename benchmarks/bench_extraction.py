@@ -0,0 +1,90 @@
+"""
+PDF 추출 엔진 벤치마크
+- 설치된 엔진별 처리 속도(페이지/초)와 텍스트 충실도 비교
+- 충실도: 기준 엔진(PyPDF2) 대비 페이지별 글자 바이그램 F1, 한글 비율,
+  깨진 글자(대체 문자/사용자 정의 영역) 수, 검색어 등장 횟수 일치 여부
+
+사용법: python benchmarks/bench_extraction.py [PDF 경로] [반복 횟수]
+"""
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdf_extraction import _EXTRACTORS, available_engines  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+TERMS = ["유방암", "결장암", "관상동맥", "두통", "혈압", "당뇨", "가족력", "검사"]
+
+
+def bigram_f1(reference, candidate):
+    """공백을 뺀 글자 바이그램 다중집합 F1"""
+    ref = "".join(reference.split())
+    cand = "".join(candidate.split())
+    ref_grams = Counter(ref[i:i + 2] for i in range(len(ref) - 1))
+    cand_grams = Counter(cand[i:i + 2] for i in range(len(cand) - 1))
+    if not ref_grams and not cand_grams:
+        return 1.0
+    overlap = sum((ref_grams & cand_grams).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(cand_grams.values())
+    recall = overlap / sum(ref_grams.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def broken_chars(text):
+    return sum(1 for ch in text if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff")
+
+
+def hangul_ratio(text):
+    visible = [ch for ch in text if not ch.isspace()]
+    if not visible:
+        return 0.0
+    return sum(1 for ch in visible if "가" <= ch <= "힣") / len(visible)
+
+
+def run(engine, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = _EXTRACTORS[engine](data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return pages, best
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with open(path, "rb") as f:
+        data = f.read()
+
+    engines = available_engines()
+    print(f"PDF: {os.path.basename(path)} ({len(data) / 1024:.0f} KB), 엔진: {', '.join(engines)}, 반복 {repeat}회 중 최솟값")
+
+    results = {engine: run(engine, data, repeat) for engine in engines}
+    reference = results["pypdf2"][0]
+    ref_text = "\n".join(reference)
+    ref_time = results["pypdf2"][1]
+
+    header = f"{'엔진':<10} {'페이지':>6} {'시간(초)':>9} {'페이지/초':>9} {'배속':>6} {'글자수':>8} {'한글비율':>8} {'깨진글자':>8} {'바이그램F1':>10} {'검색어일치':>10}"
+    print(header)
+    print("-" * len(header))
+    for engine, (pages, elapsed) in results.items():
+        text = "\n".join(pages)
+        n = min(len(pages), len(reference))
+        f1 = sum(bigram_f1(reference[i], pages[i]) for i in range(n)) / max(n, 1)
+        term_match = sum(1 for term in TERMS if text.count(term) == ref_text.count(term))
+        print(
+            f"{engine:<10} {len(pages):>6} {elapsed:>9.3f} {len(pages) / elapsed:>9.1f} "
+            f"{ref_time / elapsed:>5.1f}x {len(text):>8,} {hangul_ratio(text):>8.3f} "
+            f"{broken_chars(text):>8} {f1:>10.4f} {term_match:>6}/{len(TERMS)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
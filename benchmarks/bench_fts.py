@@ -0,0 +1,193 @@
+"""
+SQLite FTS5 저장소 벤치마크
+- 적재 처리량: 샘플 PDF 를 문서마다 조금씩 바꿔 N개 청크(기본 10만 개 이상)가 될 때까지 적재
+- 검색 지연: 전체 코퍼스 검색 / 업로드 파일 5개로 범위를 좁힌 검색 (앱 사용 형태), p50/p95
+- 동시 읽기: 여러 프로세스가 같은 DB 를 동시에 검색하는 동안 한 프로세스가 계속 적재
+  (WAL 모드에서 읽기가 막히거나 "database is locked" 오류가 나지 않는지)
+- 정확성: 작은 범위 검색 결과가 메모리 코퍼스(SegmentedCorpus)와 같은 순위인지,
+  전체 코퍼스 검색(bm25 후보 재점수화)의 상위 점수가 모든 후보를 점수화한 결과와 같은지
+
+사용법: python benchmarks/bench_fts.py [목표 청크 수] [읽기 프로세스 수] [PDF 경로]
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fts_store import FTSStore  # noqa: E402
+from pdf_extraction import extract_pages  # noqa: E402
+from segmented_corpus import SegmentedCorpus  # noqa: E402
+from sparse_retrieval import chunk_spans  # noqa: E402
+from text_normalization import normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+    "알츠하이머병 치료",
+]
+
+INSURERS = ["가나", "다라", "마바", "사아", "자차", "카타", "파하", "한빛", "새솔", "온누리"]
+
+MAX_CHUNKS = 15
+SCOPED_DOCS = 5
+READ_SECONDS = 10.0
+
+
+def keywords(query):
+    return [word.lower() for word in query.split() if len(word) > 1]
+
+
+def variant(text, n):
+    """문서마다 다른 본문 (보험사명/문서 번호 삽입, 문단 순서 회전)"""
+    paragraphs = text.split("\n")
+    shift = (n * 37) % max(len(paragraphs), 1)
+    body = "\n".join(paragraphs[shift:] + paragraphs[:shift])
+    return f"{INSURERS[n % len(INSURERS)]}생명 약관 제{n}호\n{body}"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def measure(store, doc_keys=None, repeat=3):
+    latencies = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            store.search(keywords(query), MAX_CHUNKS, doc_keys)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def reader(path, seconds, queue):
+    store = FTSStore(path)
+    latencies, errors = [], 0
+    deadline = time.time() + seconds
+    i = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            store.search(keywords(QUERIES[i % len(QUERIES)]), MAX_CHUNKS)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    queue.put((latencies, errors))
+
+
+def writer(path, text, page_spans, first, seconds, queue):
+    store = FTSStore(path)
+    added, errors = 0, 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            store.add_document(f"w{first + added:015d}", f"writer-{added}.pdf", variant(text, first + added), page_spans)
+            added += 1
+        except Exception:
+            errors += 1
+    queue.put((added, errors))
+
+
+def main():
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_PDF
+
+    pages, _ = extract_pages(path)
+    document = normalize_pages(pages)
+    page_spans = document.page_spans()
+    workdir = tempfile.mkdtemp(prefix="bench-fts-")
+    db_path = os.path.join(workdir, "corpus.db")
+    try:
+        store = FTSStore(db_path)
+
+        # 1. 적재
+        start = time.perf_counter()
+        n = chunks = chars = 0
+        while chunks < target:
+            text = variant(document.text, n)
+            store.add_document(f"d{n:015d}", f"doc-{n}.pdf", text, page_spans)
+            chunks += len(chunk_spans(text, store.chunk_size, store.overlap))
+            chars += len(text)
+            n += 1
+        ingest = time.perf_counter() - start
+        start = time.perf_counter()
+        store.optimize()
+        optimize = time.perf_counter() - start
+        stats = store.stats()
+        print(f"적재: 문서 {stats['documents']:,}개, 청크 {stats['chunks']:,}개, 조항 {stats['sections']:,}개, "
+              f"페이지 {stats['pages']:,}개")
+        print(f"  {ingest:.1f}초 → {stats['chunks'] / ingest:,.0f} 청크/초, {chars / ingest / 1e6:.2f}M 글자/초"
+              f" (optimize {optimize:.1f}초, DB {stats['db_bytes'] / 1e6:,.0f} MB)")
+
+        # 2. 검색 지연
+        whole = measure(store)
+        keys = store.document_keys()[-SCOPED_DOCS:]
+        scoped = measure(store, keys)
+        print(f"검색 (상위 {MAX_CHUNKS}개, 질문 {len(QUERIES)}개 × 3회)")
+        print(f"  전체 코퍼스      p50 {percentile(whole, 0.5) * 1000:7.1f}ms  p95 {percentile(whole, 0.95) * 1000:7.1f}ms")
+        print(f"  파일 {SCOPED_DOCS}개로 범위 제한 p50 {percentile(scoped, 0.5) * 1000:7.1f}ms"
+              f"  p95 {percentile(scoped, 0.95) * 1000:7.1f}ms")
+
+        # 3. 정확성: 범위 제한 검색 = 메모리 코퍼스 순위
+        corpus = SegmentedCorpus(chunk_size=store.chunk_size, overlap=store.overlap)
+        for key in keys:
+            index = int(key[1:])
+            corpus.add_document(key, f"doc-{index}.pdf", variant(document.text, index))
+        same = sum(
+            [span for _, _, span in store.search(keywords(q), MAX_CHUNKS, keys)]
+            == [span for _, _, span in corpus.search(keywords(q), MAX_CHUNKS)]
+            for q in QUERIES
+        )
+        print(f"  범위 제한 검색: 메모리 코퍼스와 순위 일치 {same}/{len(QUERIES)}")
+
+        exact = FTSStore(db_path, exact_scope=stats["chunks"])
+        start = time.perf_counter()
+        reference = [[score for score, *_ in exact.rank(keywords(q), MAX_CHUNKS)] for q in QUERIES]
+        exact_time = (time.perf_counter() - start) / len(QUERIES)
+        same = sum(
+            [score for score, *_ in store.rank(keywords(q), MAX_CHUNKS)] == scores
+            for q, scores in zip(QUERIES, reference)
+        )
+        print(f"  전체 코퍼스 검색: 모든 후보 점수화(질문당 {exact_time * 1000:.0f}ms)와 상위 점수 일치"
+              f" {same}/{len(QUERIES)}")
+        exact.close()
+        store.close()
+
+        # 4. 동시 읽기 (프로세스 여러 개) + 적재 1개
+        queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=reader, args=(db_path, READ_SECONDS, queue)) for _ in range(readers)]
+        procs.append(multiprocessing.Process(
+            target=writer, args=(db_path, document.text, page_spans, n, READ_SECONDS, queue)
+        ))
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        reads = [r for r in results if isinstance(r[0], list)]
+        writes = [r for r in results if not isinstance(r[0], list)]
+        latencies = [latency for r in reads for latency in r[0]]
+        print(f"동시 읽기: 프로세스 {readers}개 × {READ_SECONDS:.0f}초 (+ 적재 프로세스 1개)")
+        print(f"  검색 {len(latencies):,}회 ({len(latencies) / READ_SECONDS:.1f}회/초), "
+              f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p95 {percentile(latencies, 0.95) * 1000:.1f}ms, "
+              f"오류 {sum(r[1] for r in reads)}")
+        print(f"  동시에 적재한 문서 {sum(w[0] for w in writes)}개, 오류 {sum(w[1] for w in writes)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
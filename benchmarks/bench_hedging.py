@@ -0,0 +1,123 @@
+"""
+헤지 요청 벤치마크 (모의 모델)
+- 실제 Gemini 대신 첫 토큰 시간이 꼬리가 긴 분포인 모의 모델로 같은 요청을 반복
+  (대부분 빠르고 slow_ratio 비율만 느림, 후보 모델끼리는 서로 독립)
+- 비교: 헤지 없이(첫 모델을 기다림) vs 헤지 요청 (HedgePolicy 기본 설정, 임계 시간은 p90 자동)
+- 결과: 응답 시간 p50/p95/p99, 헤지 비율, 헤지 모델 승리 수, 추가 요청/토큰
+- 시간은 scale 배로 줄여서 실행 (표시는 원래 초 단위)
+
+사용법: python benchmarks/bench_hedging.py [요청 수] [느린 요청 비율]
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from adaptive_depth import percentile  # noqa: E402
+from hedged_requests import HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HedgePolicy  # noqa: E402
+from model_clients import ModelClients  # noqa: E402
+
+MODELS = ["model-a", "model-b", "model-c"]
+
+# 원래 시간 기준 (초): 보통 첫 토큰 / 느린 첫 토큰 범위 / 첫 토큰 뒤 생성 시간, 출력 조각 수
+FAST_FIRST_TOKEN = (0.6, 1.5)
+SLOW_FIRST_TOKEN = (8.0, 20.0)
+GENERATION = (1.5, 3.0)
+CHUNKS = 20
+CHUNK_TEXT = "보장 내용 비교 결과입니다. "
+
+SCALE = 0.02
+PROMPT = "약관 비교 " * 2000
+
+
+class _Feedback:
+    block_reason = None
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class SimulatedResponse:
+    """스트리밍 응답 흉내 (조각 사이 시간 대기)"""
+
+    def __init__(self, first_token, generation):
+        self.first_token = first_token
+        self.generation = generation
+        self.prompt_feedback = _Feedback()
+        self.text = CHUNK_TEXT * CHUNKS
+
+    def __iter__(self):
+        time.sleep(self.first_token * SCALE)
+        for _ in range(CHUNKS):
+            yield _Chunk(CHUNK_TEXT)
+            time.sleep(self.generation / CHUNKS * SCALE)
+
+
+class SimulatedModel:
+    def __init__(self, rng, slow_ratio, lock):
+        self.rng = rng
+        self.slow_ratio = slow_ratio
+        self.lock = lock
+
+    def generate_content(self, prompt, stream=False):
+        with self.lock:
+            slow = self.rng.random() < self.slow_ratio
+            first = self.rng.uniform(*(SLOW_FIRST_TOKEN if slow else FAST_FIRST_TOKEN))
+            generation = self.rng.uniform(*GENERATION)
+        response = SimulatedResponse(first, generation)
+        if not stream:
+            for _ in response:
+                pass
+        return response
+
+
+class SimulatedClients(ModelClients):
+    """모델 객체만 모의 모델로 바꾼 ModelClients (generate/헤지 로직은 그대로)"""
+
+    def __init__(self, seed, slow_ratio):
+        super().__init__("bench-key", MODELS)
+        lock = threading.Lock()
+        self._simulated = {name: SimulatedModel(random.Random(f"{seed}-{name}"), slow_ratio, lock) for name in MODELS}
+
+    def model(self, name, generation_config=None):
+        return self._simulated[name]
+
+
+def run(count, slow_ratio, policy):
+    clients = SimulatedClients(0, slow_ratio)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        clients.generate(PROMPT, cancel_event=threading.Event(), hedge=policy)
+        latencies.append((time.perf_counter() - start) / SCALE)
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    slow_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.08
+    print(f"모의 모델 {len(MODELS)}개, 요청 {count}개, 느린 첫 토큰 비율 {slow_ratio:.0%} "
+          f"(보통 {FAST_FIRST_TOKEN[0]}~{FAST_FIRST_TOKEN[1]}초, 느림 {SLOW_FIRST_TOKEN[0]}~{SLOW_FIRST_TOKEN[1]}초)")
+
+    plain = run(count, slow_ratio, None)
+    policy = HedgePolicy(default_delay=HEDGE_DEFAULT_DELAY * SCALE, min_delay=HEDGE_MIN_DELAY * SCALE)
+    hedged = run(count, slow_ratio, policy)
+    stats = policy.stats()
+
+    for label, latencies in (("헤지 없이", plain), ("헤지 요청", hedged)):
+        print(f"  {label:<8} p50 {percentile(latencies, 0.5):5.1f}초  p95 {percentile(latencies, 0.95):5.1f}초  "
+              f"p99 {percentile(latencies, 0.99):5.1f}초  평균 {sum(latencies) / len(latencies):5.1f}초")
+    print(f"  헤지 {stats['hedged']}회 ({stats['hedge_rate']:.1%}, 상한 {policy.max_rate:.0%}), "
+          f"상한으로 건너뜀 {stats['skipped']}회, 헤지 모델 승 {stats['hedge_wins']}회")
+    print(f"  추가 비용: 요청 {stats['extra_calls']}회 (+{stats['extra_calls'] / count:.1%}), "
+          f"입력 토큰 {stats['extra_input_tokens']:,}, 취소 전 출력 토큰 {stats['extra_output_tokens']:,}")
+    print(f"  임계 시간 (첫 토큰 p90): {policy.threshold(MODELS[0]) / SCALE:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
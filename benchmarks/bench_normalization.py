@@ -0,0 +1,128 @@
+"""
+추출 텍스트 정리 벤치마크
+- 원본 추출 텍스트 vs 정리된 텍스트 (머리말/꼬리말/쪽 번호 제거, 줄바꿈 복원, 공백 정리)
+- 문서 전체 토큰 수, 같은 검색 결과(원본 기준 상위 청크가 덮는 원래 페이지 구간)를
+  정리된 텍스트로 보낼 때의 토큰 수, 검색어 등장 횟수 비교
+- 실제 약관처럼 머리말/꼬리말이 있는 경우를 보기 위해 페이지마다 머리말/쪽 번호/꼬리말을
+  붙인 변형도 함께 측정
+
+사용법: python benchmarks/bench_normalization.py [PDF 경로]
+"""
+import os
+import sys
+import time
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdf_extraction import extract_pages, join_pages  # noqa: E402
+from sparse_retrieval import ChunkTermIndex, split_into_chunks  # noqa: E402
+from text_normalization import estimate_tokens, normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+    "알츠하이머병 치료",
+]
+
+CHUNK_SIZE = 2500
+OVERLAP = 500
+MAX_CHUNKS = 15
+
+
+def with_boilerplate(pages):
+    """약관 PDF 의 흔한 머리말/쪽 번호/꼬리말을 페이지마다 붙인 변형"""
+    return [
+        f"무배당 OO암보험 보통약관 (2024.04 개정)\n{page}\n- {n} -\nOO생명보험(주) 고객센터 1588-0000"
+        for n, page in enumerate(pages, 1)
+    ]
+
+
+def raw_positions(pages):
+    """join_pages 결과의 위치 → (페이지, 페이지 내 위치) 를 구하기 위한 페이지 시작 위치"""
+    starts, pos = [], 0
+    for page_no, page in enumerate(pages):
+        if page:
+            starts.append((pos, page_no))
+            pos += len(page) + 1
+    return starts
+
+
+def same_content_tokens(pages, document):
+    """
+    질문당 평균 토큰 수 (원본 상위 청크 / 같은 원래 구간의 정리된 텍스트)
+    - 원본 텍스트에서 고른 상위 청크의 원래 페이지 구간을 위치 매핑으로 정리된 텍스트에서 찾음
+    """
+    raw = join_pages(pages)
+    starts = raw_positions(pages)
+    keys = [(page_no, original) for _, page_no, original in document.anchors]
+
+    def to_normalized(raw_offset):
+        idx = max(bisect_left(starts, (raw_offset + 1, -1)) - 1, 0)
+        page_start, page_no = starts[idx]
+        anchor = bisect_left(keys, (page_no, raw_offset - page_start))
+        return document.anchors[anchor][0] if anchor < len(keys) else len(document.text)
+
+    step = CHUNK_SIZE - OVERLAP
+    chunks = split_into_chunks(raw, CHUNK_SIZE, OVERLAP, skip_blank=False)
+    index = ChunkTermIndex(chunks, lowercase=True)
+    raw_total = norm_total = 0
+    for query in QUERIES:
+        rows, _ = index.rank(query.lower().split(), MAX_CHUNKS, weighting="frequency")
+        raw_total += sum(estimate_tokens(chunks[row]) for row in rows)
+        for row in rows:
+            start = to_normalized(row * step)
+            end = to_normalized(row * step + len(chunks[row]))
+            norm_total += estimate_tokens(document.text[start:end])
+    return raw_total / len(QUERIES), norm_total / len(QUERIES)
+
+
+def term_hits(text):
+    terms = {word for query in QUERIES for word in query.split() if len(word) > 1}
+    return sum(text.count(term) for term in terms)
+
+
+def report(label, pages):
+    raw = join_pages(pages)
+    start = time.perf_counter()
+    document = normalize_pages(pages)
+    elapsed = time.perf_counter() - start
+    stats = document.stats
+
+    raw_doc, norm_doc = estimate_tokens(raw), estimate_tokens(document.text)
+    raw_ctx, norm_ctx = same_content_tokens(pages, document)
+    print(f"\n[{label}] 정리 {elapsed * 1000:.0f}ms, 페이지 {len(pages)}")
+    print(f"  제거: 머리말/꼬리말 {stats['boilerplate_lines']}줄, 쪽 번호 {stats['page_number_lines']}줄"
+          f" / 이어 붙인 줄 {stats['joined_lines']}")
+    print(f"  문서 토큰      {raw_doc:>8,} → {norm_doc:>8,} ({norm_doc / raw_doc - 1:+.1%})")
+    print(f"  질문당 컨텍스트 {raw_ctx:>8,.0f} → {norm_ctx:>8,.0f} ({norm_ctx / raw_ctx - 1:+.1%})"
+          f"  (같은 상위 {MAX_CHUNKS}개 청크 구간)")
+    print(f"  검색어 등장     {term_hits(raw):>8,} → {term_hits(document.text):>8,}")
+
+    # 위치 매핑 확인: 정리된 텍스트의 각 줄 시작이 원래 페이지의 같은 줄을 가리키는지
+    mismatched = 0
+    for offset, page_no, original in document.anchors:
+        line = pages[page_no][original:].split("\n", 1)[0]
+        expected = " ".join(line.split())[:10]
+        if expected != document.text[offset:offset + len(expected)]:
+            mismatched += 1
+    print(f"  페이지 매핑 불일치 {mismatched}/{len(document.anchors)}줄")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    pages, engine = extract_pages(path)
+    print(f"PDF: {os.path.basename(path)} (엔진: {engine})")
+    report("원본 PDF", pages)
+    report("머리말/꼬리말 추가 변형", with_boilerplate(pages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+검색 점수화 벤치마크
+- 기존 파이썬 이중 루프(get_smart_context / get_relevant_content) vs 희소 행렬 엔진
+- 같은 질문 세트에 대해 순위가 동일한지 확인하고 처리 시간을 비교
+
+사용법: python benchmarks/bench_retrieval.py [PDF 경로] [반복 배수]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sparse_retrieval import ChunkTermIndex, split_into_chunks  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "암 진단금과 수술비를 보험사별로 비교해줘",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+]
+
+
+def load_text(path):
+    import PyPDF2
+
+    text = ""
+    with open(path, "rb") as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            extracted = page.extract_text()
+            if extracted:
+                text += extracted + "\n"
+    return text
+
+
+def legacy_smart(full_text, query, max_chunks=15):
+    """app.py 의 기존 get_smart_context 점수화 (비교 기준)"""
+    chunks = [c for c in split_into_chunks(full_text, 2500, 500)]
+    query_keywords = [word.lower() for word in query.split() if len(word) > 1]
+    scored_chunks = []
+    for chunk in chunks:
+        chunk_lower = chunk.lower()
+        score = 0
+        for keyword in query_keywords:
+            score += chunk_lower.count(keyword) * (1 + len(keyword) / 10)
+        if score > 0:
+            scored_chunks.append((score, chunk))
+    scored_chunks.sort(key=lambda x: x[0], reverse=True)
+    return [chunk for score, chunk in scored_chunks[:max_chunks]]
+
+
+def legacy_relevant(full_text, query):
+    """홈 닥터의 기존 get_relevant_content 점수화 (비교 기준)"""
+    chunks = [full_text[i:i + 1000] for i in range(0, len(full_text), 1000)]
+    relevant_chunks = []
+    for chunk in chunks:
+        score = sum(1 for word in query.split() if word in chunk)
+        if score > 0:
+            relevant_chunks.append((score, chunk))
+    relevant_chunks.sort(key=lambda x: x[0], reverse=True)
+    return [chunk for score, chunk in relevant_chunks[:10]]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    base_text, elapsed = timed(lambda: load_text(path))
+    full_text = base_text * repeat
+    print(f"📄 {os.path.basename(path)}: {len(base_text):,}자 추출 ({elapsed:.2f}초), ×{repeat} = {len(full_text):,}자")
+
+    # get_smart_context 방식
+    legacy, t_legacy = timed(lambda: [legacy_smart(full_text, q) for q in QUERIES])
+    index, t_build = timed(lambda: ChunkTermIndex(split_into_chunks(full_text, 2500, 500), lowercase=True))
+    keyword_lists = [[w.lower() for w in q.split() if len(w) > 1] for q in QUERIES]
+    batch, t_batch = timed(lambda: index.search_batch(keyword_lists, 15, weighting="frequency"))
+    warm, t_warm = timed(lambda: index.search_batch(keyword_lists, 15, weighting="frequency"))
+    compat, t_compat = timed(lambda: index.search_batch(keyword_lists, 15, weighting="frequency", legacy_float=True))
+
+    print("\n[get_smart_context] 청크 2500자 / 중복 500자")
+    print(f"  기존 루프        : {t_legacy * 1000:8.1f} ms ({len(QUERIES)}개 질문)")
+    print(f"  인덱스 생성      : {t_build * 1000:8.1f} ms")
+    print(f"  배치 검색 (최초) : {t_batch * 1000:8.1f} ms")
+    print(f"  배치 검색 (재사용): {t_warm * 1000:8.1f} ms")
+    print(f"  기존 순서 재현   : {t_compat * 1000:8.1f} ms (legacy_float=True)")
+    print(f"  순위 일치 (재현) : {legacy == compat}")
+    print(f"  기본 모드 순위 차이: {sum(a != b for a, b in zip(legacy, batch))}개 질문 (반올림 오차로 갈린 동점만 다름)")
+
+    # get_relevant_content 방식
+    legacy, t_legacy = timed(lambda: [legacy_relevant(full_text, q) for q in QUERIES])
+    index, t_build = timed(lambda: ChunkTermIndex(split_into_chunks(full_text, 1000, 0, skip_blank=False), lowercase=False))
+    batch, t_batch = timed(lambda: index.search_batch([q.split() for q in QUERIES], 10, weighting="presence"))
+
+    print("\n[get_relevant_content] 청크 1000자")
+    print(f"  기존 루프        : {t_legacy * 1000:8.1f} ms ({len(QUERIES)}개 질문)")
+    print(f"  인덱스 생성      : {t_build * 1000:8.1f} ms")
+    print(f"  배치 검색        : {t_batch * 1000:8.1f} ms")
+    print(f"  순위 일치        : {legacy == batch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+검색 서비스 벤치마크
+- 같은 파일을 여러 UI 복제본이 올리는 상황: 첫 적재 vs 내용 해시 캐시 적중
+- 동시 검색: 스레드 N개(복제본 요청 흉내)가 같은 코퍼스를 검색할 때 처리량/지연,
+  묶음 처리(BATCH_WINDOW) 사용 vs 미사용
+- 정확성: 서비스 검색 결과가 같은 설정의 로컬 SegmentedCorpus 와 같은지
+
+사용법: python benchmarks/bench_service.py [동시 요청 수] [PDF 경로]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdf_extraction import extract_pages  # noqa: E402
+from retrieval_client import RetrievalClient  # noqa: E402
+from retrieval_service import BATCH_WINDOW, RetrievalService, make_server  # noqa: E402
+from segmented_corpus import SegmentedCorpus  # noqa: E402
+from text_normalization import normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+    "알츠하이머병 치료",
+]
+
+ROUNDS = 40
+MAX_CHUNKS = 15
+
+
+def keywords(query):
+    return [word.lower() for word in query.split() if len(word) > 1]
+
+
+def start_server(batch_window):
+    server = make_server("127.0.0.1", 0, RetrievalService(batch_window=batch_window))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, RetrievalClient(f"http://127.0.0.1:{server.server_address[1]}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def concurrent_search(client, corpus_spec, concurrency):
+    corpus = client.open_corpus(**corpus_spec)
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        corpus.search(keywords(QUERIES[i % len(QUERIES)]), MAX_CHUNKS)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(ROUNDS * concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PDF
+    with open(path, "rb") as f:
+        data = f.read()
+    # 보험사 3곳 약관 흉내: 같은 PDF + 텍스트 변형 2개
+    texts = [(f"보험사{i}.txt", ("\n".join(f"[{i}] {line}" for line in
+              normalize_pages(extract_pages(data)[0]).text.split("\n"))).encode("utf-8")) for i in (1, 2)]
+
+    for label, window in (("묶음 처리", BATCH_WINDOW), ("묶음 없음", 0.0)):
+        server, client = start_server(window)
+        try:
+            start = time.perf_counter()
+            infos = [client.ingest(os.path.basename(path), data, "pdf")]
+            infos += [client.ingest(name, body, "txt") for name, body in texts]
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            client.ingest(os.path.basename(path), data, "pdf")
+            for name, body in texts:
+                client.ingest(name, body, "txt")
+            cached = time.perf_counter() - start
+            spec = {"keys": [info["key"] for info in infos], "chunk_size": 2500, "overlap": 500, "dedup": True}
+
+            qps, latencies = concurrent_search(client, spec, concurrency)
+            stats = client.health()
+            print(f"\n[{label}] 문서 {len(infos)}개")
+            print(f"  적재: 첫 업로드 {first * 1000:.0f}ms → 다른 복제본의 같은 파일 {cached * 1000:.1f}ms (내용 해시 적중)")
+            print(f"  동시 검색 {concurrency}개 × {ROUNDS}회: {qps:,.0f} 검색/초, "
+                  f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p95 {percentile(latencies, 0.95) * 1000:.1f}ms")
+            print(f"  점수화 호출 {stats['search_batches']}회 / 요청 {stats['search_requests']}회")
+
+            if window:
+                local = SegmentedCorpus(chunk_size=2500, overlap=500, dedup=True, background=False)
+                local.sync([(info["key"], info["name"], client.document_text(info["key"])) for info in infos])
+                remote = client.open_corpus(**spec)
+                same = sum(local.search(keywords(q), MAX_CHUNKS) == remote.search(keywords(q), MAX_CHUNKS)
+                           for q in QUERIES)
+                print(f"  로컬 코퍼스와 결과 일치 {same}/{len(QUERIES)}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
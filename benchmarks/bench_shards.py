@@ -0,0 +1,108 @@
+"""
+권별 샤드 색인 + 블룸 필터 라우팅 벤치마크
+- 비교: 권을 합친 색인 하나(기존) vs 권별 샤드 + 블룸 필터 라우팅
+- 권 수 늘리기: 실제 권(문서를 4등분) + 질문과 상관없는 권 N개
+  (같은 본문의 한글 음절을 밀어 만든 다른 글자 분포의 권)
+- 첫 질문 지연(검색어 열을 처음 계산하는 콜드 상태)과 반복 질문 지연, 라우팅으로 건너뛴 권 수
+- 결과 일치: 상위 10개 청크 본문이 합친 색인과 같은 비율 (권 경계는 청크 경계와 어긋나게 나눔)
+
+사용법: python benchmarks/bench_shards.py [PDF 경로]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdf_extraction import extract_pages  # noqa: E402
+from sharded_index import ShardedIndex  # noqa: E402
+from sparse_retrieval import ChunkTermIndex, split_into_chunks  # noqa: E402
+from text_normalization import normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+    "알츠하이머병 치료",
+]
+
+EXTRA_VOLUMES = [0, 4, 12]
+CHUNK_SIZE = 1000
+K = 10
+
+
+def shifted(text, shift):
+    """한글 음절을 shift 만큼 밀어 글자 분포가 다른 권을 만듦"""
+    return "".join(
+        chr(0xAC00 + (ord(ch) - 0xAC00 + shift) % 11172) if "가" <= ch <= "힣" else ch
+        for ch in text
+    )
+
+
+def merged_top(index, terms):
+    rows, _ = index.rank(terms, K, "presence")
+    return [index.chunks[row] for row in rows.tolist()]
+
+
+def sharded_top(index, terms):
+    return [index.chunk(shard, row) for _, shard, row, _ in index.rank(terms, K, "presence")]
+
+
+def measure(build, query, queries):
+    """(질문별 첫 검색 지연, 반복 검색 지연, 결과) — 첫 검색은 질문마다 새 색인으로"""
+    cold, warm, results = [], [], []
+    for terms in queries:
+        index = build()
+        start = time.perf_counter()
+        results.append(query(index, terms))
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        query(index, terms)
+        warm.append(time.perf_counter() - start)
+    return statistics.median(cold), statistics.median(warm), results
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    pages, _ = extract_pages(path)
+    text = normalize_pages(pages).text
+    quarter = len(text) // 4
+    real = [(f"권{i + 1}", text[i * quarter:(i + 1) * quarter if i < 3 else len(text)]) for i in range(4)]
+    queries = [query.split() for query in QUERIES]
+    print(f"문서: {os.path.basename(path)} ({len(text):,}자) → 실제 권 4개, 질문 {len(queries)}개, 상위 {K}개")
+
+    for extra in EXTRA_VOLUMES:
+        volumes = real + [(f"무관{i + 1}", shifted(text, 1000 + 397 * i))
+                          for i in range(extra)]
+        merged_text = "".join(v for _, v in volumes)
+
+        def build_merged():
+            return ChunkTermIndex(split_into_chunks(merged_text, CHUNK_SIZE, skip_blank=False), lowercase=False)
+
+        def build_sharded():
+            return ShardedIndex(volumes, chunk_size=CHUNK_SIZE, lowercase=False)
+
+        m_cold, m_warm, m_results = measure(build_merged, merged_top, queries)
+        s_cold, s_warm, s_results = measure(build_sharded, sharded_top, queries)
+        sharded = build_sharded()
+        routed = statistics.mean(len(sharded.route(terms)) for terms in queries)
+        overlap = statistics.mean(
+            len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(m_results, s_results)
+        )
+        bloom_kb = sum(row["블룸 필터(KB)"] for row in sharded.stats())
+        print(f"\n[권 {len(volumes)}개 ({len(merged_text):,}자), 블룸 필터 합계 {bloom_kb:.1f}KB]")
+        print(f"  합친 색인   첫 검색 {m_cold * 1000:6.2f}ms  반복 {m_warm * 1000:6.2f}ms")
+        print(f"  샤드+라우팅 첫 검색 {s_cold * 1000:6.2f}ms  반복 {s_warm * 1000:6.2f}ms  "
+              f"검색한 권 평균 {routed:.1f}/{len(volumes)}")
+        print(f"  상위 {K}개 일치율 {overlap:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+적중 구간(문장 단위) 추출 벤치마크
+- 프롬프트 크기: 청크 전체 vs 적중 문장 ± padding 문장 (padding 0/1/2)
+- 관련 내용 보존: 컨텍스트에 남은 검색어 등장 횟수 (청크 전체 대비)
+- 밀도: 컨텍스트 글자 1000자당 검색어 등장 횟수
+- 근접도 재점수화: 상위 청크가 바뀐 질문 수, 상위 5개의 평균 근접도, 검색 지연
+- 설정: 보험 비교 앱(2500자/500자 중복, 상위 15개, 빈도 점수), 홈 닥터(1000자, 상위 10개, 포함 수 점수)
+
+사용법: python benchmarks/bench_snippets.py [PDF 경로]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hit_windows import extract_snippets, find_offsets, proximity_score  # noqa: E402
+from multi_pattern import expand_synonyms  # noqa: E402
+from pdf_extraction import extract_pages  # noqa: E402
+from segmented_corpus import SegmentedCorpus  # noqa: E402
+from text_normalization import normalize_pages  # noqa: E402
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "jsbgocrc4.pdf")
+
+QUERIES = [
+    "유방암 가족력 위험",
+    "결장암 직계 혈족 검사",
+    "관상동맥 질환 아버지",
+    "두통 어지럼증 원인",
+    "혈압 약 복용 시간",
+    "변비 설사 혈변",
+    "당뇨 식이요법",
+    "알츠하이머병 치료",
+]
+
+CONFIGS = [
+    ("보험 비교 (2500/500, 상위 15)", 2500, 500, 15, "frequency"),
+    ("홈 닥터 (1000/0, 상위 10)", 1000, 0, 10, "presence"),
+]
+
+
+def keywords(query):
+    words = [word.lower() for word in query.split() if len(word) > 1]
+    return words + [w for w in expand_synonyms(query.lower().split()) if len(w) > 1 and w not in words]
+
+
+def hits(text, terms):
+    return sum(len(starts) for starts in find_offsets(text, terms).values())
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    pages, _ = extract_pages(path)
+    text = normalize_pages(pages).text
+    print(f"문서: {os.path.basename(path)} ({len(text):,}자), 질문 {len(QUERIES)}개")
+
+    for label, chunk_size, overlap, k, weighting in CONFIGS:
+        corpus = SegmentedCorpus(chunk_size=chunk_size, overlap=overlap)
+        corpus.add_document("doc", "doc.pdf", text)
+        print(f"\n[{label}]")
+
+        # 근접도 재점수화
+        changed = 0
+        plain_time = prox_time = 0.0
+        plain_prox = boosted_prox = 0.0
+        for query in QUERIES:
+            terms = keywords(query)
+            start = time.perf_counter()
+            plain = corpus.rank(terms, k, weighting)
+            plain_time += time.perf_counter() - start
+            start = time.perf_counter()
+            boosted = corpus.rank(terms, k, weighting, proximity=True)
+            prox_time += time.perf_counter() - start
+            changed += [span for *_, span in plain[:5]] != [span for *_, span in boosted[:5]]
+            plain_prox += sum(proximity_score(find_offsets(c, terms)) for _, _, c, _ in plain[:5]) / 5
+            boosted_prox += sum(proximity_score(find_offsets(c, terms)) for _, _, c, _ in boosted[:5]) / 5
+        n = len(QUERIES)
+        print(f"  근접도 재점수화: 상위 5개가 바뀐 질문 {changed}/{n}, 상위 5개 평균 근접도 "
+              f"{plain_prox / n:.2f} → {boosted_prox / n:.2f}, 검색 {plain_time / n * 1000:.1f}ms → "
+              f"{prox_time / n * 1000:.1f}ms")
+
+        # 프롬프트 크기 / 보존율
+        rows = []
+        for query in QUERIES:
+            terms = keywords(query)
+            chunks = [chunk for _, _, chunk, _ in corpus.rank(terms, k, weighting, proximity=True)]
+            rows.append((terms, chunks))
+        whole_chars = sum(len(c) for _, chunks in rows for c in chunks)
+        whole_hits = sum(hits(c, terms) for terms, chunks in rows for c in chunks)
+        print(f"  {'청크 전체':<12} {whole_chars:>9,}자  검색어 {whole_hits:>5}회  밀도 {whole_hits / whole_chars * 1000:5.2f}/1000자")
+        for padding in (0, 1, 2):
+            start = time.perf_counter()
+            snippets = [[extract_snippets(c, terms, padding) for c in chunks] for terms, chunks in rows]
+            elapsed = time.perf_counter() - start
+            chars = sum(len(s) for query_snippets in snippets for s in query_snippets)
+            kept = sum(hits(s, terms) for (terms, _), query_snippets in zip(rows, snippets) for s in query_snippets)
+            print(f"  {'앞뒤 ' + str(padding) + '문장':<12} {chars:>9,}자 ({chars / whole_chars:5.1%})  "
+                  f"검색어 {kept:>5}회 ({kept / whole_hits:.0%})  밀도 {kept / chars * 1000:5.2f}/1000자  "
+                  f"추출 {elapsed / n * 1000:.1f}ms/질문")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+시작 시간 벤치마크 (진입점별)
+- 가져오기: 스크립트 맨 위 import 문만 새 프로세스에서 실행한 시간 (-X importtime 과 같은 콜드 상태)
+- 첫 화면: AppTest 로 스크립트를 처음 한 번 실행하는 데 걸린 시간 (파일을 올리기 전 빈 화면까지)
+- 무거운 모듈: 첫 화면 실행 직후 불러와 있는 것 (google.generativeai, pandas, numpy, scipy, pypdfium2)
+- 모델 준비: 첫 질문에서 모델 객체를 얻는 시간 (예열 없이 vs 백그라운드 예열 후)
+- 각 측정은 새 파이썬 프로세스에서 (이미 불러온 모듈 캐시 영향 없음)
+
+사용법: python benchmarks/bench_startup.py [반복 횟수]
+  GEMINI_API_KEY 가 있으면 모델 준비에 연결 예열(count_tokens)까지 포함
+"""
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+ENTRY_POINTS = ["app.py", "insurance_analyzer_improved.py"]
+
+HEAVY_MODULES = ["google.generativeai", "pandas", "numpy", "scipy", "pypdfium2"]
+
+IMPORTS_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<imports>", "exec"), {})
+print(time.perf_counter() - start)
+"""
+
+FIRST_PAINT_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.secrets["GEMINI_API_KEY"] = "bench-key"
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+                  "errors": [str(e.value)[:80] for e in at.exception]}))
+"""
+
+MODEL_SNIPPET = """
+import json, os, sys, time
+from model_clients import ModelClients
+warm = sys.argv[1] == "warm"
+key = os.environ.get("GEMINI_API_KEY", "bench-key")
+clients = ModelClients(key, ["gemini-1.5-flash"], warm_connection="GEMINI_API_KEY" in os.environ)
+if warm:
+    clients.start()
+    clients.wait_ready()
+start = time.perf_counter()
+clients.model("gemini-1.5-flash")
+print(json.dumps({"seconds": time.perf_counter() - start, "timings": clients.timings}))
+"""
+
+
+def top_level_imports(path):
+    """스크립트 맨 위(모듈 수준) import 문 (실행 순서대로, 첫 st.stop() 전까지)"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node))
+        elif "st.stop()" in ast.unparse(node):
+            break
+    return "\n".join(lines)
+
+
+def run(snippet, *args):
+    result = subprocess.run([sys.executable, "-c", snippet, *args], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def median_ms(values):
+    return f"{statistics.median(values) * 1000:8.0f}ms"
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"파이썬 {sys.version.split()[0]}, 반복 {repeat}회 중앙값")
+
+    for entry in ENTRY_POINTS:
+        path = os.path.join(ROOT, entry)
+        imports = top_level_imports(path)
+        import_times = [float(run(IMPORTS_SNIPPET, imports)) for _ in range(repeat)]
+        paints = [json.loads(run(FIRST_PAINT_SNIPPET, path, json.dumps(HEAVY_MODULES))) for _ in range(repeat)]
+        print(f"\n[{entry}]")
+        print(f"  맨 위 import  {median_ms(import_times)}")
+        print(f"  첫 화면       {median_ms([p['seconds'] for p in paints])}")
+        print(f"  첫 화면 뒤 불러온 무거운 모듈 (백그라운드 예열 포함): {', '.join(paints[0]['loaded']) or '없음'}")
+        if paints[0]["errors"]:
+            print(f"  스크립트 오류: {paints[0]['errors']}")
+
+    print("\n[첫 질문 모델 준비]")
+    for mode, label in (("cold", "예열 없이"), ("warm", "예열 후")):
+        samples = [json.loads(run(MODEL_SNIPPET, mode)) for _ in range(repeat)]
+        timings = samples[0]["timings"]
+        detail = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+        print(f"  {label:<8} {median_ms([s['seconds'] for s in samples])}  (예열 단계: {detail or '-'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+업로드 처리 메모리 벤치마크
+- 여러 파일(기본 합계 200 MB)을 업로드 받아 해시 계산 + 텍스트 디코딩 + 줄 수 계산까지 할 때의 최대 메모리(RSS)
+- 경로마다 별도 프로세스에서 실행해 최대 RSS 를 따로 잼
+  - 앱 (이전): getvalue() → 디코딩 → split('\\n') 으로 줄 수 계산 (줄마다 문자열 생성)
+  - 앱 (현재): from_uploaded_file() → upload.text() → count('\\n')
+  - 서비스 (이전): HTTP 본문 전체를 read() 한 뒤 같은 처리
+  - 서비스 (현재): from_stream() 으로 블록 단위 읽기 + 해시, 큰 본문은 임시 파일로
+- 업로드 버퍼 자체(브라우저에서 받은 바이트)는 앱 경로에서 두 방식 모두 메모리에 있으므로 기준선으로 따로 표시
+
+사용법: python benchmarks/bench_uploads.py [합계 MB] [파일 수]
+"""
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from dense_retrieval import file_hash  # noqa: E402
+from upload_ingest import from_stream, from_uploaded_file  # noqa: E402
+
+LINE = "제{n}조 (보험금의 지급사유) 회사는 피보험자에게 다음 중 어느 하나의 사유가 발생한 경우에는 보험금을 지급합니다.\n"
+
+
+class FakeUpload(io.BytesIO):
+    """Streamlit UploadedFile 과 같은 형태 (BytesIO + name/size)"""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def write_files(workdir, total_mb, count):
+    paths = []
+    per_file = total_mb * 1024 * 1024 // count
+    for i in range(count):
+        path = os.path.join(workdir, f"policy-{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            written, n = 0, 0
+            while written < per_file:
+                line = LINE.format(n=n)
+                f.write(line)
+                written += len(line.encode("utf-8"))
+                n += 1
+        paths.append(path)
+    return paths
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def app_baseline(paths):
+    uploads = [FakeUpload(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    return len(uploads)
+
+
+def app_old(paths):
+    uploads = [FakeUpload(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    lines = 0
+    for uploaded_file in uploads:
+        file_bytes = uploaded_file.getvalue()
+        file_hash(file_bytes)
+        raw_text = file_bytes.decode("utf-8")
+        lines += len(raw_text.split("\n"))
+    return lines
+
+
+def app_new(paths):
+    uploads = [FakeUpload(os.path.basename(p), open(p, "rb").read()) for p in paths]
+    lines = 0
+    for uploaded_file in uploads:
+        upload = from_uploaded_file(uploaded_file)
+        raw_text = upload.text()
+        lines += raw_text.count("\n") + 1
+    return lines
+
+
+def service_old(paths):
+    lines = 0
+    for path in paths:
+        with open(path, "rb") as body:
+            data = body.read(os.path.getsize(path))
+        file_hash(data)
+        lines += len(data.decode("utf-8").split("\n"))
+    return lines
+
+
+def service_new(paths):
+    lines = 0
+    for path in paths:
+        with open(path, "rb") as body, from_stream(os.path.basename(path), body, os.path.getsize(path)) as upload:
+            lines += upload.text().count("\n") + 1
+    return lines
+
+
+def run(target, paths, queue):
+    start = time.perf_counter()
+    result = target(paths)
+    queue.put((result, time.perf_counter() - start, peak_mb()))
+
+
+def main():
+    total_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workdir = tempfile.mkdtemp(prefix="bench-uploads-")
+    try:
+        paths = write_files(workdir, total_mb, count)
+        size = sum(os.path.getsize(p) for p in paths) / 1024 / 1024
+        print(f"업로드: 텍스트 파일 {count}개, 합계 {size:.0f} MB")
+        results = {}
+        for label, target in [
+            ("앱 기준선 (업로드 버퍼만)", app_baseline),
+            ("앱 (이전)", app_old),
+            ("앱 (현재)", app_new),
+            ("서비스 (이전)", service_old),
+            ("서비스 (현재)", service_new),
+        ]:
+            queue = multiprocessing.Queue()
+            proc = multiprocessing.Process(target=run, args=(target, paths, queue))
+            proc.start()
+            results[label] = queue.get()
+            proc.join()
+            result, seconds, peak = results[label]
+            print(f"  {label:<18} 최대 RSS {peak:8,.0f} MB  {seconds:6.2f}초")
+        assert results["앱 (이전)"][0] == results["앱 (현재)"][0] == results["서비스 (이전)"][0] \
+            == results["서비스 (현재)"][0], "줄 수가 다름"
+        print(f"  줄 수 일치 ({results['앱 (현재)'][0]:,}줄)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+골든셋 검색 평가 (품질 vs 지연)
+- 골든셋(benchmarks/golden/v<버전>.json): 질문 + 답의 근거 구간(본문의 정확한 부분 문자열)
+  - 백과사전(jsbgocrc4.pdf)과 보험사 3곳 샘플 약관(benchmarks/golden/*.txt)
+  - 근거 구간이 본문에 없으면 바로 실패 (추출/정규화가 바뀌어 골든셋이 낡은 경우)
+- 검색 엔진마다 같은 질문을 돌려서 나란히 비교 (앱의 검색 함수를 그대로 호출)
+  - recall@5 / @10 / @k(엔진 기본 깊이): 상위 결과에 들어간 근거 구간 비율
+  - MRR: 근거 구간이 처음 나온 순위의 역수 평균
+  - 토큰: 모델에 보내는 컨텍스트의 추정 토큰 수 (질문 평균)
+  - 지연: 첫 질문(검색어 색인 전) 평균, 반복 질문 p50/p95
+- 새 검색 방식을 평가하려면 ENGINES 에 (이름, 기본 깊이, 준비 함수) 를 추가
+  준비 함수: 문서 [(파일명, 텍스트)] → 검색 함수(질문 → 순위대로 모델에 보내는 텍스트 조각 목록)
+
+사용법: python benchmarks/eval_golden.py [골든셋 경로] [반복 횟수]
+"""
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from adaptive_depth import percentile  # noqa: E402
+from dense_retrieval import HashingEmbedder  # noqa: E402
+from fts_store import FTSStore, FTSView  # noqa: E402
+from notebook_core import (  # noqa: E402
+    RELEVANT_SNIPPET_PADDING, build_volume_index, estimate_tokens, get_hybrid_context, get_relevant_content,
+    get_smart_context
+)
+from pdf_extraction import extract_pages  # noqa: E402
+from segmented_corpus import SegmentedCorpus  # noqa: E402
+from sparse_retrieval import ChunkTermIndex, split_into_chunks  # noqa: E402
+from text_normalization import normalize_pages, normalize_text  # noqa: E402
+
+DEFAULT_GOLDEN = os.path.join(ROOT, "benchmarks", "golden", "v1.json")
+
+RECALL_AT = (5, 10)
+WHITESPACE = re.compile(r"\s+")
+
+
+def squash(text):
+    """공백 무시 비교용 (적중 구간 사이 구분자/줄바꿈 차이 흡수)"""
+    return WHITESPACE.sub("", text)
+
+
+def load_document(path):
+    if path.lower().endswith(".pdf"):
+        pages, _ = extract_pages(path)
+        return normalize_pages(pages).text
+    with open(path, encoding="utf-8") as f:
+        return normalize_text(f.read()).text
+
+
+# ==========================================
+# 검색 엔진 (앱의 검색 함수와 같은 설정)
+# ==========================================
+
+CONTEXT_SEPARATOR = "\n\n━━━━━━━━━━━━━━━━━━\n\n"  # format_context 의 청크 구분자
+RELEVANT_SEPARATOR = "\n...\n"  # get_relevant_content 의 청크 구분자
+
+
+def smart_context(synonyms=False, snippet_padding=None, hybrid=False, fts=False):
+    """app.py get_smart_context / get_hybrid_context (세션 코퍼스 또는 FTS5 저장소, 상위 15개)"""
+    def prepare(documents):
+        if fts:
+            path = os.path.join(tempfile.mkdtemp(prefix="golden-fts-"), "corpus.sqlite3")
+            store = FTSStore(path, chunk_size=2500, overlap=500)
+            for name, text in documents:
+                store.add_document(name, name, text)
+            corpus = FTSView(store, [name for name, _ in documents])
+        else:
+            corpus = SegmentedCorpus(chunk_size=2500, overlap=500, dedup=True)
+            for name, text in documents:
+                corpus.add_document(name, name, text)
+            if hybrid:
+                corpus.enable_dense(HashingEmbedder())
+        get_context = get_hybrid_context if hybrid else get_smart_context
+
+        def search(query):
+            context, _ = get_context(corpus, query, max_chunks=15, synonyms=synonyms,
+                                     snippet_padding=snippet_padding)
+            return context.split(CONTEXT_SEPARATOR) if context else []
+        return search
+    return prepare
+
+
+def relevant_content(snippet_padding=RELEVANT_SNIPPET_PADDING):
+    """홈 닥터 get_relevant_content (권별 샤드, 1000자, 포함 수 점수 + 근접도, 상위 10개)"""
+    def prepare(documents):
+        volumes = tuple(documents)
+        build_volume_index(volumes)  # 색인 시간에 포함 (앱은 자료가 바뀔 때 한 번 만듦)
+
+        def search(query):
+            content = get_relevant_content(volumes, query, snippet_padding=snippet_padding)
+            return content.split(RELEVANT_SEPARATOR) if content else []
+        return search
+    return prepare
+
+
+def merged_relevant(documents):
+    """홈 닥터 이전 방식 (권을 합친 색인 하나, 근접도/문장 추출 없음)"""
+    index = ChunkTermIndex(split_into_chunks("".join(text for _, text in documents), 1000, skip_blank=False),
+                           lowercase=False)
+
+    def search(query):
+        rows, _ = index.rank(query.split(), 10, weighting="presence")
+        return [index.chunks[row] for row in rows.tolist()]
+    return search
+
+
+ENGINES = [
+    ("get_smart_context", 15, smart_context()),
+    ("get_smart_context +동의어", 15, smart_context(synonyms=True)),
+    ("get_smart_context +문장", 15, smart_context(snippet_padding=1)),
+    ("get_hybrid_context", 15, smart_context(hybrid=True)),
+    ("FTS5 저장소", 15, smart_context(fts=True)),
+    ("get_relevant_content", 10, relevant_content()),
+    # 앞뒤 문장을 끝없이 붙이면 청크 전체
+    ("get_relevant_content 청크 전체", 10, relevant_content(snippet_padding=sys.maxsize)),
+    ("get_relevant_content 이전(합친 색인)", 10, merged_relevant),
+]
+
+
+# ==========================================
+# 지표
+# ==========================================
+
+def judge(pieces, passages):
+    """근거 구간별 처음 나온 순위 (1부터, 없으면 None)"""
+    squashed = [squash(piece) for piece in pieces]
+    ranks = []
+    for passage in passages:
+        target = squash(passage)
+        ranks.append(next((i + 1 for i, piece in enumerate(squashed) if target in piece), None))
+    return ranks
+
+
+def recall_at(ranks, k):
+    return sum(1 for r in ranks if r is not None and r <= k) / len(ranks)
+
+
+def reciprocal_rank(ranks):
+    found = [r for r in ranks if r is not None]
+    return 1 / min(found) if found else 0.0
+
+
+def evaluate(prepare, depth, documents, questions, repeat):
+    start = time.perf_counter()
+    search = prepare(documents)
+    build = time.perf_counter() - start
+
+    rows = {"recall": {k: [] for k in RECALL_AT + (depth,)}, "mrr": [], "tokens": [], "cold": [], "warm": []}
+    for question in questions:
+        start = time.perf_counter()
+        pieces = search(question["query"])
+        rows["cold"].append(time.perf_counter() - start)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search(question["query"])
+            rows["warm"].append(time.perf_counter() - start)
+
+        ranks = judge(pieces, question["passages"])
+        for k in rows["recall"]:
+            rows["recall"][k].append(recall_at(ranks, k))
+        rows["mrr"].append(reciprocal_rank(ranks))
+        rows["tokens"].append(estimate_tokens("\n\n".join(pieces)))
+    return {
+        "build_ms": build * 1000,
+        "recall": {k: statistics.mean(v) for k, v in rows["recall"].items()},
+        "mrr": statistics.mean(rows["mrr"]),
+        "tokens": statistics.mean(rows["tokens"]),
+        "cold_ms": statistics.mean(rows["cold"]) * 1000,
+        "p50_ms": percentile(rows["warm"], 0.5) * 1000,
+        "p95_ms": percentile(rows["warm"], 0.95) * 1000,
+    }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_GOLDEN
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+    print(f"골든셋 v{golden['version']} ({os.path.basename(path)}): 질문 {len(golden['questions'])}개, 반복 {repeat}회")
+
+    for corpus_name, files in golden["corpora"].items():
+        documents = [(os.path.basename(file), load_document(os.path.join(ROOT, file))) for file in files]
+        questions = [q for q in golden["questions"] if q["corpus"] == corpus_name]
+        full = squash("".join(text for _, text in documents))
+        missing = [(q["id"], p) for q in questions for p in q["passages"] if squash(p) not in full]
+        if missing:
+            raise SystemExit(f"골든셋 근거 구간이 본문에 없음 ({corpus_name}): {missing}")
+
+        chars = sum(len(text) for _, text in documents)
+        print(f"\n[{corpus_name}] 문서 {len(documents)}개 ({chars:,}자), 질문 {len(questions)}개")
+        header = (f"  {'엔진':<34} {'R@5':>5} {'R@10':>5} {'R@k':>9} {'MRR':>5} {'토큰':>7} "
+                  f"{'색인':>8} {'첫 질문':>8} {'p50':>7} {'p95':>7}")
+        print(header)
+        for name, depth, prepare in ENGINES:
+            result = evaluate(prepare, depth, documents, questions, repeat)
+            recall = result["recall"]
+            print(f"  {name:<34} {recall[5]:5.2f} {recall[10]:5.2f} {recall[depth]:5.2f}@{depth:<3} "
+                  f"{result['mrr']:5.2f} {result['tokens']:7,.0f} {result['build_ms']:6.0f}ms "
+                  f"{result['cold_ms']:6.1f}ms {result['p50_ms']:5.1f}ms {result['p95_ms']:5.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+블록 압축 텍스트 (구간 단위 임의 읽기)
+- 문서 본문을 BLOCK_CHARS 글자씩 잘라 블록마다 따로 압축
+  (zstandard 가 설치되어 있으면 zstd, 없으면 표준 라이브러리 zlib)
+- 블록 위치는 글자 오프셋으로 바로 계산 (블록 i = 글자 [i × BLOCK_CHARS, (i + 1) × BLOCK_CHARS))
+  → 구간을 읽을 때 그 구간이 걸친 블록만 풀면 됨 (문서 전체를 풀지 않음)
+- 푼 블록은 작은 LRU (BlockCache) 에 두고 같은 블록의 다른 구간/반복 질문에 재사용
+- 블록 저장 위치는 쓰는 쪽이 정함 (FTSStore: blocks 테이블의 (문서, 블록 번호) 행)
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from importlib.util import find_spec
+
+# 블록 하나의 글자 수 (한글 UTF-8 약 48KB, 2500자 청크는 블록 1~2개에 걸침)
+BLOCK_CHARS = 16384
+
+# 압축 수준 (적재할 때 한 번만 압축하므로 풀기 속도가 같은 범위에서 높게)
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+
+# 푼 블록 LRU 크기 (블록 수)
+CACHE_BLOCKS = 256
+
+_HAS_ZSTD = find_spec("zstandard") is not None
+
+# NOTEBOOK_AI_BLOCK_CODEC 로 새로 쓰는 블록의 압축 방식 지정 (zstd | zlib)
+DEFAULT_CODEC = os.environ.get("NOTEBOOK_AI_BLOCK_CODEC", "zstd" if _HAS_ZSTD else "zlib")
+
+_zstd_local = threading.local()  # zstd 압축/해제 객체는 스레드 안전하지 않음 (스레드마다 하나)
+
+
+def _zstd():
+    coders = getattr(_zstd_local, "coders", None)
+    if coders is None:
+        import zstandard
+
+        coders = (zstandard.ZstdCompressor(level=ZSTD_LEVEL), zstandard.ZstdDecompressor())
+        _zstd_local.coders = coders
+    return coders
+
+
+def compress(data, codec=DEFAULT_CODEC):
+    if codec == "zstd":
+        return _zstd()[0].compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"지원하지 않는 압축 방식: {codec}")
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if not _HAS_ZSTD:
+            raise RuntimeError("zstd 로 압축된 블록입니다: zstandard 를 설치하세요")
+        return _zstd()[1].decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"지원하지 않는 압축 방식: {codec}")
+
+
+def compress_blocks(text, block_chars=BLOCK_CHARS, codec=DEFAULT_CODEC):
+    """본문 → 블록별 압축 바이트 목록 (블록 번호 순)"""
+    return [compress(text[i:i + block_chars].encode("utf-8"), codec) for i in range(0, len(text), block_chars)]
+
+
+def block_range(start, end, block_chars=BLOCK_CHARS):
+    """글자 구간 [start, end) 가 걸친 블록 번호 range"""
+    if end <= start:
+        return range(0)
+    return range(start // block_chars, (end - 1) // block_chars + 1)
+
+
+class BlockCache:
+    """
+    (문서 키, 블록 번호) → 푼 블록 텍스트 LRU
+    - 문서 키는 내용 해시라 같은 키의 블록 내용은 바뀌지 않음 (무효화 불필요)
+    - 여러 스레드에서 함께 써도 됨
+    """
+
+    def __init__(self, max_blocks=CACHE_BLOCKS):
+        self.max_blocks = max_blocks
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def get(self, key):
+        with self._lock:
+            text = self._blocks.get(key)
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._blocks.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._blocks[key] = text
+            self._blocks.move_to_end(key)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.hits = self.misses = 0
+
+
+def read_span(doc_key, start, end, load_blocks, cache, codec, block_chars=BLOCK_CHARS):
+    """
+    문서의 글자 구간 [start, end)
+    - 캐시에 없는 블록만 load_blocks(블록 번호 목록) → {블록 번호: 압축 바이트} 로 읽어 풀기
+    """
+    numbers = block_range(start, end, block_chars)
+    texts = {number: cache.get((doc_key, number)) for number in numbers}
+    missing = [number for number, text in texts.items() if text is None]
+    if missing:
+        for number, data in load_blocks(missing).items():
+            texts[number] = decompress(data, codec).decode("utf-8")
+            cache.put((doc_key, number), texts[number])
+    if not numbers:
+        return ""
+    offset = numbers[0] * block_chars
+    return "".join(texts[number] for number in numbers)[start - offset:end - offset]
@@ -0,0 +1,206 @@
+"""
+보험사 간 공통 조항(표준약관) 중복 검출
+- 문서를 조항(제N조) 단위로 나누고 글자 5-그램 shingle 의 MinHash 서명 계산
+- LSH 밴드로 후보를 찾고, 추정 Jaccard 유사도가 임계값 이상이면 같은 조항으로 묶음
+- 같은 조항은 한 번만 저장 (서명, 제목) + 그 조항을 가진 문서 목록
+- 검색 시 다른 파일에서 이미 뽑힌 공통 조항 청크는 건너뛰고,
+  남은 한 부가 그 조항을 가진 보험사 전체를 표시하도록 함
+"""
+import re
+import threading
+
+import numpy as np
+
+# 조항 머리 (정리된 텍스트에서는 줄 맨 앞에 옴)
+SECTION_RE = re.compile(r"^\s*제\s*\d+\s*조(?:\s*의\s*\d+)?", re.MULTILINE)
+
+# 이보다 짧은 조항은 중복 검출 대상에서 제외 (제목만 있는 줄 등)
+MIN_SECTION_CHARS = 200
+
+# 조항 머리가 없는 문서는 줄 단위로 이 길이 이상씩 묶음
+FALLBACK_BLOCK_CHARS = 800
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def split_sections(text, min_chars=MIN_SECTION_CHARS):
+    """
+    조항 구간 목록 [(시작, 끝)]
+    - 조항 머리(제N조)가 있으면 머리 단위, 없으면 줄 단위로 묶은 블록
+    - min_chars 보다 짧은 구간은 제외
+    """
+    starts = [m.start() for m in SECTION_RE.finditer(text)]
+    if starts:
+        bounds = ([0] if starts[0] > 0 else []) + starts + [len(text)]
+    else:
+        bounds = [0]
+        for m in re.finditer(r"\n", text):
+            if m.end() - bounds[-1] >= FALLBACK_BLOCK_CHARS:
+                bounds.append(m.end())
+        if bounds[-1] != len(text):
+            bounds.append(len(text))
+    return [(s, e) for s, e in zip(bounds, bounds[1:]) if len(text[s:e].strip()) >= min_chars]
+
+
+def section_title(text, limit=40):
+    """조항의 첫 줄 (표시용)"""
+    line = text.strip().split("\n", 1)[0]
+    return line if len(line) <= limit else line[:limit].rstrip() + "…"
+
+
+def _mix64(x):
+    """splitmix64 마무리 (uint64 배열)"""
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (x ^ (x >> np.uint64(31))) & _MASK64
+
+
+class MinHasher:
+    """글자 k-그램 shingle MinHash (공백 무시)"""
+
+    def __init__(self, num_perm=64, shingle_size=5, seed=7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seeds = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """shingle 해시 (중복 제거된 uint64 배열)"""
+        codes = np.frombuffer("".join(text.split()).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        k = self.shingle_size
+        if codes.size < k:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.zeros(codes.size - k + 1, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for j in range(k):
+                hashes = hashes * np.uint64(1000003) + codes[j:codes.size - k + 1 + j]
+        return np.unique(hashes)
+
+    def signature(self, text):
+        """MinHash 서명 (shingle 이 없으면 None)"""
+        shingles = self.shingles(text)
+        if not shingles.size:
+            return None
+        return _mix64(shingles[None, :] ^ self.seeds[:, None]).min(axis=1)
+
+
+def similarity(a, b):
+    """두 서명의 추정 Jaccard 유사도"""
+    return float(np.mean(a == b))
+
+
+class ClauseIndex:
+    """
+    조항 클러스터 저장소 (코퍼스 전체에서 하나)
+    - clusters: 클러스터 ID → {"signature", "title", "members": {문서 키: 파일명}}
+    - LSH: 서명을 bands 개 밴드로 나눠 버킷에 넣고, 같은 버킷 후보만 유사도 비교
+    """
+
+    def __init__(self, hasher=None, bands=16, threshold=0.8, min_chars=MIN_SECTION_CHARS):
+        self.hasher = hasher or MinHasher()
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.clusters = {}
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature):
+        return [(b, signature[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+    def _find(self, signature):
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        best, best_sim = None, self.threshold
+        for cid in sorted(candidates):
+            sim = similarity(signature, self.clusters[cid]["signature"])
+            if sim >= best_sim:
+                best, best_sim = cid, sim
+        return best
+
+    def assign(self, key, name, text):
+        """
+        문서의 조항을 클러스터에 배정
+        - 반환: [(시작, 끝, 클러스터 ID)] (문서 내 조항 위치)
+        """
+        sections = []
+        for start, end in split_sections(text, self.min_chars):
+            signature = self.hasher.signature(text[start:end])
+            if signature is not None:
+                sections.append((start, end, signature))
+
+        spans = []
+        with self._lock:
+            for start, end, signature in sections:
+                cid = self._find(signature)
+                if cid is None:
+                    cid = self._next_id
+                    self._next_id += 1
+                    self.clusters[cid] = {
+                        "signature": signature,
+                        "title": section_title(text[start:end]),
+                        "members": {},
+                    }
+                    for band_key in self._band_keys(signature):
+                        self._buckets.setdefault(band_key, set()).add(cid)
+                self.clusters[cid]["members"][key] = name
+                spans.append((start, end, cid))
+        return spans
+
+    def drop_documents(self, keys):
+        """문서 삭제 반영 (구성원이 없어진 클러스터는 제거)"""
+        keys = set(keys)
+        with self._lock:
+            for cid in list(self.clusters):
+                members = self.clusters[cid]["members"]
+                for key in keys & set(members):
+                    del members[key]
+                if not members:
+                    for band_key in self._band_keys(self.clusters[cid]["signature"]):
+                        bucket = self._buckets.get(band_key)
+                        if bucket is not None:
+                            bucket.discard(cid)
+                            if not bucket:
+                                del self._buckets[band_key]
+                    del self.clusters[cid]
+
+    def shared_members(self, cid, exclude_key, tombstones=frozenset()):
+        """클러스터를 가진 다른 (살아 있는) 문서 {키: 파일명}"""
+        cluster = self.clusters.get(cid)
+        if cluster is None:
+            return {}
+        return {
+            key: name for key, name in cluster["members"].items()
+            if key != exclude_key and key not in tombstones
+        }
+
+    def shared_clusters(self, tombstones=frozenset()):
+        """두 개 이상 문서가 가진 클러스터 [(제목, 파일명 목록)] (구성원 많은 순)"""
+        with self._lock:
+            shared = []
+            for cluster in self.clusters.values():
+                names = [name for key, name in cluster["members"].items() if key not in tombstones]
+                if len(names) > 1:
+                    shared.append((cluster["title"], names))
+        shared.sort(key=lambda item: -len(item[1]))
+        return shared
+
+
+def chunk_clauses(spans, chunk_spans, min_overlap=MIN_SECTION_CHARS):
+    """
+    청크별 조항 겹침 [(클러스터 ID, 겹친 글자 수), ...]
+    - 조항 전체가 들어 있거나 min_overlap 글자 이상 겹친 조항만
+    """
+    result = []
+    for chunk_start, chunk_end in chunk_spans:
+        overlaps = []
+        for start, end, cid in spans:
+            chars = min(end, chunk_end) - max(start, chunk_start)
+            if chars > 0 and (chars >= min_overlap or chars == end - start):
+                overlaps.append((cid, chars))
+        result.append(tuple(overlaps))
+    return result
@@ -0,0 +1,287 @@
+"""
+Gemini 명시적 컨텍스트 캐싱 (cached content + TTL)
+- 질문마다 반복되는 정적 참고 자료(백과사전/업로드 문서)를 캐시로 한 번만 올림
+- 모델별로 캐시 핸들과 만료 시각을 추적하고 만료 직전에 TTL 연장
+- 캐싱을 못 쓰는 모델/자료는 기억해 두고 일반 프롬프트로 깔끔하게 폴백
+- 캐시 생성/연장(네트워크 호출)은 관리자 락 밖에서, 같은 자료는 한 요청만 만들고 나머지는 기다림
+- 테스트용 로컬 대체 백엔드(LocalCacheBackend) 제공
+"""
+import hashlib
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+
+from text_normalization import estimate_tokens
+
+# 캐시를 만들 수 있는 최소 토큰 수 (Gemini 1.5 기준)
+MIN_CACHE_TOKENS = 32768
+
+# 캐시 생성을 지원하는 (버전 고정) 모델
+CACHEABLE_MODELS = [
+    "gemini-1.5-flash-002",
+    "gemini-1.5-flash-001",
+]
+
+
+class CacheUnavailable(Exception):
+    """캐싱을 쓸 수 없는 경우 (호출 측은 일반 프롬프트로 폴백)"""
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class CacheHandle:
+    """
+    캐시 하나의 핸들 (백엔드 이름, 모델, 만료 시각)
+    - resource: 백엔드의 캐시 객체 (Gemini 는 CachedContent, 질문마다 다시 조회하지 않음)
+    """
+
+    def __init__(self, name, model_name, prefix_hash, expire_time, token_count=0, resource=None):
+        self.name = name
+        self.model_name = model_name
+        self.prefix_hash = prefix_hash
+        self.expire_time = expire_time
+        self.token_count = token_count
+        self.resource = resource
+        self.hits = 0
+
+
+class GeminiCacheBackend:
+    """google.generativeai 의 caching.CachedContent 사용"""
+
+    def create(self, model_name, system_instruction, prefix_text, ttl):
+        """→ (이름, 만료 시각, 토큰 수, CachedContent)"""
+        from google.generativeai import caching
+
+        cached = caching.CachedContent.create(
+            model=f"models/{model_name}",
+            system_instruction=system_instruction,
+            contents=[prefix_text],
+            ttl=ttl,
+        )
+        token_count = getattr(getattr(cached, "usage_metadata", None), "total_token_count", 0)
+        return cached.name, cached.expire_time, token_count, cached
+
+    def extend(self, handle, ttl):
+        handle.resource.update(ttl=ttl)
+        return handle.resource.expire_time
+
+    def generate(self, handle, prompt, generation_config=None):
+        import google.generativeai as genai
+
+        model = genai.GenerativeModel.from_cached_content(
+            cached_content=handle.resource,
+            generation_config=generation_config,
+        )
+        response = model.generate_content(prompt)
+        return response.text
+
+    def delete(self, handle):
+        handle.resource.delete()
+
+    def should_back_off(self, error):
+        """캐시가 서버에 없거나(404) 할당량 초과(429)면 True (일시 오류는 바로 다시 시도)"""
+        from google.api_core import exceptions
+
+        return isinstance(error, (exceptions.NotFound, exceptions.ResourceExhausted))
+
+
+class LocalCacheBackend:
+    """
+    캐싱 API 를 흉내내는 로컬 대체 백엔드 (테스트/개발용)
+    - generate_fn(prompt) 에 캐시된 자료 + 질문을 합쳐서 전달
+    """
+
+    def __init__(self, generate_fn=None, min_tokens=0):
+        self.generate_fn = generate_fn or (lambda prompt: f"[local] {len(prompt)}자 프롬프트")
+        self.min_tokens = min_tokens
+        self.contents = {}
+        self.calls = {"create": 0, "extend": 0, "generate": 0, "delete": 0}
+        self._ids = itertools.count(1)
+
+    def create(self, model_name, system_instruction, prefix_text, ttl):
+        tokens = estimate_tokens(prefix_text)
+        if tokens < self.min_tokens:
+            raise ValueError(f"캐시 최소 토큰 수 미달: {tokens}")
+        self.calls["create"] += 1
+        name = f"cachedContents/local-{next(self._ids)}"
+        self.contents[name] = (system_instruction, prefix_text, _now() + ttl)
+        return name, self.contents[name][2], tokens, name
+
+    def extend(self, handle, ttl):
+        self.calls["extend"] += 1
+        system_instruction, prefix_text, _ = self.contents[handle.resource]
+        self.contents[handle.resource] = (system_instruction, prefix_text, _now() + ttl)
+        return self.contents[handle.resource][2]
+
+    def generate(self, handle, prompt, generation_config=None):
+        name = handle.resource
+        if name not in self.contents or self.contents[name][2] <= _now():
+            raise KeyError(f"만료되었거나 없는 캐시: {name}")
+        self.calls["generate"] += 1
+        system_instruction, prefix_text, _ = self.contents[name]
+        return self.generate_fn(f"{system_instruction}\n{prefix_text}\n{prompt}")
+
+    def delete(self, handle):
+        self.calls["delete"] += 1
+        self.contents.pop(handle.resource, None)
+
+    def should_back_off(self, error):
+        return isinstance(error, KeyError)
+
+
+class ContextCacheManager:
+    """
+    정적 자료 캐시 관리자 (앱 전체에서 하나, 사용자 간 공유)
+    - (모델, 자료 해시) → 캐시 핸들
+    - 모델별 최대 max_per_model 개 유지, 밀려난 캐시는 삭제 (저장 비용 방지)
+    - 캐시 생성에 실패한 모델/자료는 retry_after 동안 다시 시도하지 않음
+    - 캐시로 생성하다 캐시가 없거나 할당량 초과면 그 모델을 retry_after 동안 쉼 (다른 오류는 캐시만 다시 만듦)
+    """
+
+    def __init__(self, backend, ttl=timedelta(minutes=30), refresh_margin=timedelta(minutes=3),
+                 min_tokens=MIN_CACHE_TOKENS, max_per_model=2, retry_after=timedelta(minutes=10)):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.max_per_model = max_per_model
+        self.retry_after = retry_after
+        self._handles = {}       # (모델, 자료 해시) → CacheHandle (생성 순서 유지)
+        self._failures = {}      # (모델, 자료 해시 또는 None) → 재시도 가능 시각
+        self._inflight = {}      # (모델, 자료 해시) → 생성/연장 중 표시 (끝나면 set)
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "creates": 0, "refreshes": 0, "fallbacks": 0}
+
+    @staticmethod
+    def prefix_hash(system_instruction, prefix_text):
+        digest = hashlib.sha256()
+        digest.update(system_instruction.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(prefix_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_cacheable(self, prefix_text):
+        return estimate_tokens(prefix_text) >= self.min_tokens
+
+    def _blocked(self, key):
+        until = self._failures.get(key)
+        return until is not None and until > _now()
+
+    def _evict(self, model_name):
+        """모델별 보관 개수 초과분과 만료된 핸들 정리 (락 안에서 호출) → 서버에서 지울 핸들 목록"""
+        now = _now()
+        for key, handle in list(self._handles.items()):
+            if handle.expire_time <= now:
+                del self._handles[key]
+        keys = [key for key in self._handles if key[0] == model_name]
+        return [self._handles.pop(key) for key in (keys[:-self.max_per_model] if len(keys) > self.max_per_model else [])]
+
+    def _delete(self, handles):
+        """서버 쪽 캐시 삭제 (락 밖에서, 실패는 무시 — TTL 이 지나면 어차피 사라짐)"""
+        for handle in handles:
+            try:
+                self.backend.delete(handle)
+            except Exception:
+                pass
+
+    def get_handle(self, model_name, system_instruction, prefix_text):
+        """
+        유효한 캐시 핸들 반환 (없으면 생성, 만료 임박이면 연장)
+        - 생성/연장 네트워크 호출 중에는 락을 잡지 않음 (다른 자료/모델 요청을 막지 않음)
+        - 같은 (모델, 자료) 를 이미 다른 요청이 만드는 중이면 끝날 때까지 기다렸다가 그 결과 사용
+        """
+        if not self.is_cacheable(prefix_text):
+            raise CacheUnavailable("캐시하기에 자료가 너무 짧습니다")
+
+        key = (model_name, self.prefix_hash(system_instruction, prefix_text))
+        while True:
+            with self._lock:
+                if self._blocked((model_name, None)) or self._blocked(key):
+                    raise CacheUnavailable(f"{model_name}: 캐시 재시도 대기 중")
+                handle = self._handles.get(key)
+                if handle is not None and handle.expire_time - _now() > self.refresh_margin:
+                    return handle
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = self._inflight[key] = threading.Event()
+                    break
+            inflight.wait()
+
+        # 이 요청이 생성/연장 담당 (락 밖)
+        stale = []
+        try:
+            if handle is not None:
+                try:
+                    expire_time = self.backend.extend(handle, self.ttl)
+                    with self._lock:
+                        handle.expire_time = expire_time
+                        self.stats["refreshes"] += 1
+                    return handle
+                except Exception:
+                    with self._lock:
+                        self._handles.pop(key, None)
+                    stale.append(handle)
+
+            try:
+                name, expire_time, token_count, resource = self.backend.create(
+                    model_name, system_instruction, prefix_text, self.ttl
+                )
+            except Exception as e:
+                with self._lock:
+                    self._failures[key] = _now() + self.retry_after
+                raise CacheUnavailable(f"{model_name}: 캐시 생성 실패 ({e})") from e
+
+            handle = CacheHandle(name, model_name, key[1], expire_time, token_count, resource)
+            with self._lock:
+                self._handles[key] = handle
+                self.stats["creates"] += 1
+                stale.extend(self._evict(model_name))
+            return handle
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.set()
+            self._delete(stale)
+
+    def generate(self, system_instruction, prefix_text, question, models=CACHEABLE_MODELS,
+                 generation_config=None):
+        """
+        캐시된 자료 + 질문으로 응답 생성
+        - 반환: (응답 텍스트, 모델명, 캐시 핸들)
+        - 모든 모델에서 캐싱이 안 되면 CacheUnavailable
+        """
+        last_error = None
+        for model_name in models:
+            try:
+                handle = self.get_handle(model_name, system_instruction, prefix_text)
+            except CacheUnavailable as e:
+                last_error = e
+                continue
+            try:
+                text = self.backend.generate(handle, question, generation_config)
+            except Exception as e:
+                # 캐시가 사라졌거나 모델 오류: 핸들 폐기 + 서버 쪽 캐시 삭제 후 다음 모델
+                # (캐시 없음/할당량 초과일 때만 이 모델을 retry_after 동안 쉼)
+                with self._lock:
+                    if self._handles.get((model_name, handle.prefix_hash)) is handle:
+                        del self._handles[(model_name, handle.prefix_hash)]
+                    if self.backend.should_back_off(e):
+                        self._failures[(model_name, None)] = _now() + self.retry_after
+                self._delete([handle])
+                last_error = e
+                continue
+            with self._lock:
+                handle.hits += 1
+                self.stats["hits"] += 1
+            return text, model_name, handle
+
+        with self._lock:
+            self.stats["fallbacks"] += 1
+        raise CacheUnavailable(str(last_error) if last_error else "캐시 가능한 모델 없음")
+
+    def handles(self):
+        """현재 유지 중인 캐시 핸들 목록 (모니터링용)"""
+        with self._lock:
+            return list(self._handles.values())
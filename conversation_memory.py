@@ -0,0 +1,165 @@
+"""
+대화 메모리 (후속 질문용)
+- 이전 턴을 짧은 요약으로 굴려가며(rolling) 보관
+- 이전 턴에서 참조한 약관 구간 ID 를 함께 기록
+- 프롬프트에 넣는 메모리 블록은 고정 토큰 한도 안으로 유지
+- "그럼 B사는?" 같은 후속 질문은 직전 주제 키워드로 검색어를 보완
+"""
+import re
+
+from text_normalization import estimate_tokens
+
+# 후속 질문 신호 (질문 앞머리)
+FOLLOW_UP_MARKERS = ("그럼", "그러면", "그건", "그거", "그리고", "또", "이건", "저건", "거기", "나머지", "반대로")
+
+# 주제 키워드에서 제외할 요청/지시 표현
+STOP_WORDS = {
+    "비교해줘", "보여줘", "알려줘", "정리해줘", "설명해줘", "뭐야", "뭐가", "있어", "있어?",
+    "어떤", "어떻게", "각", "표로", "차이를", "차이가", "차이점을", "내용을", "내용의",
+}
+
+
+def truncate_tokens(text, max_tokens):
+    """토큰 한도 안으로 앞부분만 남김 (잘랐으면 끝에 …)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid].rstrip() + "…") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "…" if lo else ""
+
+
+def summarize_answer(answer, max_chars=160):
+    """
+    답변을 한 줄 요약으로 압축 (추가 LLM 호출 없이 추출식)
+    - 마크다운 표는 셀만 남기고, 구분선/강조 기호 제거
+    """
+    parts = []
+    for line in answer.splitlines():
+        line = line.strip()
+        if not line or set(line) <= set("|-: "):
+            continue
+        if line.startswith("|"):
+            cells = [cell.strip() for cell in line.strip("|").split("|")]
+            line = " / ".join(cell for cell in cells if cell)
+        line = re.sub(r"[*#>`_]+", "", line).strip()
+        if line:
+            parts.append(line)
+        if sum(len(p) for p in parts) >= max_chars:
+            break
+    text = " ".join(parts)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+
+def topic_keywords(question, limit=6):
+    """질문에서 주제 키워드 추출 (지시 표현/후속 신호 제외)"""
+    keywords = []
+    for word in question.split():
+        word = word.strip("?!.,")
+        if len(word) < 2 or word in STOP_WORDS or word in FOLLOW_UP_MARKERS:
+            continue
+        if word not in keywords:
+            keywords.append(word)
+    return keywords[:limit]
+
+
+def is_follow_up(question):
+    """직전 턴을 이어받는 후속 질문인지 판단"""
+    q = question.strip()
+    if any(q.startswith(marker) for marker in FOLLOW_UP_MARKERS):
+        return True
+    return len(topic_keywords(q)) <= 1
+
+
+class ConversationMemory:
+    """
+    고정 토큰 한도 안의 대화 메모리
+    - turns: 최근 턴 (질문, 답변 요약, 참조 구간 ID, 주제 키워드)
+    - 한도를 넘으면 가장 오래된 턴은 주제 키워드만 남기고 접힘
+    - 턴 하나만 남아도 넘으면 그 턴의 참조 구간/요약/질문을 잘라 한도를 지킴
+    """
+
+    def __init__(self, max_tokens=600, max_span_ids=20):
+        self.max_tokens = max_tokens
+        self.max_span_ids = max_span_ids
+        self.turns = []
+        self.earlier_topics = []
+
+    def resolve_query(self, question):
+        """
+        검색용 질문 생성
+        - 후속 질문이면 직전 턴의 주제 키워드를 덧붙임
+        """
+        if not self.turns or not is_follow_up(question):
+            return question
+        carried = [kw for kw in self.turns[-1]["topics"] if kw not in question]
+        return f"{question} {' '.join(carried)}".strip()
+
+    def previous_span_ids(self):
+        """최근 턴부터 참조한 구간 ID (중복 제거, 최대 max_span_ids 개)"""
+        seen = []
+        for turn in reversed(self.turns):
+            for span_id in turn["span_ids"]:
+                if span_id not in seen:
+                    seen.append(span_id)
+        return seen[:self.max_span_ids]
+
+    def record(self, question, answer, span_ids, resolved_query=None):
+        """턴 기록 후 토큰 한도에 맞게 오래된 턴 접기"""
+        self.turns.append({
+            "question": question,
+            "summary": summarize_answer(answer),
+            "span_ids": list(span_ids),
+            "topics": topic_keywords(resolved_query or question),
+        })
+        while len(self.turns) > 1 and estimate_tokens(self.prompt_section()) > self.max_tokens:
+            folded = self.turns.pop(0)
+            for kw in folded["topics"]:
+                if kw not in self.earlier_topics:
+                    self.earlier_topics.append(kw)
+            self.earlier_topics = self.earlier_topics[-12:]
+        if self._overflow() > 0:
+            self._fit_last_turn()
+
+    def _overflow(self):
+        return estimate_tokens(self.prompt_section()) - self.max_tokens
+
+    def _fit_last_turn(self):
+        """
+        남은 턴 하나를 한도에 맞게 줄임 (아주 긴 질문/답변)
+        - 참조 구간 ID 를 뒤에서부터 빼고, 답변 요약 → 질문 순으로 뒷부분을 자름
+        - 그래도 넘으면 (한도가 아주 작을 때) 앞서 다룬 주제, 마지막으로 턴 자체를 뺌
+        """
+        turn = self.turns[-1]
+        del turn["span_ids"][self.max_span_ids:]
+        while turn["span_ids"] and self._overflow() > 0:
+            turn["span_ids"].pop()
+        for field in ("summary", "question"):
+            while turn[field] and self._overflow() > 0:
+                turn[field] = truncate_tokens(turn[field], estimate_tokens(turn[field]) - self._overflow())
+        if self._overflow() > 0:
+            self.earlier_topics = []
+        if self._overflow() > 0:
+            self.turns.pop()
+
+    def prompt_section(self):
+        """프롬프트에 넣을 메모리 블록 (비어 있으면 빈 문자열)"""
+        if not self.turns and not self.earlier_topics:
+            return ""
+        lines = []
+        if self.earlier_topics:
+            lines.append(f"- 앞서 다룬 주제: {', '.join(self.earlier_topics)}")
+        for turn in self.turns:
+            lines.append(f"- Q: {turn['question']} → A: {turn['summary']}")
+        span_ids = self.previous_span_ids()
+        if span_ids:
+            lines.append(f"- 이전 답변 참조 구간: {', '.join(span_ids)}")
+        return "\n".join(lines)
+
+    def clear(self):
+        self.turns = []
+        self.earlier_topics = []
@@ -0,0 +1,250 @@
+"""
+로컬 밀집 벡터(임베딩) 검색
+- CPU 전용 해싱 임베더 (문자 n-gram → 고정 차원, 외부 모델 불필요)
+- 파일 해시별로 int8 양자화 벡터를 디스크에 저장/재사용
+- IVF 방식 근사 최근접 이웃(ANN) 검색
+  (키워드 점수와의 결합은 segmented_corpus.SegmentedCorpus.hybrid_search)
+"""
+import hashlib
+import os
+import re
+
+import numpy as np
+
+from multi_pattern import INSURANCE_SYNONYMS
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "NOTEBOOK_AI_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "my-notebook-ai")
+)
+
+
+class HashingEmbedder:
+    """
+    문자 n-gram 해싱 임베더
+    - 한글은 띄어쓰기/조사가 섞여도 n-gram 이 겹치므로 형태소 분석 없이 동작
+    - 해시가 실행마다 바뀌지 않아 디스크 캐시와 함께 쓸 수 있음
+    """
+
+    def __init__(self, dim=256, ngram_sizes=(2, 3), concepts=INSURANCE_SYNONYMS):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self._canonical = {}
+        for group in concepts:
+            for surface in group:
+                self._canonical[surface] = group[0]
+        surfaces = sorted(self._canonical, key=len, reverse=True)
+        self._concept_pattern = re.compile("|".join(map(re.escape, surfaces))) if surfaces else None
+
+        concept_sig = hashlib.sha1(repr(sorted(self._canonical.items())).encode("utf-8")).hexdigest()[:8]
+        self.signature = f"hash{dim}-{'.'.join(map(str, self.ngram_sizes))}-{concept_sig}"
+
+    def _prepare(self, text):
+        text = re.sub(r"\s+", " ", text.lower())
+        if self._concept_pattern is not None:
+            text = self._concept_pattern.sub(lambda m: self._canonical[m.group(0)], text)
+        return text
+
+    def _embed_one(self, text):
+        codes = np.frombuffer(self._prepare(text).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        hashes = []
+        for n in self.ngram_sizes:
+            if codes.size < n:
+                continue
+            h = np.full(codes.size - n + 1, n, dtype=np.uint64)
+            for j in range(n):
+                h = h * np.uint64(1000003) + codes[j:codes.size - n + 1 + j]
+            hashes.append(h)
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not hashes:
+            return vector
+
+        # splitmix 스타일 비트 섞기 후 버킷/부호 결정
+        h = np.concatenate(hashes)
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xFF51AFD7ED558CCD)
+        h ^= h >> np.uint64(33)
+        buckets = (h % np.uint64(self.dim)).astype(np.int64)
+        signs = np.where((h >> np.uint64(63)) == 1, -1.0, 1.0)
+        vector = np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+
+        # 긴 청크에서 흔한 n-gram 이 지배하지 않도록 로그 스케일
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed(self, texts):
+        """텍스트 리스트 → (N, dim) 단위 벡터"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self._embed_one(t) for t in texts])
+
+    def embed_query(self, query):
+        return self._embed_one(query)
+
+
+class SentenceTransformerEmbedder:
+    """
+    sentence-transformers 로컬 모델 임베더 (설치되어 있을 때만 사용, CPU 실행)
+    """
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.signature = "st-" + re.sub(r"[^0-9A-Za-z]+", "_", model_name)
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    def embed_query(self, query):
+        return self.embed([query])[0]
+
+
+def get_default_embedder():
+    """NOTEBOOK_AI_EMBEDDING_MODEL 이 지정되어 있으면 로컬 모델, 아니면 해싱 임베더"""
+    model_name = os.environ.get("NOTEBOOK_AI_EMBEDDING_MODEL")
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception:
+            pass
+    return HashingEmbedder()
+
+
+# ==========================================
+# int8 양자화 + 디스크 저장
+# ==========================================
+
+def quantize(vectors):
+    """벡터별 스케일을 둔 대칭 int8 양자화"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, dtype=np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def file_hash(data):
+    """업로드 파일 내용의 SHA-256 (임베딩 캐시 키)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class EmbeddingStore:
+    """파일 해시 × 임베더 × 청크 설정별 양자화 벡터 저장소 (.npz)"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = os.path.join(cache_dir, "embeddings")
+
+    def _path(self, key, embedder, chunk_size, overlap):
+        return os.path.join(self.cache_dir, f"{key}-{embedder.signature}-c{chunk_size}o{overlap}.npz")
+
+    def load_or_embed(self, key, chunks, embedder, chunk_size, overlap):
+        """캐시가 있으면 읽고, 없으면 임베딩 후 저장 → (codes, scales)"""
+        path = self._path(key, embedder, chunk_size, overlap)
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    if len(data["codes"]) == len(chunks):
+                        return data["codes"], data["scales"]
+            except Exception:
+                pass
+
+        codes, scales = quantize(embedder.embed(chunks))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, codes=codes, scales=scales)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 캐시 저장 실패는 검색에 영향 없음
+            pass
+        return codes, scales
+
+
+# ==========================================
+# IVF 근사 최근접 이웃 인덱스
+# ==========================================
+
+class IVFIndex:
+    """
+    역파일(IVF) 인덱스
+    - 구면 k-means 로 nlist 개 중심점 학습
+    - 질문과 가까운 nprobe 개 목록만 스캔 (int8 벡터 그대로 내적)
+    - 벡터 수가 적으면 전수 검색
+    """
+
+    def __init__(self, codes, scales, nlist=None, nprobe=8, exact_threshold=4096,
+                 train_sample=65536, iterations=8, seed=0):
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.nprobe = nprobe
+        self.centroids = None
+        self.list_offsets = None
+        self.list_members = None
+
+        n = len(self.codes)
+        if n <= exact_threshold:
+            return
+
+        nlist = nlist or max(16, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample_ids = rng.choice(n, size=min(n, train_sample), replace=False)
+        sample = self._dequantize(sample_ids)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        self.centroids = centroids.astype(np.float32)
+
+        # 전체 벡터를 배치로 목록에 배정
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 65536):
+            ids = np.arange(start, min(n, start + 65536))
+            assign[ids] = np.argmax(self._dequantize(ids) @ self.centroids.T, axis=1)
+        self.list_members = np.argsort(assign, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _dequantize(self, ids):
+        return self.codes[ids].astype(np.float32) * self.scales[ids, None]
+
+    def score_ids(self, query_vector, ids):
+        """지정한 벡터들과 질문의 코사인 유사도 (양자화 근사)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0:
+            return np.zeros(0, dtype=np.float32)
+        return (self.codes[ids].astype(np.float32) @ query_vector) * self.scales[ids]
+
+    def search(self, query_vector, k):
+        """상위 k개 (벡터 번호 배열, 유사도 배열)"""
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        if self.centroids is None:
+            ids = np.arange(len(self.codes))
+        else:
+            probe = np.argsort(-(self.centroids @ query_vector))[:self.nprobe]
+            ids = np.concatenate([
+                self.list_members[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+            ])
+        if ids.size == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = self.score_ids(query_vector, ids)
+        if ids.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return ids[order], scores[order]
@@ -0,0 +1,422 @@
+"""
+SQLite FTS5 기반 영구 코퍼스 저장소 (검색 서버 없이 로컬 파일 하나)
+- 문서/페이지/조항/청크를 테이블로 저장하고 청크 본문은 FTS5 색인 (trigram 토크나이저)
+- 본문은 블록 압축(block_store)으로 문서당 한 번만 저장, 청크는 (시작, 끝) 위치만
+  (FTS5 는 본문 없이 색인만 두는 contentless 테이블, 점수화할 청크 본문은 걸친 블록만 풀어서 읽음)
+- trigram 은 형태소 분석 없이 한글 부분 문자열 검색이 되고, 대소문자 구분 없음
+  (1~2글자 검색어는 그 글자로 시작하는 trigram 으로 찾으므로 청크 맨 끝에만 있는 경우는 못 찾음, 근사)
+  (그런 trigram 이 너무 많으면 MATCH 식 대신 범위 안 청크를 훑거나, 큰 범위에서는 흔한 trigram 만 씀)
+- 점수는 app.py get_smart_context 와 같은 공식 (등장 횟수 × (1 + 길이/10))
+  (FTS5 로 검색어가 든 청크만 읽고, 범위가 크면 bm25 상위 후보만 다시 점수화)
+- WAL 모드: 여러 작업자 프로세스가 동시에 읽고, 쓰기는 한 번에 하나 (busy_timeout 대기)
+- 구간 ID 는 SegmentedCorpus 와 같음 (파일 해시 앞 8자리#파일 내 청크 번호)
+"""
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+
+from block_store import BLOCK_CHARS, DEFAULT_CODEC, BlockCache, compress_blocks, read_span
+from clause_dedup import section_title, split_sections
+from dense_retrieval import DEFAULT_CACHE_DIR
+from hit_windows import PROXIMITY_POOL_FACTOR, find_offsets, proximity_boost
+from sparse_retrieval import chunk_spans
+
+DEFAULT_DB_PATH = os.environ.get("NOTEBOOK_AI_FTS_DB", os.path.join(DEFAULT_CACHE_DIR, "corpus-v2.db"))
+
+# trigram 토크나이저로 바로 찾을 수 있는 최소 검색어 길이
+TRIGRAM = 3
+
+# 검색 범위 안 청크가 이 수 이하면 정확한 점수화, 넘으면 bm25 로 후보를 줄인 뒤 점수화
+EXACT_SCOPE_CHUNKS = 5000
+
+# bm25 로 고르는 재점수화 후보 수
+RERANK_POOL = 300
+
+# 1~2글자 검색어 하나를 펼치는 trigram 최대 수 (넘으면 MATCH 식 대신 범위 안 청크를 훑음)
+MAX_PREFIX_EXPANSION = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    doc_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    block_no INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (doc_id, block_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    doc_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page_no INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (doc_id, page_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_doc ON sections(doc_id, start);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_no INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    page_start INTEGER,
+    page_end INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS chunks_doc ON chunks(doc_id, chunk_no);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks_fts, 'row');
+"""
+
+
+def _quote(term):
+    """FTS5 문자열 리터럴 (큰따옴표 이스케이프)"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _page_of(starts, pages, offset):
+    idx = bisect_right(starts, offset) - 1
+    return pages[idx] if idx >= 0 else None
+
+
+class FTSStore:
+    """
+    SQLite FTS5 코퍼스 저장소
+    - 연결은 스레드마다 하나 (Streamlit 세션 스레드/작업자 스레드에서 함께 써도 됨)
+    - 다른 프로세스도 같은 DB 파일을 열어 동시에 검색 가능 (WAL)
+    - 문서 키(파일 해시)가 같으면 다시 색인하지 않음
+    - 푼 본문 블록은 저장소마다 LRU 하나 (cache_blocks 개)
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, chunk_size=2500, overlap=500, busy_timeout=30.0,
+                 exact_scope=EXACT_SCOPE_CHUNKS, rerank_pool=RERANK_POOL, codec=DEFAULT_CODEC,
+                 cache_blocks=None, max_expansion=MAX_PREFIX_EXPANSION):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.exact_scope = exact_scope
+        self.rerank_pool = rerank_pool
+        self.max_expansion = max_expansion
+        self.busy_timeout = busy_timeout
+        self.codec = codec
+        self.block_cache = BlockCache() if cache_blocks is None else BlockCache(cache_blocks)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('chunk_size', ?), ('overlap', ?), ('block_chars', ?)",
+                         (str(chunk_size), str(overlap), str(BLOCK_CHARS)))
+        if "text" in {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}:
+            raise ValueError(f"{path} 는 청크 본문을 그대로 저장하던 이전 형식 DB 입니다 (지우고 다시 적재하세요)")
+        stored = dict(conn.execute("SELECT name, value FROM meta").fetchall())
+        if (int(stored["chunk_size"]), int(stored["overlap"])) != (chunk_size, overlap):
+            raise ValueError(
+                f"{path} 는 청크 {stored['chunk_size']}/겹침 {stored['overlap']} 으로 만들어진 DB 입니다"
+            )
+        self.block_chars = int(stored["block_chars"])
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """현재 스레드의 연결 닫기"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------
+    # 적재
+    # ------------------------------------------
+    def __contains__(self, key):
+        return self._connect().execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone() is not None
+
+    def document_keys(self):
+        return [row[0] for row in self._connect().execute("SELECT key FROM documents ORDER BY id")]
+
+    def add_document(self, key, name, text, page_spans=None):
+        """
+        문서 하나를 한 트랜잭션으로 적재 (이미 있으면 건너뜀)
+        - page_spans: [(페이지 번호, 시작, 끝)] (NormalizedDocument.page_spans), 없으면 페이지 정보 없이 저장
+        - 반환: 새로 적재했으면 True
+        """
+        spans = chunk_spans(text, self.chunk_size, self.overlap)
+        page_spans = page_spans or []
+        starts = [start for _, start, _ in page_spans]
+        numbers = [page for page, _, _ in page_spans]
+
+        conn = self._connect()
+        with self._write_lock, conn:
+            if conn.execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone():
+                return False
+            doc_id = conn.execute(
+                "INSERT INTO documents (key, name, page_count, chars, codec, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, name, len(page_spans), len(text), self.codec, time.time())
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO blocks (doc_id, block_no, data) VALUES (?, ?, ?)",
+                [(doc_id, no, data) for no, data in enumerate(compress_blocks(text, self.block_chars, self.codec))]
+            )
+            conn.executemany(
+                "INSERT INTO pages (doc_id, page_no, start, end) VALUES (?, ?, ?, ?)",
+                [(doc_id, page, start, end) for page, start, end in page_spans]
+            )
+            conn.executemany(
+                "INSERT INTO sections (doc_id, start, end, title) VALUES (?, ?, ?, ?)",
+                [(doc_id, start, end, section_title(text[start:end])) for start, end in split_sections(text)]
+            )
+            for no, (start, end) in enumerate(spans):
+                chunk_id = conn.execute(
+                    "INSERT INTO chunks (doc_id, chunk_no, start, end, page_start, page_end) VALUES (?, ?, ?, ?, ?, ?)",
+                    (doc_id, no, start, end, _page_of(starts, numbers, start),
+                     _page_of(starts, numbers, max(start, end - 1)))
+                ).lastrowid
+                conn.execute("INSERT INTO chunks_fts(rowid, text) VALUES (?, ?)", (chunk_id, text[start:end]))
+        return True
+
+    def remove_document(self, key):
+        """문서와 그 페이지/조항/청크/블록 삭제 (contentless FTS 색인은 청크 본문을 다시 읽어 지움)"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            row = conn.execute("SELECT id, codec FROM documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            doc_id, codec = row
+            conn.executemany(
+                "INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', ?, ?)",
+                [
+                    (chunk_id, self._read_span(doc_id, key, codec, start, end))
+                    for chunk_id, start, end in conn.execute(
+                        "SELECT id, start, end FROM chunks WHERE doc_id = ?", (doc_id,)
+                    ).fetchall()
+                ]
+            )
+            conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def optimize(self):
+        """FTS 색인 세그먼트 병합 (대량 적재 후 검색 속도 회복)"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize')")
+
+    # ------------------------------------------
+    # 검색
+    # ------------------------------------------
+    def _match_expression(self, terms):
+        """
+        FTS5 MATCH 식 (검색어 OR) → (식, 검색어가 든 청크를 전부 찾는지)
+        - 3글자 이상: 그대로 구문 검색
+        - 1~2글자: 그 글자로 시작하는 색인 trigram 으로 펼침 (trigram 은 짧은 검색어를 직접 못 찾음)
+          (뒤에 글자가 없는 청크 맨 끝의 검색어는 trigram 이 없어 못 찾음, 근사)
+        - trigram 이 max_expansion 개를 넘으면 여러 청크에 나오는 것부터 max_expansion 개만 씀
+          → 식 크기는 검색어당 max_expansion 으로 제한되지만 검색어가 든 청크가 빠질 수 있음 (두 번째 값 False)
+        """
+        conn = self._connect()
+        phrases = []
+        complete = True
+        for term in terms:
+            if len(term) >= TRIGRAM:
+                phrases.append(_quote(term))
+                continue
+            rows = conn.execute(
+                "SELECT term, doc FROM chunks_vocab WHERE term >= ? AND term < ?",
+                (term, term + "\U0010ffff")
+            ).fetchall()
+            if len(rows) > self.max_expansion:
+                rows = sorted(rows, key=lambda row: -row[1])[:self.max_expansion]
+                complete = False
+            phrases.extend(_quote(row[0]) for row in rows)
+        return " OR ".join(dict.fromkeys(phrases)), complete
+
+    def _scope(self, doc_keys):
+        """검색 범위 (문서 ID 목록 또는 None=전체, 범위 안 청크 수)"""
+        conn = self._connect()
+        if doc_keys is None:
+            return None, conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+        doc_keys = list(doc_keys)
+        doc_ids = [
+            row[0] for row in conn.execute(
+                f"SELECT id FROM documents WHERE key IN ({', '.join('?' * len(doc_keys))})", doc_keys
+            )
+        ] if doc_keys else []
+        if not doc_ids:
+            return [], 0
+        count = conn.execute(
+            f"SELECT count(*) FROM chunks WHERE doc_id IN ({', '.join('?' * len(doc_ids))})", doc_ids
+        ).fetchone()[0]
+        return doc_ids, count
+
+    def rank(self, keywords, k, doc_keys=None, proximity=False):
+        """
+        키워드 점수 상위 k개 [(점수, 파일명, 청크, 구간 ID)]
+        - doc_keys: 이 문서들로 검색 범위 제한 (None 이면 전체)
+        - proximity: 상위 후보의 본문에서 검색어 위치를 찾아 한곳에 모인 청크에 가산점 (SegmentedCorpus 와 같은 공식)
+        - 범위 안 청크가 exact_scope 이하면 검색어가 든 청크 전부를 점수화 (메모리 코퍼스와 같은 순위)
+          (1~2글자 검색어의 trigram 이 max_expansion 개를 넘으면 FTS5 대신 범위 안 청크를 전부 훑음)
+        - 더 크면 FTS5 bm25 상위 rerank_pool 개만 골라 같은 공식으로 다시 점수화 (근사)
+        - 동점은 먼저 적재된 문서/앞쪽 청크 우선
+        """
+        weights = {}
+        for keyword in keywords:
+            if keyword:
+                weights[keyword] = weights.get(keyword, 0) + 10 + len(keyword)
+        if not weights or k <= 0:
+            return []
+        doc_ids, scope = self._scope(doc_keys)
+        if not scope:
+            return []
+        match, complete = self._match_expression(list(weights))
+        if not match:
+            return []
+
+        in_scope = f" AND c.doc_id IN ({', '.join('?' * len(doc_ids))})" if doc_ids is not None else ""
+        if scope <= self.exact_scope and not complete:
+            # 짧은 검색어를 다 펼치지 못함 → 범위 안 청크(최대 exact_scope 개) 본문을 전부 읽어 점수화
+            sql = (
+                "SELECT c.doc_id, d.name, d.key, d.codec, c.chunk_no, c.start, c.end FROM chunks c"
+                " JOIN documents d ON d.id = c.doc_id WHERE 1" + in_scope
+            )
+            params = doc_ids or []
+        elif scope <= self.exact_scope:
+            # 범위 안 청크를 문서 색인으로 훑고, 검색어가 든 청크(FTS 결과)만 본문을 읽음
+            sql = (
+                "SELECT c.doc_id, d.name, d.key, d.codec, c.chunk_no, c.start, c.end FROM chunks c"
+                " JOIN documents d ON d.id = c.doc_id"
+                " WHERE c.id IN (SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ?)" + in_scope
+            )
+            params = [match] + (doc_ids or [])
+        else:
+            sql = (
+                "SELECT c.doc_id, d.name, d.key, d.codec, c.chunk_no, c.start, c.end FROM chunks_fts f"
+                " JOIN chunks c ON c.id = f.rowid JOIN documents d ON d.id = c.doc_id"
+                " WHERE chunks_fts MATCH ?" + in_scope + " ORDER BY f.rank LIMIT ?"
+            )
+            params = [match] + (doc_ids or []) + [max(self.rerank_pool, k)]
+
+        # 점수는 ChunkTermIndex 와 같게 소문자 본문의 비중첩 등장 횟수 × (10 + 길이) 정수 합
+        scored = []
+        for doc_id, name, key, codec, chunk_no, start, end in self._connect().execute(sql, params).fetchall():
+            text = self._read_span(doc_id, key, codec, start, end)
+            lowered = text.lower()
+            score = sum(weight * lowered.count(term) for term, weight in weights.items())
+            if score > 0:
+                scored.append((-score, doc_id, chunk_no, name, key, text))
+        scored.sort(key=lambda row: row[:3])
+        if proximity:
+            scored = [
+                (-proximity_boost(-row[0], find_offsets(row[5], weights)),) + row[1:]
+                for row in scored[:k * PROXIMITY_POOL_FACTOR]
+            ]
+            scored.sort(key=lambda row: row[:3])
+        return [
+            (-score / 10.0, name, text, f"{key[:8]}#{chunk_no}")
+            for score, _, chunk_no, name, key, text in scored[:k]
+        ]
+
+    def search(self, keywords, k, doc_keys=None, proximity=False):
+        """키워드 점수 상위 k개 [(파일명, 청크, 구간 ID)]"""
+        return [(name, chunk, span_id) for _, name, chunk, span_id in self.rank(keywords, k, doc_keys, proximity)]
+
+    def _read_span(self, doc_id, key, codec, start, end):
+        def load_blocks(numbers):
+            return dict(self._connect().execute(
+                f"SELECT block_no, data FROM blocks WHERE doc_id = ? AND block_no IN ({', '.join('?' * len(numbers))})",
+                [doc_id] + list(numbers)
+            ).fetchall())
+        return read_span(key, start, end, load_blocks, self.block_cache, codec, self.block_chars)
+
+    def read_span(self, key, start=0, end=None):
+        """문서 본문의 글자 구간 [start, end) (걸친 블록만 풀어서 읽음, 문서가 없으면 None)"""
+        row = self._connect().execute("SELECT id, codec, chars FROM documents WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        doc_id, codec, chars = row
+        return self._read_span(doc_id, key, codec, max(0, start), chars if end is None else min(end, chars))
+
+    def locate(self, span_id):
+        """구간 ID → 원래 페이지 범위 (첫 페이지, 끝 페이지), 페이지 정보가 없으면 None"""
+        prefix, _, index = span_id.partition("#")
+        if not index.isdigit():
+            return None
+        row = self._connect().execute(
+            "SELECT c.page_start, c.page_end FROM chunks c JOIN documents d ON d.id = c.doc_id"
+            " WHERE d.key >= ? AND d.key < ? AND c.chunk_no = ? LIMIT 1",
+            (prefix, prefix + "\U0010ffff", int(index))
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0], row[1]
+
+    def sections(self, key):
+        """문서의 조항 목록 [(시작, 끝, 제목)]"""
+        return self._connect().execute(
+            "SELECT s.start, s.end, s.title FROM sections s JOIN documents d ON d.id = s.doc_id"
+            " WHERE d.key = ? ORDER BY s.start", (key,)
+        ).fetchall()
+
+    def stats(self):
+        conn = self._connect()
+        counts = {
+            table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for table in ("documents", "pages", "sections", "chunks", "blocks")
+        }
+        counts["text_chars"], counts["text_bytes"] = conn.execute(
+            "SELECT coalesce(sum(chars), 0), (SELECT coalesce(sum(length(data)), 0) FROM blocks) FROM documents"
+        ).fetchone()
+        counts["db_bytes"] = os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0
+        return counts
+
+
+class FTSView:
+    """
+    FTSStore 를 업로드된 문서로 범위를 좁혀 get_smart_context 에 넘기는 어댑터
+    - rank()/search(): SegmentedCorpus.rank/search 와 같은 모양 (weighting 은 "frequency" 만)
+    - shared_files: 공통 조항 표시는 세션 코퍼스의 것을 그대로 씀 (구간 ID 가 같음)
+    """
+
+    def __init__(self, store, doc_keys, shared_files=None):
+        self.store = store
+        self.doc_keys = list(doc_keys)
+        self._shared_files = shared_files
+
+    def rank(self, keywords, k, weighting="frequency", proximity=False):
+        if weighting != "frequency":
+            raise ValueError(f"FTS 저장소는 지원하지 않는 점수 공식: {weighting}")
+        return self.store.rank(keywords, k, self.doc_keys, proximity)
+
+    def search(self, keywords, k, weighting="frequency", proximity=False):
+        return [(name, chunk, span_id) for _, name, chunk, span_id in self.rank(keywords, k, weighting, proximity)]
+
+    def shared_files(self, span_id):
+        return self._shared_files(span_id) if self._shared_files else []
@@ -0,0 +1,262 @@
+"""
+후보 모델 헤지 요청 (꼬리 지연 줄이기)
+- 첫 모델이 임계 시간 안에 첫 토큰을 못 내면 같은 프롬프트를 다음 정상 후보 모델에도 보냄
+- 먼저 끝까지 응답한 쪽을 쓰고, 진 쪽은 취소 (스트림을 더 받지 않고 닫음)
+- 임계 시간: 모델별 최근 첫 토큰 시간의 p90 (기록이 적으면 기본값)
+- 헤지 비율 상한: 최근 요청 중 헤지한 비율이 max_rate 이하일 때만, 레이트 리밋 여유분이 있을 때만
+- 추가 비용 기록: 헤지로 더 보낸 요청 수, 입력 토큰, 진 쪽이 취소 전까지 받은 출력 토큰
+  (헤지한 요청/안 한 요청의 응답 시간 p50/p95 와 나란히 표시)
+- 진 쪽 스레드는 다음 스트림 조각이 올 때 취소를 확인하므로 첫 조각을 기다리는 중이면 그때까지 남아 있음
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from adaptive_depth import percentile
+from llm_executor import RequestCancelled
+from text_normalization import estimate_tokens
+
+# NOTEBOOK_AI_HEDGE=1 이면 모든 세션에서 헤지 요청을 켠 채로 시작
+HEDGE_BY_DEFAULT = os.environ.get("NOTEBOOK_AI_HEDGE", "") not in ("", "0", "false")
+
+# 최근 요청 중 헤지 비율 상한
+HEDGE_MAX_RATE = float(os.environ.get("NOTEBOOK_AI_HEDGE_MAX_RATE", "0.1"))
+
+# 헤지 임계 시간: 첫 토큰 시간 분위수 / 기록이 부족할 때 기본값 / 최소값 (초)
+HEDGE_QUANTILE = 0.9
+HEDGE_DEFAULT_DELAY = 6.0
+HEDGE_MIN_DELAY = 1.0
+
+# 첫 토큰 시간 기록 수(모델별) / 임계 시간 계산을 시작하는 최소 기록 수 / 헤지 비율을 보는 최근 요청 수
+FIRST_TOKEN_WINDOW = 50
+MIN_OBSERVATIONS = 5
+RATE_WINDOW = 100
+
+# 연속 실패가 이 횟수 이상이면 cooldown 초 동안 비정상 모델로 보고 헤지/첫 시도 순서에서 뒤로
+UNHEALTHY_FAILURES = 2
+UNHEALTHY_COOLDOWN = 60.0
+
+# 작업 상태 확인 주기 (초, 호출자 취소 확인)
+POLL_INTERVAL = 0.2
+
+
+class HedgePolicy:
+    """
+    헤지 판단 + 결과 기록 (앱 전체 공유, 스레드 안전)
+    - threshold(모델): 이 시간 안에 첫 토큰이 없으면 헤지
+    - healthy(모델) / order(후보): 최근 연속 실패한 모델은 뒤로
+    - try_hedge(): 헤지 비율 상한 + 레이트 리밋 여유분 확인
+    - stats(): 요청/헤지/헤지 승리 수, 추가 비용, 응답 시간 p50/p95 (헤지한 요청 / 안 한 요청)
+    """
+
+    def __init__(self, limiter=None, reserve=0.0, max_rate=HEDGE_MAX_RATE, quantile=HEDGE_QUANTILE,
+                 default_delay=HEDGE_DEFAULT_DELAY, min_delay=HEDGE_MIN_DELAY):
+        self.limiter = limiter
+        self.reserve = reserve
+        self.max_rate = max_rate
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self._first_token = {}                     # 모델 → 최근 첫 토큰 시간 (초)
+        self._failures = {}                        # 모델 → (연속 실패 수, 마지막 실패 시각)
+        self._recent = deque(maxlen=RATE_WINDOW)   # 최근 요청별 헤지 여부
+        self._latency = {True: deque(maxlen=RATE_WINDOW), False: deque(maxlen=RATE_WINDOW)}
+        self._totals = {"requests": 0, "hedged": 0, "hedge_wins": 0, "skipped": 0,
+                        "extra_calls": 0, "extra_input_tokens": 0, "extra_output_tokens": 0}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # 판단
+    # ------------------------------------------
+    def observe_first_token(self, model_name, seconds):
+        with self._lock:
+            self._first_token.setdefault(model_name, deque(maxlen=FIRST_TOKEN_WINDOW)).append(seconds)
+
+    def threshold(self, model_name):
+        with self._lock:
+            samples = list(self._first_token.get(model_name, ()))
+        if len(samples) < MIN_OBSERVATIONS:
+            return self.default_delay
+        return max(self.min_delay, percentile(samples, self.quantile))
+
+    def record_result(self, model_name, ok):
+        with self._lock:
+            if ok:
+                self._failures.pop(model_name, None)
+            else:
+                count, _ = self._failures.get(model_name, (0, 0.0))
+                self._failures[model_name] = (count + 1, time.monotonic())
+
+    def healthy(self, model_name):
+        with self._lock:
+            count, last = self._failures.get(model_name, (0, 0.0))
+        return count < UNHEALTHY_FAILURES or time.monotonic() - last > UNHEALTHY_COOLDOWN
+
+    def order(self, model_names):
+        """정상 모델 먼저 (각 그룹 안에서는 원래 순서)"""
+        return sorted(model_names, key=lambda name: not self.healthy(name))
+
+    def try_hedge(self):
+        with self._lock:
+            if sum(self._recent) >= self.max_rate * (len(self._recent) + 1):
+                self._totals["skipped"] += 1
+                return False
+        if self.limiter is not None and not self.limiter.try_acquire(self.reserve):
+            with self._lock:
+                self._totals["skipped"] += 1
+            return False
+        return True
+
+    # ------------------------------------------
+    # 기록
+    # ------------------------------------------
+    def record_request(self, seconds, hedged, hedge_won, prompt_tokens, wasted_output_tokens):
+        """
+        요청 하나의 결과
+        - hedged: 헤지 요청을 보냈는지, hedge_won: 헤지로 보낸 모델이 먼저 응답했는지
+        - prompt_tokens: 헤지로 한 번 더 보낸 입력 토큰, wasted_output_tokens: 취소된 쪽이 받은 출력 토큰
+        """
+        with self._lock:
+            self._recent.append(hedged)
+            self._latency[hedged].append(seconds)
+            self._totals["requests"] += 1
+            if hedged:
+                self._totals["hedged"] += 1
+                self._totals["hedge_wins"] += int(hedge_won)
+                self._totals["extra_calls"] += 1
+                self._totals["extra_input_tokens"] += prompt_tokens
+                self._totals["extra_output_tokens"] += wasted_output_tokens
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._totals)
+            latency = {hedged: list(samples) for hedged, samples in self._latency.items()}
+        stats["hedge_rate"] = stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+        for hedged, label in ((True, "hedged"), (False, "plain")):
+            stats[f"{label}_p50"] = percentile(latency[hedged], 0.5)
+            stats[f"{label}_p95"] = percentile(latency[hedged], 0.95)
+        return stats
+
+
+def _chunk_text(chunk):
+    """스트림 조각의 텍스트 (텍스트가 없는 조각이면 빈 문자열)"""
+    try:
+        return chunk.text
+    except Exception:
+        return ""
+
+
+class _Attempt:
+    """모델 하나에 보낸 스트리밍 요청 (작업 스레드에서 실행)"""
+
+    def __init__(self, clients, model_name, prompt, generation_config, policy, changed):
+        self.model_name = model_name
+        self.cancel_event = threading.Event()
+        self.started = time.monotonic()
+        self.first_token = None
+        self.text = None
+        self.error = None
+        self.done = False
+        self.received = []
+        self._changed = changed
+        threading.Thread(
+            target=self._run, args=(clients, prompt, generation_config, policy),
+            name=f"hedge-{model_name}", daemon=True
+        ).start()
+
+    def _run(self, clients, prompt, generation_config, policy):
+        try:
+            model = clients.model(self.model_name, generation_config)
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                if self.first_token is None:
+                    self.first_token = time.monotonic() - self.started
+                    policy.observe_first_token(self.model_name, self.first_token)
+                    with self._changed:
+                        self._changed.notify_all()
+                if self.cancel_event.is_set():
+                    raise RequestCancelled()
+                self.received.append(_chunk_text(chunk))
+
+            # 안전 필터 체크
+            if hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+                raise ValueError(f"안전 필터 차단: {response.prompt_feedback.block_reason}")
+            self.text = response.text
+        except Exception as e:
+            self.error = e
+        if not self.cancel_event.is_set():
+            policy.record_result(self.model_name, self.error is None)
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    @property
+    def wasted_tokens(self):
+        return estimate_tokens("".join(self.received))
+
+
+def hedged_generate(clients, prompt, policy, generation_config=None, cancel_event=None):
+    """
+    헤지 요청으로 답변 생성 (ModelClients.generate 와 같은 반환: (응답 텍스트, 모델 이름))
+    - 첫 모델이 threshold 안에 첫 토큰을 못 내면 다음 정상 후보에 한 번 헤지 (요청당 최대 한 번)
+    - 먼저 완료된 응답을 쓰고 나머지는 취소
+    - 시도가 모두 실패하면 남은 후보를 순서대로 시도 (헤지 없는 generate 와 같은 폴백)
+    - cancel_event 가 설정되면 모든 시도를 취소하고 RequestCancelled
+    """
+    start = time.monotonic()
+    changed = threading.Condition()
+    pending = policy.order(clients.model_names)
+    running = []
+    hedge = None
+    hedge_checked = False
+    last_error = None
+
+    def launch():
+        attempt = _Attempt(clients, pending.pop(0), prompt, generation_config, policy, changed)
+        running.append(attempt)
+        return attempt
+
+    with changed:
+        launch()
+        while True:
+            winner = next((a for a in running if a.done and a.error is None), None)
+            if winner is not None:
+                break
+            for attempt in [a for a in running if a.done]:
+                running.remove(attempt)
+                last_error = attempt.error
+            if cancel_event is not None and cancel_event.is_set():
+                for attempt in running:
+                    attempt.cancel_event.set()
+                raise RequestCancelled()
+            if not running:
+                if not pending:
+                    raise Exception(f"모든 모델 시도 실패. 마지막 오류: {str(last_error)}")
+                launch()
+                continue
+
+            timeout = POLL_INTERVAL
+            primary = running[0]
+            if not hedge_checked and len(running) == 1 and primary.first_token is None and pending \
+                    and policy.healthy(pending[0]):
+                remaining = policy.threshold(primary.model_name) - (time.monotonic() - primary.started)
+                if remaining <= 0:
+                    hedge_checked = True
+                    if policy.try_hedge():
+                        hedge = launch()
+                    continue
+                timeout = min(timeout, remaining)
+            changed.wait(timeout)
+
+    losers = [a for a in running if a is not winner]
+    for attempt in losers:
+        attempt.cancel_event.set()
+    policy.record_request(
+        time.monotonic() - start,
+        hedged=hedge is not None,
+        hedge_won=winner is hedge,
+        prompt_tokens=estimate_tokens(prompt) if hedge is not None else 0,
+        wasted_output_tokens=sum(a.wasted_tokens for a in losers) if hedge is not None else 0,
+    )
+    return winner.text, winner.model_name
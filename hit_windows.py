@@ -0,0 +1,123 @@
+"""
+검색어 위치 기반 근접도 점수 / 적중 구간(문장 단위) 추출
+- 근접도: 서로 다른 검색어가 PROXIMITY_WINDOW 글자 안에 함께 나오는 정도 (0~1)
+  → 여러 검색어 질문에서 검색어가 흩어진 청크보다 한곳에 모인 청크를 앞으로
+- 적중 구간: 청크 전체(2500자/1000자) 대신 검색어가 나온 문장과 앞뒤 padding 문장만 잘라 냄
+  (가까운 적중은 한 구간으로 합침) → 프롬프트에 관련 문장 위주로 넣음
+- 위치는 ChunkTermIndex 의 위치 색인(term_offsets) 또는 find_offsets(청크 본문 한 번 스캔)로 얻음
+"""
+import re
+from bisect import bisect_right
+
+from multi_pattern import find_all
+
+# 근접도 창 크기(글자) / 점수 가산 비율 / 근접도 재점수화용 후보 배수
+PROXIMITY_WINDOW = 200
+PROXIMITY_WEIGHT = 0.5
+PROXIMITY_POOL_FACTOR = 3
+
+# 문장 경계: 마침표류 뒤 공백, 줄바꿈
+SENTENCE_BREAK = re.compile(r"(?<=[.?!。])[ \t]+|\n+")
+
+# 마침표 없이 긴 줄(표 등)은 이 길이로 잘라 문장처럼 다룸
+MAX_SENTENCE_CHARS = 400
+
+# 잘라 낸 구간 사이 표시
+SNIPPET_SEPARATOR = "\n…\n"
+
+
+def find_offsets(text, terms):
+    """본문(소문자 비교)에서 검색어별 시작 위치 {검색어: [위치, ...]} (한 번의 다중 패턴 스캔)"""
+    terms = [t for t in dict.fromkeys(terms) if t]
+    if not terms:
+        return {}
+    return {term: starts for term, starts in find_all(text.lower(), terms).items() if starts}
+
+
+def proximity_score(offsets_by_term, window=PROXIMITY_WINDOW):
+    """
+    근접도 (0~1)
+    - window 글자 안에 함께 나오는 서로 다른 검색어 수의 최댓값으로 계산
+      (검색어 n개 중 m개가 모이면 (m-1)/(n-1))
+    - 검색어가 하나뿐이거나 한 종류만 나오면 0
+    """
+    present = [term for term, offsets in offsets_by_term.items() if len(offsets)]
+    if len(offsets_by_term) < 2 or len(present) < 2:
+        return 0.0
+    events = sorted((int(offset), i) for i, term in enumerate(present) for offset in offsets_by_term[term])
+    counts = [0] * len(present)
+    distinct = best = 0
+    left = 0
+    for offset, term in events:
+        if counts[term] == 0:
+            distinct += 1
+        counts[term] += 1
+        while offset - events[left][0] > window:
+            counts[events[left][1]] -= 1
+            if counts[events[left][1]] == 0:
+                distinct -= 1
+            left += 1
+        best = max(best, distinct)
+        if best == len(present):
+            break
+    return (best - 1) / (len(offsets_by_term) - 1)
+
+
+def proximity_boost(score, offsets_by_term, window=PROXIMITY_WINDOW, weight=PROXIMITY_WEIGHT):
+    """키워드 점수 × (1 + weight × 근접도)"""
+    return score * (1 + weight * proximity_score(offsets_by_term, window))
+
+
+def sentence_spans(text, max_chars=MAX_SENTENCE_CHARS):
+    """문장 (시작, 끝) 위치 목록 (빈 문장 제외, 긴 문장은 max_chars 로 나눔)"""
+    spans = []
+    start = 0
+    for match in list(SENTENCE_BREAK.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        while end - start > max_chars:
+            spans.append((start, start + max_chars))
+            start += max_chars
+        if end > start and text[start:end].strip():
+            spans.append((start, end))
+        start = match.end() if match else end
+    return spans
+
+
+def hit_windows(text, offsets, padding=1):
+    """
+    적중 위치가 든 문장 ± padding 문장 구간 [(시작, 끝)]
+    - 겹치거나 맞닿는 구간은 합침 (가까운 적중 묶음 = 구간 하나)
+    """
+    spans = sentence_spans(text)
+    if not spans or not offsets:
+        return []
+    starts = [start for start, _ in spans]
+    hit_sentences = sorted({max(0, bisect_right(starts, offset) - 1) for offset in offsets})
+    ranges = []
+    for i in hit_sentences:
+        lo, hi = max(0, i - padding), min(len(spans) - 1, i + padding)
+        if ranges and lo <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], hi)
+        else:
+            ranges.append([lo, hi])
+    return [(spans[lo][0], spans[hi][1]) for lo, hi in ranges]
+
+
+def extract_snippets(text, terms, padding=1, offsets_by_term=None, separator=SNIPPET_SEPARATOR):
+    """
+    청크에서 검색어 적중 구간만 잘라 합친 텍스트
+    - offsets_by_term: 위치 색인에서 얻은 위치 (없으면 본문을 한 번 스캔)
+    - 적중이 없으면(의미 검색으로만 찾은 청크 등) 청크 그대로
+    """
+    if offsets_by_term is None:
+        offsets_by_term = find_offsets(text, terms)
+    offsets = [int(offset) for positions in offsets_by_term.values() for offset in positions]
+    windows = hit_windows(text, offsets, padding)
+    if not windows:
+        return text
+    parts = [text[start:end].strip() for start, end in windows]
+    if windows[0][0] > 0:
+        parts[0] = "… " + parts[0]
+    if windows[-1][1] < len(text.rstrip()):
+        parts[-1] = parts[-1] + " …"
+    return separator.join(parts)
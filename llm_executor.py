@@ -0,0 +1,201 @@
+"""
+LLM 호출 실행기 (세션별 요청 ID + 취소 + 세션별 동시 실행 제한)
+- 채팅 질문의 검색/답변 생성을 Streamlit 스크립트 스레드 밖의 작업자 풀에서 실행
+- 같은 세션에서 새 질문이 들어오면 이전 요청을 취소
+  (대기 중이면 실행하지 않고, 실행 중이면 cancel_event 로 중단 신호)
+- 세션별 동시 실행 수를 제한해 한 사용자가 작업자를 독차지하지 못하게 함
+  (취소된 요청은 작업자가 신호를 확인하기 전이라도 바로 세션 자리를 돌려줌)
+- 결과는 세션이 요청 ID 로 poll() 해서 가져감
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+
+class RequestCancelled(Exception):
+    """새 질문에 밀려났거나 사용자가 취소한 요청"""
+
+
+def wait_future(future, cancel_event, poll_interval=0.2):
+    """다른 작업의 Future 를 기다리되 취소 신호가 오면 RequestCancelled"""
+    while True:
+        try:
+            return future.result(timeout=poll_interval)
+        except FutureTimeout:
+            if cancel_event.is_set():
+                raise RequestCancelled()
+
+
+class LLMRequest:
+    """요청 하나의 상태 (queued → running → done / failed / cancelled)"""
+
+    def __init__(self, request_id, session_id, fn, label=""):
+        self.request_id = request_id
+        self.session_id = session_id
+        self.fn = fn
+        self.label = label
+        self.cancel_event = threading.Event()
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def queue_time(self):
+        """작업자를 기다린 시간 (초)"""
+        if self.started_at is None:
+            return time.monotonic() - self.submitted_at
+        return self.started_at - self.submitted_at
+
+
+class LLMExecutor:
+    """
+    앱 전체 공유 작업자 풀
+    - submit(session_id, fn): fn(cancel_event) 을 실행 예약하고 요청 ID 반환
+    - 세션별로 max_per_session 개까지만 동시에 실행, 나머지는 세션 대기열에서 대기
+    - 완료 후 keep_seconds 동안 가져가지 않은 결과는 정리
+    """
+
+    def __init__(self, max_workers=8, max_per_session=2, keep_seconds=600):
+        self.max_per_session = max_per_session
+        self.keep_seconds = keep_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._ids = itertools.count(1)
+        self._requests = {}      # 요청 ID → LLMRequest
+        self._waiting = {}       # 세션 ID → 세션 한도 때문에 대기 중인 요청
+        self._running = {}       # 세션 ID → 세션 자리를 차지한 요청 수
+        self._slots = set()      # 세션 자리를 차지한 요청 ID (작업자 풀에 넘긴 뒤 끝나거나 취소될 때까지)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "superseded": 0}
+
+    # ------------------------------------------
+    # 세션 쪽
+    # ------------------------------------------
+    def submit(self, session_id, fn, label="", supersede=True):
+        """
+        요청 예약 → 요청 ID
+        - supersede=True 면 같은 세션의 끝나지 않은 요청은 모두 취소
+        """
+        with self._lock:
+            self._prune()
+            if supersede:
+                for request in self._requests.values():
+                    if request.session_id == session_id and not request.finished:
+                        self._cancel(request)
+                        self.stats["superseded"] += 1
+
+            request = LLMRequest(f"{session_id[:8]}-{next(self._ids)}", session_id, fn, label)
+            self._requests[request.request_id] = request
+            self._waiting.setdefault(session_id, deque()).append(request)
+            self.stats["submitted"] += 1
+            self._dispatch(session_id)
+            return request.request_id
+
+    def cancel(self, request_id):
+        """요청 취소 (이미 끝났으면 False)"""
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request is None or request.finished:
+                return False
+            self._cancel(request)
+            self._dispatch(request.session_id)
+            return True
+
+    def poll(self, request_id):
+        """
+        요청 상태 조회
+        - 끝난 요청은 반환과 함께 목록에서 제거 (결과는 한 번만 전달)
+        - 모르는 요청 ID 면 None
+        """
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request is not None and request.finished:
+                del self._requests[request_id]
+            return request
+
+    def active(self, session_id):
+        """세션의 끝나지 않은 요청 수"""
+        with self._lock:
+            return sum(1 for r in self._requests.values() if r.session_id == session_id and not r.finished)
+
+    # ------------------------------------------
+    # 내부
+    # ------------------------------------------
+    def _cancel(self, request):
+        """
+        취소 확정 + 세션 자리 반납 (lock 보유 상태에서 호출, 대기 요청 넘기기는 호출한 쪽에서)
+        - 시작 전이면 작업자는 건너뛰고, 실행 중이면 cancel_event 를 보고 멈춘 뒤 결과를 버림
+        """
+        request.cancel_event.set()
+        self._finish(request, "cancelled")
+        self._release(request)
+
+    def _release(self, request):
+        """요청이 차지한 세션 자리 반납 (이미 반납했으면 무시)"""
+        if request.request_id not in self._slots:
+            return
+        self._slots.discard(request.request_id)
+        self._running[request.session_id] -= 1
+        if not self._running[request.session_id]:
+            del self._running[request.session_id]
+
+    def _finish(self, request, status, result=None, error=None):
+        request.status = status
+        request.result = result
+        request.error = error
+        request.finished_at = time.monotonic()
+        self.stats[status] += 1
+
+    def _prune(self):
+        """가져가지 않은 오래된 결과 정리"""
+        now = time.monotonic()
+        for request_id, request in list(self._requests.items()):
+            if request.finished and now - request.finished_at > self.keep_seconds:
+                del self._requests[request_id]
+
+    def _dispatch(self, session_id):
+        """세션 한도 안에서 대기 요청을 작업자 풀로 넘김 (lock 보유 상태에서 호출)"""
+        waiting = self._waiting.get(session_id)
+        while waiting and self._running.get(session_id, 0) < self.max_per_session:
+            request = waiting.popleft()
+            if request.finished:
+                continue
+            self._running[session_id] = self._running.get(session_id, 0) + 1
+            self._slots.add(request.request_id)
+            self._pool.submit(self._execute, request)
+        if not waiting:
+            self._waiting.pop(session_id, None)
+
+    def _execute(self, request):
+        try:
+            with self._lock:
+                if request.finished:
+                    return
+                request.status = "running"
+                request.started_at = time.monotonic()
+
+            status, result, error = "done", None, None
+            try:
+                result = request.fn(request.cancel_event)
+            except RequestCancelled:
+                status = "cancelled"
+            except Exception as e:
+                status, error = "failed", e
+
+            with self._lock:
+                # 실행 중에 취소됐으면 이미 취소로 확정됨 → 결과는 버림
+                if not request.finished:
+                    self._finish(request, status, result, error)
+        finally:
+            with self._lock:
+                self._release(request)
+                self._dispatch(request.session_id)
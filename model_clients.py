@@ -0,0 +1,132 @@
+"""
+Gemini 클라이언트 지연 로딩 / 백그라운드 예열
+- google.generativeai 는 불러오는 데만 0.5초 넘게 걸려 스크립트 맨 위에서 불러오지 않음
+  (파일을 올리기 전 빈 화면에는 필요 없음)
+- configure_api() 가 API 키를 확인하면 start() 로 백그라운드 스레드에서 미리 준비
+  모듈 로드 → genai.configure → 후보 모델 객체 생성 → 생성 클라이언트 연결(count_tokens 한 번)
+- 첫 질문은 예열이 끝났으면 바로 쓰고, 진행 중이면 모듈 로드가 끝날 때까지만 기다림
+- 예열 중 네트워크 오류는 무시 (실제 요청 때 다시 연결)
+- generate(): 후보 모델을 순서대로 시도하는 답변 생성 (두 앱 공용)
+  hedge(HedgePolicy) 를 주면 첫 토큰이 늦을 때 다음 후보에도 보내는 헤지 요청 (hedged_requests)
+"""
+import threading
+import time
+
+from llm_executor import RequestCancelled
+
+
+class ModelClients:
+    """
+    프로세스 전체에서 공유하는 Gemini 모델 객체 모음
+    - model(이름, 생성 설정): 같은 설정이면 같은 GenerativeModel 재사용 (요청마다 새로 만들지 않음)
+    - generate(프롬프트): 후보 모델 순서대로 시도해 처음 성공한 (응답, 모델 이름)
+    - timings: 예열 단계별 소요 시간 (초)
+    """
+
+    def __init__(self, api_key, model_names, generation_config=None, warm_connection=True):
+        self.api_key = api_key
+        self.model_names = list(model_names)
+        self.generation_config = generation_config
+        self.warm_connection = warm_connection
+        self.timings = {}
+        self.warm_error = None
+        self._genai = None
+        self._models = {}
+        self._load_lock = threading.Lock()
+        self._models_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self):
+        """백그라운드 예열 시작"""
+        threading.Thread(target=self._warm, name="gemini-warmup", daemon=True).start()
+        return self
+
+    @property
+    def genai(self):
+        """google.generativeai 모듈 (처음 호출 때 불러오고 API 키 설정)"""
+        if self._genai is None:
+            with self._load_lock:
+                if self._genai is None:
+                    start = time.perf_counter()
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self.timings["import"] = time.perf_counter() - start
+                    self._genai = genai
+        return self._genai
+
+    def model(self, name, generation_config=None):
+        """모델 객체 (generation_config 가 없으면 기본 설정)"""
+        config = generation_config if generation_config is not None else self.generation_config
+        key = (name, tuple(sorted((config or {}).items())))
+        genai = self.genai
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name=name, generation_config=config)
+                self._models[key] = model
+        return model
+
+    def generate(self, prompt, generation_config=None, cancel_event=None, hedge=None):
+        """
+        답변 생성 (폴백 모델 지원)
+        - 실패하거나 안전 필터에 막히면 다음 후보 모델로
+        - cancel_event 가 있으면 스트리밍으로 받으면서 취소 여부 확인 (취소되면 RequestCancelled)
+        - hedge(HedgePolicy) 가 있으면 헤지 요청 (hedged_requests.hedged_generate)
+        - 반환: (응답 텍스트, 모델 이름)
+        """
+        if hedge is not None:
+            from hedged_requests import hedged_generate
+
+            return hedged_generate(self, prompt, hedge, generation_config, cancel_event)
+
+        last_error = None
+        for model_name in self.model_names:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled()
+            try:
+                model = self.model(model_name, generation_config)
+                response = model.generate_content(prompt, stream=cancel_event is not None)
+                if cancel_event is not None:
+                    # 취소되면 남은 응답 생성을 받지 않고 중단
+                    for _ in response:
+                        if cancel_event.is_set():
+                            raise RequestCancelled()
+
+                # 안전 필터 체크
+                if hasattr(response, 'prompt_feedback'):
+                    if response.prompt_feedback.block_reason:
+                        continue
+
+                return response.text, model_name
+
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+
+        raise Exception(f"모든 모델 시도 실패. 마지막 오류: {str(last_error)}")
+
+    def _warm(self):
+        try:
+            self.genai
+            start = time.perf_counter()
+            models = [self.model(name) for name in self.model_names]
+            self.timings["models"] = time.perf_counter() - start
+            if self.warm_connection and models:
+                # 생성 클라이언트(gRPC 채널)를 만들고 연결까지 맺어 둠 (토큰 수 조회는 생성 요청이 아님)
+                start = time.perf_counter()
+                try:
+                    models[0].count_tokens("안녕하세요")
+                except Exception as e:
+                    self.warm_error = e
+                self.timings["connect"] = time.perf_counter() - start
+        except Exception as e:
+            self.warm_error = e
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout=None):
+        """예열이 끝날 때까지 대기 (벤치마크/진단용)"""
+        return self._ready.wait(timeout)
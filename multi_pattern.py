@@ -0,0 +1,96 @@
+"""
+다중 패턴 매칭 (Aho-Corasick) + 보험 용어 동의어 사전
+- 질문 검색어와 동의어 전체를 하나의 오토마톤으로 컴파일
+- 텍스트를 한 번만 훑어서 모든 검색어의 등장 위치를 셈
+- 컴파일된 오토마톤은 검색어 집합(질문 시그니처)별로 캐싱
+- pyahocorasick(C 구현)이 있으면 사용, 없으면 검색어마다 정규식 스캔
+  (순수 파이썬 오토마톤은 글자마다 파이썬 코드를 돌아 검색어별 C 스캔보다 느림)
+"""
+import re
+from functools import lru_cache
+
+try:
+    import ahocorasick
+except ImportError:  # 선택 의존성
+    ahocorasick = None
+
+# 보험사마다 표현이 다른 같은 개념 (첫 번째가 대표 표현)
+INSURANCE_SYNONYMS = [
+    ("암", "악성신생물", "악성종양"),
+    ("진단금", "진단비", "진단자금", "진단급여금"),
+    ("수술비", "수술급여금", "수술자금"),
+    ("입원비", "입원급여금", "입원일당"),
+    ("사망보험금", "사망급여금"),
+    ("갱신형", "자동갱신형"),
+    ("특약", "특별약관"),
+    ("면책", "보장 제외", "보상하지 않는 손해"),
+]
+
+
+def expand_synonyms(keywords, synonyms=INSURANCE_SYNONYMS):
+    """
+    검색어에 포함된 용어의 동의어 목록 (원래 검색어에 없는 것만)
+    - "진단금과"처럼 조사가 붙어 있어도 포함 여부로 판단
+    """
+    expanded = []
+    for keyword in keywords:
+        for group in synonyms:
+            if not any(surface in keyword for surface in group):
+                continue
+            for surface in group:
+                if surface not in keyword and surface not in keywords and surface not in expanded:
+                    expanded.append(surface)
+    return expanded
+
+
+class _PyAhoCorasick:
+    """pyahocorasick 래퍼 ((끝 위치, 패턴 번호) 를 끝 위치 순으로 생성하는 iter)"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._automaton = ahocorasick.Automaton()
+        for idx, pattern in enumerate(self.patterns):
+            self._automaton.add_word(pattern, idx)
+        self._automaton.make_automaton()
+
+    def iter(self, text):
+        if not self.patterns:
+            return iter(())
+        return self._automaton.iter(text)
+
+
+@lru_cache(maxsize=256)
+def compile_patterns(signature):
+    """
+    검색어 집합 → 오토마톤 (시그니처: 정렬된 검색어 튜플, pyahocorasick 이 있을 때만)
+    """
+    return _PyAhoCorasick(signature)
+
+
+def _find_each(text, signature):
+    """검색어마다 한 번씩 스캔 (re.finditer 는 str.count 와 같은 왼쪽 우선 비중첩 매칭)"""
+    return {pattern: [m.start() for m in re.finditer(re.escape(pattern), text)] for pattern in signature}
+
+
+def find_all(text, patterns):
+    """
+    한 번의 스캔으로 패턴별 시작 위치 목록
+    - 패턴별로 str.count 와 같은 왼쪽 우선 비중첩 매칭
+    - pyahocorasick 이 없으면 검색어마다 스캔 (결과는 같음)
+    - 반환: {패턴: [시작 위치, ...]}
+    """
+    signature = tuple(sorted(set(p for p in patterns if p)))
+    if ahocorasick is None:
+        return _find_each(text, signature)
+    automaton = compile_patterns(signature)
+    lengths = [len(p) for p in signature]
+    starts = [[] for _ in signature]
+    last_end = [0] * len(signature)
+
+    for end, idx in automaton.iter(text):
+        start = end - lengths[idx] + 1
+        if start >= last_end[idx]:
+            starts[idx].append(start)
+            last_end[idx] = end + 1
+
+    return dict(zip(signature, starts))
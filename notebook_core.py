@@ -0,0 +1,217 @@
+"""
+두 앱(보험 약관 비교 app.py, 홈 닥터 insurance_analyzer_improved.py)이 같이 쓰는 추출/캐시/코퍼스/검색 계층
+- 추출: PDF 는 내용 해시를 키로 st.cache_data 캐싱 (같은 파일이면 어느 앱/세션에서든 한 번만 추출)
+- 코퍼스/저장소/검색 서비스 클라이언트: 프로세스 전체 공유 (st.cache_resource)
+- 검색: 약관 비교용 컨텍스트(get_smart_context 등), 홈 닥터용 권별 샤드 검색(get_relevant_content)
+- LLM 호출은 model_clients.ModelClients (예열/모델 재사용/후보 모델 폴백)
+- NumPy/SciPy 를 쓰는 검색 모듈은 함수 안에서 불러옴 (앱 첫 화면에서 불러오지 않음)
+"""
+import streamlit as st
+
+from hit_windows import extract_snippets
+from multi_pattern import expand_synonyms
+from pdf_extraction import extract_pages
+from text_normalization import estimate_tokens, normalize_pages, normalize_text  # noqa: F401 (estimate_tokens 재노출)
+
+# 홈 닥터 검색: 청크 크기 / 상위 청크 수 / 적중 문장 앞뒤로 함께 보낼 문장 수
+RELEVANT_CHUNK_SIZE = 1000
+RELEVANT_TOP_K = 10
+RELEVANT_SNIPPET_PADDING = 1
+
+
+# ==========================================
+# 추출 / 캐시
+# ==========================================
+
+@st.cache_data(show_spinner=False)
+def extract_text_from_pdf(_source, key, filename, engine="auto"):
+    """
+    PDF에서 텍스트 추출 (캐싱 적용)
+    - _source: 파일 바이트 또는 경로 (캐시 키는 내용 해시 key, 매 실행마다 내용을 다시 해시하지 않음)
+    - 선택한 엔진이 실패하면 다른 엔진으로 폴백
+    - 머리말/꼬리말/쪽 번호 제거, 끊긴 줄 복원 (원래 페이지 매핑 유지)
+    - 반환: (정리된 문서, 페이지 수, 오류, 사용한 엔진)
+    """
+    try:
+        pages, engine_used = extract_pages(_source, engine)
+        return normalize_pages(pages), len(pages), None, engine_used
+    except Exception as e:
+        return None, 0, str(e), None
+
+
+def read_document(upload, engine="auto"):
+    """
+    업로드/책 파일 하나(UploadSource) → (정리된 문서, 페이지/줄 수, 오류, 사용한 엔진)
+    - PDF 는 내용 해시로 캐싱된 추출 결과 재사용 (재실행마다 다시 파싱하지 않음)
+    - TXT 는 그대로 정리 (페이지 구분 없음)
+    """
+    if upload.is_pdf:
+        return extract_text_from_pdf(upload.source, upload.key, upload.name, engine)
+    raw_text = upload.text()
+    return normalize_text(raw_text), raw_text.count('\n') + 1, None, None
+
+
+# ==========================================
+# 코퍼스 / 저장소 (앱 전체 공유)
+# ==========================================
+
+@st.cache_resource
+def get_fts_store(path=None):
+    """SQLite FTS5 코퍼스 저장소 (앱 전체 공유, 다른 작업자 프로세스와 같은 DB 파일 사용 가능)"""
+    from fts_store import DEFAULT_DB_PATH, FTSStore
+
+    return FTSStore(path or DEFAULT_DB_PATH, chunk_size=2500, overlap=500)
+
+
+@st.cache_resource
+def get_retrieval_client():
+    """검색 서비스 클라이언트 (NOTEBOOK_AI_RETRIEVAL_URL 이 없으면 None → 이 프로세스에서 직접 색인)"""
+    from retrieval_client import RetrievalClient
+
+    return RetrievalClient.from_env()
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_volume_index(volumes):
+    """
+    권별 샤드 색인 (volumes: ((파일명, 텍스트), ...), 자료가 바뀔 때만 다시 생성)
+    - 권을 이어 붙인 본문 기준 1000자 청크(합친 색인과 같은 청크) + 권마다 블룸 필터, 검색어가 없는 권은 건너뜀
+    """
+    from sharded_index import ShardedIndex
+
+    return ShardedIndex(volumes, chunk_size=RELEVANT_CHUNK_SIZE, overlap=0, lowercase=False)
+
+
+# ==========================================
+# 검색 (보험 약관 비교)
+# ==========================================
+
+def parse_query_keywords(query, synonyms=False):
+    """
+    검색어 전처리 (소문자화, 한 글자 단어 제외)
+    - synonyms: 보험 용어 동의어 추가 (진단금/진단비, 암/악성신생물 등)
+    """
+    keywords = [word.lower() for word in query.split() if len(word) > 1]
+    if synonyms:
+        # 한 글자 용어("암")도 동의어 확장 대상
+        keywords += [w for w in expand_synonyms(query.lower().split()) if len(w) > 1 and w not in keywords]
+    return keywords
+
+
+def get_smart_context(corpus, query, max_chunks=15, synonyms=False, locate=None, snippet_padding=None):
+    """
+    스마트 컨텍스트 검색 (개선된 버전)
+    - 키워드 매칭 강화
+    - TF-IDF 스타일 스코어링
+    - 파일별 세그먼트에서 희소 행렬 곱 + argpartition 으로 상위 청크 선택
+    - 검색어와 동의어를 한 번의 Aho-Corasick 스캔으로 셈 (동의어 확장에 추가 스캔 없음)
+    - corpus: 세션 코퍼스(SegmentedCorpus) 또는 SQLite FTS5 저장소 뷰(FTSView)
+    - snippet_padding: 있으면 검색어가 모인 청크를 우선하고, 청크 전체 대신 적중 문장 ± padding 문장만 사용
+    - 반환: (컨텍스트, 참조 구간 ID 목록)
+    """
+    if corpus is None or not query:
+        return "", []
+
+    # 빈도 × (1 + 길이/10) 점수순 상위 청크 선택
+    keywords = parse_query_keywords(query, synonyms)
+    results = corpus.search(keywords, max_chunks, weighting="frequency", proximity=snippet_padding is not None)
+    return format_context(results, locate, corpus.shared_files, keywords, snippet_padding)
+
+
+def get_hybrid_context(corpus, query, max_chunks=15, synonyms=False, locate=None, snippet_padding=None):
+    """
+    하이브리드 컨텍스트 검색
+    - 키워드 점수 + 의미(임베딩) 유사도 결합
+    - "악성신생물"처럼 표현이 달라도 관련 청크를 찾음
+    - 반환: (컨텍스트, 참조 구간 ID 목록)
+    """
+    if corpus is None or not query:
+        return "", []
+
+    keywords = parse_query_keywords(query, synonyms)
+    results = corpus.hybrid_search(keywords, query, max_chunks)
+    return format_context(results, locate, corpus.shared_files, keywords, snippet_padding)
+
+
+def get_adaptive_context(corpus, query, depth, retrieval_mode, synonyms=False, locate=None, snippet_padding=None):
+    """
+    자동 분석 깊이 컨텍스트 검색
+    - 최대 깊이만큼 점수와 함께 검색한 뒤 depth(DepthController)가 고른 청크 수만 사용
+      (점수가 크게 떨어지는 지점에서 멈추고, 최근 응답 시간이 목표 p95 를 넘을 것 같으면 줄임)
+    - 반환: (컨텍스트, 참조 구간 ID 목록, 깊이 결정)
+    """
+    if corpus is None or not query:
+        return "", [], None
+
+    keywords = parse_query_keywords(query, synonyms)
+    if retrieval_mode == "하이브리드":
+        ranked = corpus.hybrid_rank(keywords, query, depth.max_chunks)
+    else:
+        ranked = corpus.rank(keywords, depth.max_chunks, weighting="frequency", proximity=snippet_padding is not None)
+    decision = depth.choose([score for score, *_ in ranked], label=query)
+    context, span_ids = format_context(
+        [(name, chunk, span_id) for _, name, chunk, span_id in ranked[:decision["chunks"]]],
+        locate, corpus.shared_files, keywords, snippet_padding
+    )
+    return context, span_ids, decision
+
+
+def format_context(results, locate=None, shared=None, keywords=None, snippet_padding=None):
+    """
+    검색 결과를 파일명/구간 ID 머리말이 붙은 컨텍스트로 합침
+    - locate(구간 ID) 가 페이지 범위를 주면 머리말에 원래 PDF 페이지 표시
+    - shared(구간 ID) 가 파일 목록을 주면 같은 조항을 가진 다른 보험사 표시
+    - snippet_padding 이 있으면 청크에서 keywords 가 나온 문장 ± padding 문장만 넣음
+    """
+    top_chunks = []
+    for name, chunk, span_id in results:
+        header = f"[파일: {name} | 구간: {span_id}"
+        pages = locate(span_id) if locate else None
+        if pages:
+            header += f" | p.{pages[0]}" if pages[0] == pages[1] else f" | p.{pages[0]}-{pages[1]}"
+        same_clause = shared(span_id) if shared else None
+        if same_clause:
+            header += f" | 공통 조항 동일: {', '.join(same_clause)}"
+        if snippet_padding is not None:
+            chunk = extract_snippets(chunk, keywords, snippet_padding)
+        top_chunks.append(f"{header}]\n{chunk}")
+    span_ids = [span_id for _, _, span_id in results]
+
+    return "\n\n━━━━━━━━━━━━━━━━━━\n\n".join(top_chunks), span_ids
+
+
+def retrieve_context(corpus, query, max_chunks, retrieval_mode, synonyms, locate=None, snippet_padding=None):
+    """검색 방식에 따라 컨텍스트 추출 → (컨텍스트, 참조 구간 ID 목록)"""
+    if retrieval_mode == "하이브리드":
+        return get_hybrid_context(corpus, query, max_chunks=max_chunks, synonyms=synonyms, locate=locate,
+                                  snippet_padding=snippet_padding)
+    return get_smart_context(corpus, query, max_chunks=max_chunks, synonyms=synonyms, locate=locate,
+                             snippet_padding=snippet_padding)
+
+
+# ==========================================
+# 검색 (홈 닥터)
+# ==========================================
+
+def get_relevant_content(volumes, query, doc_keys=None, k=RELEVANT_TOP_K, snippet_padding=RELEVANT_SNIPPET_PADDING,
+                         restore=None):
+    """
+    포함된 검색어 수로 점수화한 상위 k개 청크의 적중 문장 구간
+    - doc_keys 가 있고 검색 서비스를 쓰면 서비스 코퍼스에서 (같은 1000자 청크)
+      (서비스에 없어진 문서는 restore(키 목록) 으로 다시 적재)
+    - 아니면 권별 샤드 색인에서, 후보를 더 뽑아 검색어가 한곳에 모인 청크를 앞으로 (위치 색인 사용)
+    """
+    retrieval = get_retrieval_client()
+    if doc_keys and retrieval is not None:
+        # 서비스 색인은 소문자 기준이라 검색어도 소문자로
+        keywords = [word.lower() for word in query.split()]
+        corpus = retrieval.open_corpus(doc_keys, chunk_size=RELEVANT_CHUNK_SIZE, overlap=0, restore=restore)
+        results = corpus.search(keywords, k, weighting="presence", proximity=True)
+        return "\n...\n".join(extract_snippets(chunk, keywords, snippet_padding) for _, chunk, _ in results)
+    index = build_volume_index(volumes)
+    keywords = query.split()
+    ranked = index.rank(keywords, k, weighting="presence", proximity=True)
+    return "\n...\n".join(
+        extract_snippets(index.chunk(shard, row), keywords, snippet_padding, offsets)
+        for _, shard, row, offsets in ranked
+    )
@@ -0,0 +1,194 @@
+"""
+PDF 텍스트 추출 엔진
+- PyPDF2(순수 파이썬, 기본) + pypdfium2 / PyMuPDF(C 구현, 설치되어 있으면 사용)
+- 엔진을 순서대로 시도하고, 문서 단위로 실패하면 다음 엔진으로 폴백
+- 텍스트가 전혀 안 나오는 엔진도 실패로 보고 다음 엔진 시도 (모두 비면 빈 결과)
+- NOTEBOOK_AI_PDF_ENGINE 환경변수로 기본 엔진 지정 (auto | pypdfium2 | pymupdf | pypdf2)
+- 엔진 모듈은 설치 여부만 먼저 확인하고 처음 추출할 때 불러옴 (앱 첫 화면 로딩을 가볍게)
+"""
+import os
+import re
+import threading
+from importlib.util import find_spec
+from io import BytesIO
+
+# 선택 의존성 설치 여부
+_INSTALLED = {
+    "pypdfium2": find_spec("pypdfium2") is not None,
+    "pymupdf": find_spec("fitz") is not None,  # PyMuPDF
+    "pypdf2": True,
+}
+
+# 빠른 엔진 우선 (자동 선택 순서)
+ENGINE_ORDER = ("pypdfium2", "pymupdf", "pypdf2")
+
+ENGINE_LABELS = {
+    "pypdfium2": "pypdfium2 (PDFium)",
+    "pymupdf": "PyMuPDF (MuPDF)",
+    "pypdf2": "PyPDF2 (순수 파이썬)",
+}
+
+# PDFium 은 스레드 안전하지 않음 (세션 간 동시 추출 직렬화)
+_PDFIUM_LOCK = threading.Lock()
+
+
+class ExtractionError(Exception):
+    """모든 엔진이 실패한 경우 (엔진별 오류 메시지 포함)"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{engine}: {error}" for engine, error in errors))
+
+
+def _normalize(text):
+    return (text or "").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _is_letter_spaced(line):
+    """글자마다 공백이 들어간 줄인지 (한 글자 토큰이 대부분)"""
+    tokens = line.split()
+    return len(tokens) >= 4 and sum(1 for t in tokens if len(t) == 1) >= 0.6 * len(tokens)
+
+
+def _respace_letter_spaced(textpage, text):
+    """
+    자간이 넓은(양쪽 정렬) 줄에서 PDFium 이 글자마다 끼워 넣은 공백 정리
+    - 생성된 공백만 대상으로, 앞뒤 글자 간격이 줄의 보통 글자 간격보다
+      충분히 넓을 때(단어 경계)만 공백을 남김
+    """
+    import pypdfium2.raw as pdfium_c
+
+    if textpage.count_chars() != len(text):
+        return text
+
+    pieces = []
+    last = 0
+    for match in re.finditer(r"[^\r\n]+", text):
+        if not _is_letter_spaced(match.group()):
+            continue
+        start, end = match.span()
+        glyphs = [i for i in range(start, end) if not text[i].isspace()]
+        boxes = {i: textpage.get_charbox(i) for i in glyphs}
+        gaps = sorted(boxes[b][0] - boxes[a][2] for a, b in zip(glyphs, glyphs[1:]))
+        if not gaps:
+            continue
+        median_gap = gaps[len(gaps) // 2]
+
+        line = []
+        prev = None
+        for i in range(start, end):
+            if not text[i].isspace():
+                line.append(text[i])
+                prev = i
+                continue
+            nxt = next((j for j in range(i + 1, end) if not text[j].isspace()), None)
+            if prev is not None and nxt is not None and pdfium_c.FPDFText_IsGenerated(textpage.raw, i):
+                gap = boxes[nxt][0] - boxes[prev][2]
+                height = max(boxes[prev][3] - boxes[prev][1], boxes[nxt][3] - boxes[nxt][1])
+                if gap < 0.6 * height and gap < 1.6 * median_gap:
+                    continue
+            if line and line[-1] != " ":
+                line.append(" ")
+        pieces.append(text[last:start])
+        pieces.append("".join(line))
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def _extract_pypdf2(source):
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+    return [_normalize(page.extract_text()) for page in reader.pages]
+
+
+def _extract_pypdfium2(source):
+    import pypdfium2
+
+    with _PDFIUM_LOCK:
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            pages = []
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                pages.append(_normalize(_respace_letter_spaced(textpage, textpage.get_text_range())))
+                textpage.close()
+                page.close()
+            return pages
+        finally:
+            pdf.close()
+
+
+def _extract_pymupdf(source):
+    import fitz
+
+    doc = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+    try:
+        return [_normalize(page.get_text()) for page in doc]
+    finally:
+        doc.close()
+
+
+_EXTRACTORS = {
+    "pypdfium2": _extract_pypdfium2,
+    "pymupdf": _extract_pymupdf,
+    "pypdf2": _extract_pypdf2,
+}
+
+
+def available_engines():
+    """설치된 엔진 목록 (자동 선택 순서)"""
+    return [engine for engine in ENGINE_ORDER if _INSTALLED[engine]]
+
+
+def engine_order(preferred=None):
+    """
+    시도할 엔진 순서
+    - preferred 가 없거나 "auto" 면 환경변수 → 자동 순서
+    - 지정 엔진을 먼저 시도하고 나머지는 폴백으로 뒤에 붙임
+    """
+    preferred = preferred or os.environ.get("NOTEBOOK_AI_PDF_ENGINE", "auto")
+    engines = available_engines()
+    if preferred in engines:
+        engines.remove(preferred)
+        engines.insert(0, preferred)
+    return engines
+
+
+def extract_pages(source, engine=None):
+    """
+    페이지별 텍스트 추출 (source: PDF 바이트 또는 파일 경로)
+    - 반환: (페이지 텍스트 목록, 사용한 엔진)
+    - 모든 엔진이 실패하면 ExtractionError
+    """
+    errors = []
+    empty = None
+    for name in engine_order(engine):
+        try:
+            pages = _EXTRACTORS[name](source)
+        except Exception as e:
+            errors.append((name, str(e)))
+            continue
+        if any(page.strip() for page in pages):
+            return pages, name
+        if empty is None:
+            empty = (pages, name)
+    if empty is not None:
+        return empty
+    raise ExtractionError(errors)
+
+
+def join_pages(pages):
+    """페이지 텍스트를 하나로 합침 (빈 페이지 제외, 페이지마다 줄바꿈)"""
+    return "".join(page + "\n" for page in pages if page)
+
+
+def extract_text(source, engine=None):
+    """
+    문서 전체 텍스트 추출
+    - 반환: (텍스트, 전체 페이지 수, 사용한 엔진)
+    """
+    pages, used = extract_pages(source, engine)
+    return join_pages(pages), len(pages), used
@@ -0,0 +1,173 @@
+"""
+요청별 프로파일링 (cProfile + tracemalloc)
+- 질문/업로드 하나를 profile_request() 블록으로 감싸면 호출 프로파일과 메모리 할당 상위를 기록
+- 파일로 저장 (PROFILE_DIR)
+  - <이름>.prof: pstats 형식 (snakeviz, tuna, flameprof 로 플레임 그래프/아이시클 보기)
+  - <이름>.alloc.txt: 블록 시작 대비 늘어난 할당 상위 (tracemalloc, 파일:줄 단위)
+- cProfile 은 블록을 연 스레드만 측정하므로 질문은 작업자 스레드 안에서, 업로드는 메인 스레드에서 염
+- cProfile 측정은 한 번에 하나만 (다른 요청이 측정 중이면 시간/메모리만 기록)
+- tracemalloc 은 프로세스 전체를 추적하므로 동시에 처리 중인 다른 요청의 할당도 섞일 수 있음
+  - 측정 중인 요청 수를 세어 이 모듈이 켠 추적만, 마지막 요청이 끝날 때 끔 (호스트가 켠 추적은 그대로)
+  - 최대 메모리 기록은 혼자 측정할 때만 초기화 (다른 요청/호스트의 최대값을 지우지 않음)
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+# NOTEBOOK_AI_PROFILE=1 이면 모든 세션에서 프로파일링 모드로 시작
+PROFILE_BY_DEFAULT = os.environ.get("NOTEBOOK_AI_PROFILE", "") not in ("", "0", "false")
+
+# 저장 위치 (없으면 캐시 디렉터리 아래 profiles, 처음 저장할 때 결정)
+PROFILE_DIR = os.environ.get("NOTEBOOK_AI_PROFILE_DIR")
+
+# 요약에 보여 줄 함수/할당 수, tracemalloc 이 기록하는 호출 스택 깊이
+TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+TRACE_FRAMES = 8
+
+_profile_lock = threading.Lock()
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False  # 이 모듈이 추적을 켰는지 (호스트/다른 도구가 켠 추적은 끄지 않음)
+
+
+def _start_tracemalloc():
+    """측정 시작 (최대 메모리를 이 요청 기준으로 초기화했으면 True)"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+        if _tracemalloc_users == 1 and _tracemalloc_owned:
+            tracemalloc.reset_peak()
+            return True
+        return False
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+def function_label(func):
+    """pstats 함수 키 (파일, 줄, 이름) → '이름 (파일명:줄)'"""
+    filename, line, name = func
+    if filename == "~":
+        return name  # 내장 함수
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class ProfileReport:
+    """
+    요청 하나의 프로파일 결과
+    - functions: 자체 시간 상위 [{"함수", "호출", "자체(초)", "누적(초)"}]
+    - allocations: 늘어난 할당 상위 [{"위치", "증가(KB)", "블록 수"}]
+    - peak_kb: 블록 동안 추적된 메모리 최댓값
+      (다른 요청과 겹쳐 측정했거나 호스트가 추적 중이면 블록 밖 구간까지 포함한 상한)
+    - path/alloc_path: 저장한 파일 (cProfile 을 건너뛰었으면 path 는 None)
+    """
+
+    def __init__(self, kind, label):
+        self.kind = kind
+        self.label = label
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.functions = []
+        self.allocations = []
+        self.peak_kb = 0.0
+        self.path = None
+        self.alloc_path = None
+        self.note = None
+
+    def finish(self, profiler, before, after, peak, directory, top_functions, top_allocations, exclusive=True):
+        self.peak_kb = peak / 1024
+        notes = []
+        if directory is None:
+            from dense_retrieval import DEFAULT_CACHE_DIR
+
+            directory = os.path.join(DEFAULT_CACHE_DIR, "profiles")
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.kind}-{uuid.uuid4().hex[:6]}")
+
+        if profiler is not None:
+            self.path = stem + ".prof"
+            profiler.dump_stats(self.path)
+            stats = pstats.Stats(profiler).stats
+            hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_functions]
+            self.functions = [
+                {"함수": function_label(func), "호출": calls, "자체(초)": round(own, 4), "누적(초)": round(cumulative, 4)}
+                for func, (_, calls, own, cumulative, _) in hottest
+            ]
+        else:
+            notes.append("다른 요청을 측정하는 중이라 호출 프로파일은 건너뜀 (시간/메모리만 기록)")
+        if not exclusive:
+            notes.append("다른 요청 측정(또는 호스트의 추적)과 겹쳐 최대 메모리는 블록 밖 할당까지 포함한 상한")
+        self.note = " / ".join(notes) or None
+
+        growth = after.compare_to(before, "lineno")
+        self.allocations = [
+            {"위치": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+             "증가(KB)": round(s.size_diff / 1024, 1), "블록 수": s.count_diff}
+            for s in growth[:top_allocations] if s.size_diff > 0
+        ]
+        self.alloc_path = stem + ".alloc.txt"
+        with open(self.alloc_path, "w", encoding="utf-8") as f:
+            f.write(f"# {self.kind}: {self.label}\n")
+            f.write(f"# 소요 {self.elapsed:.3f}초, 최대 추적 메모리 {self.peak_kb:,.0f} KB\n")
+            for stat in after.compare_to(before, "traceback")[:top_allocations]:
+                if stat.size_diff <= 0:
+                    continue
+                f.write(f"\n+{stat.size_diff / 1024:,.1f} KB ({stat.count_diff:+} 블록)\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+
+    def summary(self):
+        return f"{self.kind} · {self.label[:30]} · {self.elapsed:.2f}초 · 최대 {self.peak_kb / 1024:,.1f} MB"
+
+
+@contextmanager
+def profile_request(kind, label, enabled=True, sink=None, directory=PROFILE_DIR,
+                    top_functions=TOP_FUNCTIONS, top_allocations=TOP_ALLOCATIONS):
+    """
+    블록 실행을 프로파일링 (enabled 가 아니면 아무것도 하지 않고 None)
+    - sink(list/deque) 가 있으면 끝난 보고서를 추가 (작업자 스레드에서 세션 목록으로 전달)
+    """
+    if not enabled:
+        yield None
+        return
+    report = ProfileReport(kind, label)
+    exclusive = _start_tracemalloc()
+    before = _snapshot()
+    profiler = cProfile.Profile() if _profile_lock.acquire(blocking=False) else None
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield report
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+        report.elapsed = time.perf_counter() - start
+        after = _snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _stop_tracemalloc()
+        report.finish(profiler, before, after, peak, directory, top_functions, top_allocations, exclusive)
+        if sink is not None:
+            sink.append(report)
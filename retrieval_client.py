@@ -0,0 +1,200 @@
+"""
+검색 서비스(retrieval_service.py) 클라이언트
+- 보험 비교 앱/홈 닥터 앱이 같은 방식으로 사용 (NOTEBOOK_AI_RETRIEVAL_URL 이 있을 때)
+- 파일은 내용 해시로 먼저 조회하고 서비스에 없을 때만 업로드
+- RemoteCorpus 는 SegmentedCorpus 와 같은 검색 메서드(rank/search/hybrid_rank/hybrid_search)를 가져
+  get_smart_context 등에 그대로 넘김
+- 서비스가 재시작되어 문서가 없어졌으면 open_corpus(restore=...) 로 받은 함수로 다시 적재하고 재시도
+- 표준 라이브러리 urllib 만 사용
+"""
+import hashlib
+import json
+import os
+import threading
+from http.client import HTTPException
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from upload_ingest import UploadSource
+
+
+class RetrievalUnavailable(Exception):
+    """서비스에 연결할 수 없거나 요청이 실패한 경우"""
+
+
+class DocumentsMissing(RetrievalUnavailable):
+    """코퍼스의 문서가 서비스에 없음 (서비스 재시작 등), keys: 없는 문서 키 목록"""
+
+    def __init__(self, message, keys):
+        super().__init__(message)
+        self.keys = keys
+
+
+class RetrievalClient:
+    def __init__(self, base_url, timeout=120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        """NOTEBOOK_AI_RETRIEVAL_URL 이 있으면 클라이언트, 없으면 None"""
+        url = os.environ.get("NOTEBOOK_AI_RETRIEVAL_URL")
+        return cls(url) if url else None
+
+    def _request(self, method, path, payload=None, data=None, raw=False, length=None):
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        elif data is not None:
+            headers["Content-Type"] = "application/octet-stream"
+            if length is not None:
+                headers["Content-Length"] = str(length)  # 파일 객체 본문은 길이를 직접 지정
+        request = Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+        except HTTPError as e:
+            try:
+                detail = json.loads(e.read() or b"{}")
+            except (ValueError, OSError, HTTPException):
+                detail = {}
+            e.detail = detail
+            raise
+        except URLError as e:
+            raise RetrievalUnavailable(f"검색 서비스 연결 실패: {e.reason}")
+        except (OSError, HTTPException) as e:
+            # 응답을 읽는 중 시간 초과/연결 끊김 (socket.timeout, ConnectionResetError 등)
+            raise RetrievalUnavailable(f"검색 서비스 응답 실패: {e!r}")
+        return body.decode("utf-8") if raw else json.loads(body)
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    # ------------------------------------------
+    # 문서
+    # ------------------------------------------
+    def document(self, key):
+        """문서 정보 (서비스에 없으면 None)"""
+        try:
+            return self._request("GET", f"/documents/{key}")
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            raise RetrievalUnavailable(e.detail.get("error", str(e)))
+
+    def ingest(self, name, data, fmt="pdf", engine=None):
+        """
+        파일 적재 (같은 내용이 이미 있으면 업로드하지 않음)
+        - data: 파일 바이트 또는 upload_ingest.UploadSource (파일 객체로 흘려 보냄, 복사 없음)
+        - 반환: 문서 정보 {"key", "name", "pages", "chars", "original_chars", "tokens", "engine", "error"}
+        """
+        upload = data if isinstance(data, UploadSource) else UploadSource(name, len(data), hashlib.sha256(data).hexdigest(), data=data)
+        info = self.document(upload.key)
+        if info is not None:
+            return info
+        query = urlencode({"name": name, "format": fmt, "engine": engine or ""})
+        try:
+            with upload.open() as body:
+                return self._request("PUT", f"/documents/{upload.key}?{query}", data=body, length=upload.size)
+        except HTTPError as e:
+            raise RetrievalUnavailable(e.detail.get("error", str(e)))
+
+    def document_text(self, key):
+        """정리된 문서 텍스트"""
+        try:
+            return self._request("GET", f"/documents/{key}/text", raw=True)
+        except HTTPError as e:
+            raise RetrievalUnavailable(e.detail.get("error", str(e)))
+
+    # ------------------------------------------
+    # 코퍼스
+    # ------------------------------------------
+    def open_corpus(self, keys, chunk_size=2500, overlap=500, dedup=False, restore=None):
+        """
+        문서 키 목록(순서대로)의 코퍼스 → RemoteCorpus (서비스에서 한 번만 색인)
+        - 서비스에 없는 문서가 있으면 restore(없는 키 목록) 으로 다시 적재하고 한 번 재시도
+          (restore 가 없거나 재시도에도 없으면 DocumentsMissing)
+        """
+        payload = {"keys": list(keys), "chunk_size": chunk_size, "overlap": overlap, "dedup": dedup}
+        for attempt in range(2):
+            try:
+                info = self._request("POST", "/corpora", payload)
+                break
+            except HTTPError as e:
+                missing = e.detail.get("missing") if e.code == 409 else None
+                if not missing:
+                    raise RetrievalUnavailable(e.detail.get("error", str(e)))
+                if restore is None or attempt:
+                    raise DocumentsMissing(e.detail.get("error", str(e)), missing)
+                restore(missing)
+        return RemoteCorpus(self, payload, info, restore)
+
+
+class RemoteCorpus:
+    """
+    서비스 쪽 코퍼스의 얇은 대리 객체
+    - rank()/hybrid_rank(): SegmentedCorpus 와 같은 [(점수, 파일명, 청크, 구간 ID)]
+    - search()/hybrid_search(): 점수를 뺀 [(파일명, 청크, 구간 ID)]
+    - 검색 결과에 딸려 온 페이지 범위/공통 조항 파일은 locate()/shared_files() 로 조회
+    - 서비스가 재시작되어 코퍼스가 없어졌으면 한 번 다시 열고 재시도 (없어진 문서는 restore 로 다시 적재)
+    """
+
+    def __init__(self, client, spec, info, restore=None):
+        self.client = client
+        self.spec = spec
+        self.info = info
+        self.restore = restore
+        self.chunk_size = info["chunk_size"]
+        self.overlap = info["overlap"]
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def document_keys(self):
+        return list(self.info["keys"])
+
+    def stats(self):
+        return self.info["stats"]
+
+    def shared_clauses(self):
+        return [tuple(item) for item in self.info["shared_clauses"]]
+
+    def _search(self, payload):
+        for attempt in range(2):
+            try:
+                return self.client._request("POST", f"/corpora/{self.info['corpus_id']}/search", payload)["results"]
+            except HTTPError as e:
+                if e.code != 404 or attempt:
+                    raise RetrievalUnavailable(e.detail.get("error", str(e)))
+                self.info = self.client.open_corpus(**self.spec, restore=self.restore).info
+
+    def _results(self, hits):
+        with self._lock:
+            for hit in hits:
+                self._spans[hit["span_id"]] = (tuple(hit["pages"]) if hit["pages"] else None, hit["shared"])
+        return [(hit["score"], hit["name"], hit["chunk"], hit["span_id"]) for hit in hits]
+
+    def rank(self, keywords, k, weighting="frequency", proximity=False):
+        return self._results(self._search(
+            {"keywords": list(keywords), "k": k, "weighting": weighting, "proximity": proximity}
+        ))
+
+    def hybrid_rank(self, keywords, query, k):
+        return self._results(self._search({"keywords": list(keywords), "k": k, "query": query}))
+
+    def search(self, keywords, k, weighting="frequency", proximity=False):
+        return [(name, chunk, span_id) for _, name, chunk, span_id in self.rank(keywords, k, weighting, proximity)]
+
+    def hybrid_search(self, keywords, query, k):
+        return [(name, chunk, span_id) for _, name, chunk, span_id in self.hybrid_rank(keywords, query, k)]
+
+    def locate(self, span_id):
+        """검색 결과로 받은 구간의 원래 PDF 페이지 범위"""
+        with self._lock:
+            return self._spans.get(span_id, (None, []))[0]
+
+    def shared_files(self, span_id):
+        """검색 결과로 받은 구간의 공통 조항 파일 목록"""
+        with self._lock:
+            return self._spans.get(span_id, (None, []))[1]
@@ -0,0 +1,421 @@
+"""
+로컬 검색 서비스 (HTTP)
+- 문서 적재(추출 → 정리), 색인, 검색을 UI 프로세스 밖의 서비스 하나가 맡음
+- 보험 비교 앱/홈 닥터 앱의 여러 Streamlit 복제본이 같은 색인을 공유 (UI 는 상태 없음)
+- 문서는 내용 해시(SHA-256)로 한 번만 적재, 코퍼스는 (문서 키 목록 + 청크 설정)별로 캐싱
+- 같은 코퍼스에 동시에 들어온 키워드 검색은 짧은 시간 모아 한 번의 희소 행렬 곱으로 처리
+- 표준 라이브러리 http.server 만 사용 (추가 의존성 없음)
+
+실행: python retrieval_service.py [--host 127.0.0.1] [--port 8765]
+앱 쪽: NOTEBOOK_AI_RETRIEVAL_URL=http://127.0.0.1:8765 (retrieval_client.RetrievalClient)
+
+API (JSON)
+- GET  /health
+- GET  /documents/<키>              → 문서 정보 (없으면 404)
+- PUT  /documents/<키>?name=&format=pdf|txt&engine=   본문: 파일 바이트 → 적재 후 문서 정보
+- GET  /documents/<키>/text         → 정리된 텍스트
+- POST /corpora                     {"keys", "chunk_size", "overlap", "dedup"} → 코퍼스 ID/통계
+- POST /corpora/<ID>/search         {"keywords", "k", "weighting", "proximity" | "query"(하이브리드)} → 결과
+"""
+import argparse
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from dense_retrieval import get_default_embedder
+from text_normalization import estimate_tokens
+from pdf_extraction import extract_pages
+from segmented_corpus import SegmentedCorpus
+from text_normalization import normalize_pages, normalize_text
+from upload_ingest import from_stream
+
+DEFAULT_PORT = 8765
+
+# 동시 검색 요청을 모으는 시간 (초)
+BATCH_WINDOW = 0.005
+
+# 한 번에 점수화하는 최대 질문 수
+MAX_BATCH = 64
+
+
+class ServiceError(Exception):
+    """HTTP 상태 코드가 있는 요청 오류"""
+
+    def __init__(self, status, message, **extra):
+        self.status = status
+        self.extra = extra
+        super().__init__(message)
+
+
+# ==========================================
+# 문서 저장소 (내용 해시별 한 번만 적재)
+# ==========================================
+
+class DocumentStore:
+    """
+    내용 해시 → 정리된 문서
+    - 같은 파일을 여러 복제본이 동시에 올려도 추출은 한 번 (키별 락)
+    - max_documents 를 넘으면 가장 오래 안 쓴 문서부터 제거
+    """
+
+    def __init__(self, max_documents=512):
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key):
+        with self._lock:
+            record = self._documents.get(key)
+            if record is not None:
+                self._documents.move_to_end(key)
+            return record
+
+    def ingest(self, key, upload, fmt="pdf", engine=None):
+        """업로드(UploadSource) 적재 → 문서 기록 (이미 있으면 그대로 반환)"""
+        if upload.key != key:
+            raise ServiceError(400, "문서 키가 내용 해시와 다릅니다")
+        name = upload.name
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            record = self.get(key)
+            if record is not None:
+                return record
+            start = time.perf_counter()
+            error, engine_used, page_count = None, None, 0
+            if fmt == "pdf":
+                try:
+                    pages, engine_used = extract_pages(upload.source, engine)
+                    document, page_count = normalize_pages(pages), len(pages)
+                except Exception as e:
+                    document, error = None, str(e)
+            else:
+                raw_text = upload.text()
+                document, page_count = normalize_text(raw_text), raw_text.count("\n") + 1
+            record = {
+                "key": key,
+                "name": name,
+                "format": fmt,
+                "document": document,
+                "text": document.text if document else "",
+                "info": {
+                    "key": key,
+                    "name": name,
+                    "pages": page_count,
+                    "chars": len(document.text) if document else 0,
+                    "original_chars": document.stats["original_chars"] if document else 0,
+                    "tokens": estimate_tokens(document.text) if document else 0,
+                    "engine": engine_used,
+                    "error": error,
+                    "ingest_seconds": round(time.perf_counter() - start, 3),
+                },
+            }
+            with self._lock:
+                self._documents[key] = record
+                while len(self._documents) > self.max_documents:
+                    evicted, _ = self._documents.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+            return record
+
+
+# ==========================================
+# 코퍼스 캐시 + 동시 검색 묶음 처리
+# ==========================================
+
+def corpus_id(keys, chunk_size, overlap, dedup):
+    """문서 키 목록(순서 포함) + 청크 설정의 해시"""
+    payload = json.dumps([list(keys), chunk_size, overlap, bool(dedup)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CorpusCache:
+    """코퍼스 ID → SegmentedCorpus (가장 오래 안 쓴 코퍼스부터 제거)"""
+
+    def __init__(self, documents, max_corpora=16):
+        self.documents = documents
+        self.max_corpora = max_corpora
+        self._corpora = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def open(self, keys, chunk_size=2500, overlap=500, dedup=False):
+        """코퍼스 열기 (없으면 만듦) → (코퍼스 ID, 항목)"""
+        cid = corpus_id(keys, chunk_size, overlap, dedup)
+        with self._lock:
+            entry = self._corpora.get(cid)
+            if entry is not None:
+                self._corpora.move_to_end(cid)
+                return cid, entry
+            build_lock = self._build_locks.setdefault(cid, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._corpora.get(cid)
+            if entry is not None:
+                return cid, entry
+            records = [self.documents.get(key) for key in keys]
+            missing = [key for key, record in zip(keys, records) if record is None]
+            if missing:
+                raise ServiceError(409, "적재되지 않은 문서가 있습니다", missing=missing)
+            corpus = SegmentedCorpus(chunk_size=chunk_size, overlap=overlap, dedup=dedup, background=False)
+            corpus.sync([(r["key"], r["name"], r["text"]) for r in records if r["text"]])
+            entry = {
+                "corpus": corpus,
+                "pages": {r["key"][:8]: r["document"] for r in records if r["format"] == "pdf" and r["document"]},
+                "dense_lock": threading.Lock(),
+            }
+            with self._lock:
+                self._corpora[cid] = entry
+                self._build_locks.pop(cid, None)
+                while len(self._corpora) > self.max_corpora:
+                    self._corpora.popitem(last=False)
+            return cid, entry
+
+    def get(self, cid):
+        with self._lock:
+            entry = self._corpora.get(cid)
+            if entry is not None:
+                self._corpora.move_to_end(cid)
+            return entry
+
+
+class SearchBatcher:
+    """
+    키워드 검색 묶음 처리
+    - 요청을 큐에 넣고 Future 로 결과를 기다림
+    - 디스패처가 BATCH_WINDOW 동안 모은 요청을 (코퍼스, k, 점수 공식, 근접도)별로 묶어
+      SegmentedCorpus.rank_batch 한 번으로 점수화 (같은 질문은 한 번만 계산)
+    """
+
+    def __init__(self, window=BATCH_WINDOW, max_batch=MAX_BATCH, workers=4):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-batch")
+        self.batches = 0
+        self.requests = 0
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def submit(self, corpus, keywords, k, weighting, proximity=False):
+        future = Future()
+        self._queue.put((corpus, tuple(keywords), k, (weighting, proximity), future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            groups = {}
+            for corpus, keywords, k, options, future in pending:
+                groups.setdefault((id(corpus), k, options), (corpus, []))[1].append((keywords, future))
+            for (_, k, options), (corpus, items) in groups.items():
+                self._pool.submit(self._run, corpus, k, options, items)
+
+    def _run(self, corpus, k, options, items):
+        weighting, proximity = options
+        unique = list(dict.fromkeys(keywords for keywords, _ in items))
+        try:
+            ranked = dict(zip(unique, corpus.rank_batch([list(q) for q in unique], k, weighting, proximity)))
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(items)
+        for keywords, future in items:
+            future.set_result(ranked[keywords])
+
+
+# ==========================================
+# 서비스
+# ==========================================
+
+class RetrievalService:
+    """HTTP 핸들러가 호출하는 서비스 본체 (테스트/벤치마크에서는 직접 사용 가능)"""
+
+    def __init__(self, max_documents=512, max_corpora=16, batch_window=BATCH_WINDOW):
+        self.documents = DocumentStore(max_documents)
+        self.corpora = CorpusCache(self.documents, max_corpora)
+        self.batcher = SearchBatcher(window=batch_window)
+        self._embedder = None
+
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_default_embedder()
+        return self._embedder
+
+    def open_corpus(self, keys, chunk_size=2500, overlap=500, dedup=False):
+        cid, entry = self.corpora.open(list(keys), int(chunk_size), int(overlap), bool(dedup))
+        corpus = entry["corpus"]
+        return {
+            "corpus_id": cid,
+            "chunk_size": corpus.chunk_size,
+            "overlap": corpus.overlap,
+            "keys": corpus.document_keys(),
+            "stats": corpus.stats(),
+            "shared_clauses": corpus.shared_clauses(),
+        }
+
+    def search(self, cid, keywords, k, weighting="frequency", query=None, proximity=False):
+        """
+        검색 결과 [{"score", "name", "chunk", "span_id", "pages", "shared"}]
+        - query 가 있으면 하이브리드 (임베딩은 처음 요청 때 준비, 묶음 처리 없음)
+        """
+        entry = self.corpora.get(cid)
+        if entry is None:
+            raise ServiceError(404, "코퍼스가 없습니다 (다시 열어야 함)")
+        corpus = entry["corpus"]
+        if query is not None:
+            with entry["dense_lock"]:
+                if corpus.embedder is None:
+                    corpus.enable_dense(self.embedder())
+            results = corpus.hybrid_rank(keywords, query, k)
+        else:
+            results = self.batcher.submit(corpus, keywords, k, weighting, proximity).result()
+        step = corpus.chunk_size - corpus.overlap
+        hits = []
+        for score, name, chunk, span_id in results:
+            prefix, _, index = span_id.partition("#")
+            document = entry["pages"].get(prefix)
+            pages = None
+            if document is not None and index.isdigit():
+                pages = document.page_range(int(index) * step, int(index) * step + corpus.chunk_size)
+            hits.append({
+                "score": score,
+                "name": name,
+                "chunk": chunk,
+                "span_id": span_id,
+                "pages": pages,
+                "shared": corpus.shared_files(span_id),
+            })
+        return hits
+
+    def stats(self):
+        return {
+            "documents": len(self.documents._documents),
+            "corpora": len(self.corpora._corpora),
+            "search_requests": self.batcher.requests,
+            "search_batches": self.batcher.batches,
+        }
+
+
+class RetrievalHandler(BaseHTTPRequestHandler):
+    service = None  # make_server 에서 지정
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 stderr 로그를 남기지 않음
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self):
+        try:
+            return json.loads(self._body() or b"{}")
+        except ValueError:
+            raise ServiceError(400, "JSON 본문이 올바르지 않습니다")
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        service = self.service
+        try:
+            if method == "GET" and parts == ["health"]:
+                return self._send(200, dict(service.stats(), status="ok"))
+            if parts[:1] == ["documents"] and len(parts) >= 2:
+                key = parts[1]
+                if method == "PUT" and len(parts) == 2:
+                    # 본문은 한 번만 읽으며 해시 계산, 큰 파일은 임시 파일로 내려 씀
+                    length = int(self.headers.get("Content-Length") or 0)
+                    with from_stream(params.get("name", key[:8]), self.rfile, length) as upload:
+                        record = service.documents.get(key) or service.documents.ingest(
+                            key, upload, params.get("format", "pdf"), params.get("engine") or None
+                        )
+                    return self._send(200, record["info"])
+                record = service.documents.get(key) if method == "GET" else None
+                if record is None:
+                    raise ServiceError(404, "문서가 없습니다")
+                if len(parts) == 3 and parts[2] == "text":
+                    return self._send(200, record["text"].encode("utf-8"), "text/plain; charset=utf-8")
+                return self._send(200, record["info"])
+            if method == "POST" and parts == ["corpora"]:
+                body = self._json()
+                return self._send(200, service.open_corpus(
+                    body.get("keys", []), body.get("chunk_size", 2500), body.get("overlap", 500),
+                    body.get("dedup", False)
+                ))
+            if method == "POST" and len(parts) == 3 and parts[0] == "corpora" and parts[2] == "search":
+                body = self._json()
+                hits = service.search(
+                    parts[1], body.get("keywords", []), int(body.get("k", 15)),
+                    body.get("weighting", "frequency"), body.get("query"), bool(body.get("proximity", False))
+                )
+                return self._send(200, {"results": hits})
+            raise ServiceError(404, "알 수 없는 경로")
+        except ServiceError as e:
+            return self._send(e.status, dict(e.extra, error=str(e)))
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, service=None):
+    """HTTP 서버 생성 (serve_forever 는 호출하는 쪽에서)"""
+    handler = type("Handler", (RetrievalHandler,), {"service": service or RetrievalService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 검색 서비스")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-documents", type=int, default=512)
+    parser.add_argument("--max-corpora", type=int, default=16)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, RetrievalService(args.max_documents, args.max_corpora))
+    print(f"검색 서비스: http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
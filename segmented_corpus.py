@@ -0,0 +1,461 @@
+"""
+문서별 세그먼트 기반 증분 코퍼스
+- 파일 하나 = 세그먼트 하나 (추가 비용은 그 파일의 색인 비용만큼)
+- 삭제는 툼스톤(삭제 표시)으로 즉시 반영, 실제 제거는 압축(compaction) 때
+- 세그먼트가 많아지거나 삭제 비율이 높아지면 백그라운드 스레드에서 압축
+- dedup=True 면 파일 간 공통 조항을 검출해 검색 결과에서 한 부만 남김
+"""
+import threading
+
+import numpy as np
+
+from sparse_retrieval import ChunkTermIndex, chunk_spans, split_into_chunks, top_k_indices
+from dense_retrieval import EmbeddingStore, IVFIndex
+from clause_dedup import ClauseIndex, chunk_clauses
+from hit_windows import PROXIMITY_POOL_FACTOR, proximity_boost
+
+# 청크의 이 비율 이상이 다른 파일에서 이미 뽑힌 공통 조항이면 검색 결과에서 제외
+DUPLICATE_COVERAGE = 0.6
+
+# 공통 조항 제외를 감안해 미리 더 뽑아 두는 후보 배수
+DEDUP_POOL_FACTOR = 3
+
+
+class Segment:
+    """
+    하나 이상의 문서를 묶은 변경 불가능한 색인 단위
+    - 키워드 인덱스(ChunkTermIndex)와 선택적 임베딩(IVFIndex)을 가짐
+    """
+
+    def __init__(self, doc_keys, doc_names, doc_ranges, chunks, codes=None, scales=None,
+                 chunk_clauses=None):
+        self.doc_keys = list(doc_keys)
+        self.doc_names = dict(doc_names)
+        self.doc_ranges = dict(doc_ranges)  # 문서 키 → (시작 청크, 끝 청크)
+        self.chunks = list(chunks)
+        self.keyword_index = ChunkTermIndex(self.chunks, lowercase=True)
+
+        # 청크별 조항 겹침 [(클러스터 ID, 겹친 글자 수)] (공통 조항 검출을 안 쓰면 빈 튜플)
+        self.chunk_clauses = list(chunk_clauses) if chunk_clauses is not None else [()] * len(self.chunks)
+
+        # 청크별 문서 키, 파일명, 구간 ID (파일 해시 앞 8자리#파일 내 청크 번호, 압축 후에도 유지)
+        self.row_keys = [None] * len(self.chunks)
+        self.sources = [None] * len(self.chunks)
+        self.span_ids = [None] * len(self.chunks)
+        for key, (start, end) in self.doc_ranges.items():
+            self.row_keys[start:end] = [key] * (end - start)
+            self.sources[start:end] = [self.doc_names[key]] * (end - start)
+            self.span_ids[start:end] = [f"{key[:8]}#{i}" for i in range(end - start)]
+
+        self.codes = codes
+        self.scales = scales
+        self.ann = IVFIndex(codes, scales) if codes is not None else None
+
+    @classmethod
+    def from_document(cls, key, name, text, chunk_size, overlap, clause_spans=None):
+        chunks = split_into_chunks(text, chunk_size, overlap)
+        clauses = None
+        if clause_spans:
+            clauses = chunk_clauses(clause_spans, chunk_spans(text, chunk_size, overlap))
+        return cls([key], {key: name}, {key: (0, len(chunks))}, chunks, chunk_clauses=clauses)
+
+    @classmethod
+    def merge(cls, segments, dropped_keys):
+        """
+        여러 세그먼트를 하나로 합침 (툼스톤 처리된 문서는 제외)
+        - 임베딩은 모든 세그먼트에 있을 때만 합침 (SegmentedCorpus.compact 가 빠진 임베딩을 먼저 채움)
+        """
+        doc_keys, doc_names, doc_ranges, chunks, clauses = [], {}, {}, [], []
+        codes, scales = [], []
+        has_dense = all(seg.codes is not None for seg in segments)
+        for seg in segments:
+            for key in seg.doc_keys:
+                if key in dropped_keys:
+                    continue
+                start, end = seg.doc_ranges[key]
+                doc_keys.append(key)
+                doc_names[key] = seg.doc_names[key]
+                doc_ranges[key] = (len(chunks), len(chunks) + end - start)
+                chunks.extend(seg.chunks[start:end])
+                clauses.extend(seg.chunk_clauses[start:end])
+                if has_dense:
+                    codes.append(seg.codes[start:end])
+                    scales.append(seg.scales[start:end])
+        if has_dense and codes:
+            return cls(doc_keys, doc_names, doc_ranges, chunks, np.concatenate(codes), np.concatenate(scales),
+                       chunk_clauses=clauses)
+        return cls(doc_keys, doc_names, doc_ranges, chunks, chunk_clauses=clauses)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def with_dense(self, embedder, store, chunk_size, overlap):
+        """임베딩이 추가된 새 세그먼트 (문서별 디스크 캐시 재사용)"""
+        codes, scales = [], []
+        for key in self.doc_keys:
+            start, end = self.doc_ranges[key]
+            doc_codes, doc_scales = store.load_or_embed(key, self.chunks[start:end], embedder, chunk_size, overlap)
+            codes.append(doc_codes)
+            scales.append(doc_scales)
+        if codes:
+            codes, scales = np.concatenate(codes), np.concatenate(scales)
+        else:
+            codes, scales = np.zeros((0, embedder.dim), dtype=np.int8), np.zeros(0, dtype=np.float32)
+        return Segment(self.doc_keys, self.doc_names, self.doc_ranges, self.chunks, codes, scales,
+                       chunk_clauses=self.chunk_clauses)
+
+    def alive_mask(self, tombstones):
+        """툼스톤 처리되지 않은 청크 마스크"""
+        alive = np.ones(len(self.chunks), dtype=bool)
+        for key in self.doc_keys:
+            if key in tombstones:
+                start, end = self.doc_ranges[key]
+                alive[start:end] = False
+        return alive
+
+    def keyword_scores(self, keywords, weighting, alive):
+        """살아 있는 청크의 키워드 점수 (행 번호 배열, 점수 배열)"""
+        return self.keyword_scores_batch([keywords], weighting, alive)[0]
+
+    def keyword_scores_batch(self, keyword_lists, weighting, alive):
+        """여러 질문을 한 번의 희소 행렬 곱으로 점수화 → 질문별 (행 번호 배열, 점수 배열)"""
+        scores = self.keyword_index.score(keyword_lists, weighting)
+        results = []
+        for q in range(len(keyword_lists)):
+            rows = scores.indices[scores.indptr[q]:scores.indptr[q + 1]]
+            values = scores.data[scores.indptr[q]:scores.indptr[q + 1]]
+            keep = alive[rows]
+            results.append((rows[keep], values[keep]))
+        return results
+
+
+class SegmentedCorpus:
+    """
+    업로드 파일 집합을 증분으로 관리하는 검색 코퍼스
+    - sync(): 현재 업로드 목록과 비교해 추가/삭제분만 반영
+    - search()/hybrid_search(): 세그먼트별 상위 k개를 모아 전체 상위 k개 선택
+    - dedup=True: 조항 MinHash 로 파일 간 공통 조항을 묶어 두고(clauses),
+      검색 결과에서 다른 파일의 같은 조항 청크는 한 부만 남김 (shared_files 로 해당 파일 조회)
+    """
+
+    def __init__(self, chunk_size=2500, overlap=500, max_segments=8, max_dead_ratio=0.3,
+                 background=True, dedup=False):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.max_segments = max_segments
+        self.max_dead_ratio = max_dead_ratio
+        self.background = background
+        self.clauses = ClauseIndex() if dedup else None
+
+        self._lock = threading.RLock()
+        self._segments = []      # 검색 시 스냅샷으로 사용 (교체 방식으로만 수정)
+        self._tombstones = frozenset()
+        self._adding = set()     # 색인 중인 문서 키 (같은 파일을 동시에 두 번 추가하지 않도록)
+        self._compaction = None
+
+        self.embedder = None
+        self.store = None
+
+    # ------------------------------------------
+    # 상태 조회
+    # ------------------------------------------
+    def _snapshot(self):
+        with self._lock:
+            return self._segments, self._tombstones
+
+    def document_keys(self):
+        """살아 있는 문서 키 (추가 순서)"""
+        segments, tombstones = self._snapshot()
+        return [key for seg in segments for key in seg.doc_keys if key not in tombstones]
+
+    def __contains__(self, key):
+        return key in self.document_keys()
+
+    def stats(self):
+        segments, tombstones = self._snapshot()
+        total = sum(len(seg) for seg in segments)
+        dead = sum(int((~seg.alive_mask(tombstones)).sum()) for seg in segments)
+        return {
+            "segments": len(segments),
+            "documents": len(self.document_keys()),
+            "chunks": total - dead,
+            "tombstoned_chunks": dead,
+            "shared_clauses": len(self.shared_clauses()),
+            "compacting": self._compaction is not None and self._compaction.is_alive(),
+        }
+
+    # ------------------------------------------
+    # 추가/삭제
+    # ------------------------------------------
+    def add_document(self, key, name, text):
+        """
+        문서 하나를 새 세그먼트로 추가 (이미 있거나 다른 스레드가 추가 중이면 무시)
+        - 중복 확인과 함께 키를 색인 중으로 표시하고, 색인이 끝나면 같은 락 안에서 세그먼트 추가
+        """
+        with self._lock:
+            physical = any(key in seg.doc_ranges for seg in self._segments)
+            if physical and key in self._tombstones:
+                # 압축 전에 다시 올라온 파일은 툼스톤만 해제
+                self._tombstones = self._tombstones - {key}
+                return True
+            if physical or key in self._adding:
+                return False
+            self._adding.add(key)
+
+        # 색인은 락 밖에서 (이 파일 하나만큼의 비용, 검색은 막지 않음)
+        try:
+            clause_spans = self.clauses.assign(key, name, text) if self.clauses is not None else None
+            segment = Segment.from_document(key, name, text, self.chunk_size, self.overlap, clause_spans)
+            if self.embedder is not None:
+                segment = segment.with_dense(self.embedder, self.store, self.chunk_size, self.overlap)
+            with self._lock:
+                self._segments = self._segments + [segment]
+        finally:
+            with self._lock:
+                self._adding.discard(key)
+        self.maybe_compact()
+        return True
+
+    def remove_document(self, key):
+        """문서 삭제 (툼스톤 표시, 실제 제거는 압축 때)"""
+        with self._lock:
+            if not any(key in seg.doc_ranges for seg in self._segments) or key in self._tombstones:
+                return False
+            self._tombstones = self._tombstones | {key}
+        self.maybe_compact()
+        return True
+
+    def sync(self, documents):
+        """
+        업로드 목록과 동기화
+        - documents: (파일 해시, 파일명, 텍스트) 목록
+        - 반환: (추가된 키 목록, 삭제된 키 목록)
+        """
+        wanted = [key for key, _, _ in documents]
+        removed = [key for key in self.document_keys() if key not in set(wanted)]
+        for key in removed:
+            self.remove_document(key)
+        added = [key for key, name, text in documents if self.add_document(key, name, text)]
+        return added, removed
+
+    def enable_dense(self, embedder, store=None):
+        """
+        하이브리드 검색용 임베딩 활성화 (임베딩 없는 세그먼트만 처리)
+        - 처리하는 동안 압축으로 세그먼트가 바뀌었으면 새 세그먼트도 다시 확인
+        """
+        self.embedder = embedder
+        self.store = store or self.store or EmbeddingStore()
+        while True:
+            segments, _ = self._snapshot()
+            pending = [segment for segment in segments if segment.codes is None]
+            if not pending:
+                return
+            for segment in pending:
+                dense = segment.with_dense(embedder, self.store, self.chunk_size, self.overlap)
+                with self._lock:
+                    self._segments = [dense if s is segment else s for s in self._segments]
+
+    # ------------------------------------------
+    # 압축
+    # ------------------------------------------
+    def needs_compaction(self):
+        segments, tombstones = self._snapshot()
+        if len(segments) > self.max_segments:
+            return True
+        total = sum(len(seg) for seg in segments)
+        dead = sum(int((~seg.alive_mask(tombstones)).sum()) for seg in segments)
+        return total > 0 and dead / total > self.max_dead_ratio
+
+    def maybe_compact(self):
+        """필요하면 압축 시작 (background=True 면 백그라운드 스레드)"""
+        if not self.needs_compaction():
+            return
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            if self.background:
+                self._compaction = threading.Thread(target=self.compact, daemon=True)
+                self._compaction.start()
+                return
+        self.compact()
+
+    def compact(self):
+        """
+        현재 세그먼트 전체를 하나로 합치고 툼스톤 처리된 문서를 제거
+        - 임베딩이 켜져 있으면 임베딩이 없는 세그먼트를 먼저 채워서 합침
+          (일부 세그먼트만 임베딩이 있다고 나머지의 임베딩까지 버리지 않도록, 문서별 디스크 캐시 재사용)
+        - 합치는 동안 다른 스레드가 대상 세그먼트를 교체했으면 새 스냅샷으로 다시 합침
+        """
+        while True:
+            targets, tombstones = self._snapshot()
+            if not targets:
+                return
+            embedder = self.embedder
+            sources = targets
+            if embedder is not None and any(seg.codes is None for seg in targets):
+                sources = [
+                    seg if seg.codes is not None else seg.with_dense(embedder, self.store, self.chunk_size, self.overlap)
+                    for seg in targets
+                ]
+            merged = Segment.merge(sources, tombstones)
+            dropped = {key for seg in targets for key in seg.doc_keys if key in tombstones}
+
+            with self._lock:
+                if not all(any(seg is t for seg in self._segments) for t in targets):
+                    # 합치는 동안 대상 세그먼트가 바뀌었으면 (enable_dense 의 임베딩 사본 등) 다시 합침
+                    # (바뀐 세그먼트를 남기면 같은 문서가 두 번 색인됨)
+                    continue
+                # 압축 중 추가된 세그먼트는 그대로 뒤에 유지
+                remaining = [seg for seg in self._segments if not any(seg is t for t in targets)]
+                self._segments = ([merged] if len(merged) else []) + remaining
+                physical = {key for seg in self._segments for key in seg.doc_keys}
+                self._tombstones = frozenset(key for key in self._tombstones if key in physical)
+                if self.clauses is not None:
+                    self.clauses.drop_documents(dropped - physical)
+                return
+
+    def wait_for_compaction(self, timeout=None):
+        thread = self._compaction
+        if thread is not None:
+            thread.join(timeout)
+
+    # ------------------------------------------
+    # 검색
+    # ------------------------------------------
+    def _collapse_shared(self, candidates, segments, k):
+        """
+        점수순 후보 [(점수, 세그먼트 순서, 행 번호)] 에서 상위 k개 선택
+        - 다른 파일에서 이미 뽑힌 공통 조항이 청크의 DUPLICATE_COVERAGE 이상이면 건너뜀
+        """
+        if self.clauses is None:
+            return candidates[:k]
+        picked = []
+        emitted = {}  # 클러스터 ID → 처음 뽑힌 문서 키
+        for candidate in candidates:
+            segment, row = segments[candidate[1]], candidate[2]
+            key = segment.row_keys[row]
+            overlaps = segment.chunk_clauses[row]
+            duplicate = sum(chars for cid, chars in overlaps if emitted.get(cid, key) != key)
+            if duplicate and duplicate >= DUPLICATE_COVERAGE * len(segment.chunks[row]):
+                continue
+            picked.append(candidate)
+            for cid, _ in overlaps:
+                emitted.setdefault(cid, key)
+            if len(picked) == k:
+                break
+        return picked
+
+    def rank(self, keywords, k, weighting="frequency", proximity=False):
+        """키워드 점수 상위 k개 [(점수, 파일명, 청크, 구간 ID)]"""
+        return self.rank_batch([keywords], k, weighting, proximity)[0]
+
+    def rank_batch(self, keyword_lists, k, weighting="frequency", proximity=False):
+        """
+        여러 질문의 키워드 점수 상위 k개 (질문별 rank 결과 목록)
+        - 세그먼트마다 질문 전체를 한 번의 희소 행렬 곱으로 점수화 (동시 요청 묶음 처리용)
+        - proximity: 후보를 더 뽑아 검색어가 한곳에 모인 청크에 가산점 (위치 색인 사용, 본문 재스캔 없음)
+        """
+        segments, tombstones = self._snapshot()
+        pool = k * DEDUP_POOL_FACTOR if self.clauses is not None else k
+        if proximity:
+            pool *= PROXIMITY_POOL_FACTOR
+        candidates = [[] for _ in keyword_lists]
+        for order, segment in enumerate(segments):
+            scored = segment.keyword_scores_batch(keyword_lists, weighting, segment.alive_mask(tombstones))
+            for q, (rows, values) in enumerate(scored):
+                lookup = dict(zip(rows.tolist(), values.tolist()))
+                for row in top_k_indices(rows, values, pool).tolist():
+                    candidates[q].append((lookup[row], order, row))
+
+        if proximity:
+            for q, keywords in enumerate(keyword_lists):
+                terms = [t for t in dict.fromkeys(keywords) if t]
+                candidates[q] = [
+                    (proximity_boost(score, segments[order].keyword_index.term_offsets(row, terms)), order, row)
+                    for score, order, row in candidates[q]
+                ]
+
+        results = []
+        for query_candidates in candidates:
+            # 점수 내림차순, 동점은 먼저 추가된 파일/앞쪽 청크 우선
+            query_candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+            results.append([
+                (score, segments[order].sources[row], segments[order].chunks[row], segments[order].span_ids[row])
+                for score, order, row in self._collapse_shared(query_candidates, segments, k)
+            ])
+        return results
+
+    def search(self, keywords, k, weighting="frequency", proximity=False):
+        """키워드 점수 상위 k개 [(파일명, 청크, 구간 ID)]"""
+        return [(name, chunk, span_id) for _, name, chunk, span_id in self.rank(keywords, k, weighting, proximity)]
+
+    def hybrid_search(self, keywords, query, k, alpha=0.5, candidates=100):
+        """키워드 점수 + 임베딩 유사도 결합 상위 k개 [(파일명, 청크, 구간 ID)]"""
+        return [(name, chunk, span_id) for _, name, chunk, span_id in
+                self.hybrid_rank(keywords, query, k, alpha, candidates)]
+
+    def hybrid_rank(self, keywords, query, k, alpha=0.5, candidates=100):
+        """
+        키워드 점수 + 임베딩 유사도 결합 상위 k개 [(결합 점수, 파일명, 청크, 구간 ID)]
+        - 키워드 점수는 전체 최고점으로 정규화, 유사도는 0 이상으로 자름
+        """
+        if self.embedder is None:
+            raise RuntimeError("enable_dense() 호출 후 사용할 수 있습니다")
+        segments, tombstones = self._snapshot()
+        query_vector = self.embedder.embed_query(query)
+
+        pooled = []  # (세그먼트 순서, 행 번호, 키워드 점수, 유사도)
+        kw_max = 0.0
+        for order, segment in enumerate(segments):
+            if segment.ann is None:
+                continue
+            alive = segment.alive_mask(tombstones)
+            kw_rows, kw_values = segment.keyword_scores(keywords, "frequency", alive)
+            if kw_values.size:
+                kw_max = max(kw_max, float(kw_values.max()))
+            dense_ids, _ = segment.ann.search(query_vector, candidates)
+            dense_ids = dense_ids[alive[dense_ids]]
+            kw_top = kw_rows[np.argsort(-kw_values, kind="stable")[:candidates]]
+            ids = np.union1d(dense_ids, kw_top).astype(np.int64)
+
+            kw_lookup = dict(zip(kw_rows.tolist(), kw_values.tolist()))
+            dense = np.clip(segment.ann.score_ids(query_vector, ids), 0.0, None)
+            for row, sim in zip(ids.tolist(), dense.tolist()):
+                pooled.append((order, row, kw_lookup.get(row, 0.0), sim))
+
+        scored = [
+            (alpha * sim + (1 - alpha) * (kw / kw_max if kw_max else 0.0), order, row)
+            for order, row, kw, sim in pooled
+        ]
+        scored.sort(key=lambda c: (-c[0], c[1], c[2]))
+        return [
+            (score, segments[order].sources[row], segments[order].chunks[row], segments[order].span_ids[row])
+            for score, order, row in self._collapse_shared(scored, segments, k)
+        ]
+
+    def shared_clauses(self):
+        """파일 간 공통 조항 [(조항 제목, 파일명 목록)] (살아 있는 문서만, 파일 많은 순)"""
+        if self.clauses is None:
+            return []
+        _, tombstones = self._snapshot()
+        return self.clauses.shared_clusters(tombstones)
+
+    def shared_files(self, span_id):
+        """구간 청크의 공통 조항을 함께 가진 다른 파일명 목록 (살아 있는 문서만)"""
+        if self.clauses is None:
+            return []
+        segments, tombstones = self._snapshot()
+        prefix, _, index = span_id.partition("#")
+        if not index.isdigit():
+            return []
+        for segment in segments:
+            for key, (start, end) in segment.doc_ranges.items():
+                if not key.startswith(prefix) or key in tombstones or start + int(index) >= end:
+                    continue
+                names = []
+                for cid, _ in segment.chunk_clauses[start + int(index)]:
+                    for name in self.clauses.shared_members(cid, key, tombstones).values():
+                        if name not in names:
+                            names.append(name)
+                return names
+        return []
@@ -0,0 +1,209 @@
+"""
+권(volume)별 샤드 색인 + 블룸 필터 라우팅
+- 백과사전을 하나로 합친 색인 대신 권마다 ChunkTermIndex 하나 (샤드)
+- 청크는 권을 이어 붙인 본문 기준으로 자름 (권 경계에 걸친 청크는 끝나는 권의 샤드로)
+  → 청크가 합친 색인과 같아서 권 경계 근처 구간도 합친 색인처럼 한 청크에 들어감
+- 샤드마다 본문의 글자 n-gram 블룸 필터를 둠 (n 보다 짧은 검색어용으로 한 글자도 함께)
+  검색어의 n-gram 이 하나라도 없으면 그 샤드에는 검색어가 없음 (거짓 음성 없음, 거짓 양성만 가끔)
+- 질문이 오면 검색어가 있을 수 있는 샤드에만, 있을 수 있는 검색어만 보냄
+  → 검색어가 없는 권은 스캔하지 않으므로 권을 늘려도 그 권과 상관없는 질문은 느려지지 않음
+- 샤드 검색은 스레드 풀에서 병렬로, 결과는 점수 → 권 순서 → 청크 순서로 합침
+  (포함 수/빈도 점수는 샤드와 상관없는 절대값이라 그대로 비교 가능)
+"""
+import hashlib
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sparse_retrieval import ChunkTermIndex, chunk_spans
+from hit_windows import PROXIMITY_POOL_FACTOR, proximity_boost
+
+# 블룸 필터 n-gram 길이 / 목표 거짓 양성률
+BLOOM_NGRAM = 2
+BLOOM_FALSE_POSITIVE = 0.01
+
+# 샤드 병렬 검색 스레드 수
+SHARD_WORKERS = int(os.environ.get("NOTEBOOK_AI_SHARD_WORKERS", "4"))
+
+# 모든 샤드 색인이 같이 쓰는 스레드 풀 (스레드는 처음 쓸 때 만들어짐)
+_shard_pool = ThreadPoolExecutor(max_workers=max(1, SHARD_WORKERS), thread_name_prefix="shard")
+
+
+def ngrams(text, n=BLOOM_NGRAM):
+    """글자 n-gram 집합 (n 보다 짧으면 글자 그대로)"""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def indexed_grams(text, n=BLOOM_NGRAM):
+    """
+    블룸 필터에 넣는 항목: 본문의 1 ~ n 글자 부분 문자열
+    - ngrams(검색어) 는 n 보다 짧은 검색어를 그대로 돌려주므로, 그 길이의 부분 문자열도 넣어야 거짓 음성이 없음
+    """
+    grams = set()
+    for size in range(1, n + 1):
+        grams |= {text[i:i + size] for i in range(len(text) - size + 1)}
+    return grams
+
+
+def _hash_pairs(items):
+    """항목별 (h1, h2) 64비트 해시 (이중 해싱용, 프로세스가 바뀌어도 같은 값)"""
+    digests = [hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest() for item in items]
+    raw = np.frombuffer(b"".join(digests), dtype=np.uint64).reshape(-1, 2) if digests else np.empty((0, 2), np.uint64)
+    return raw[:, 0], raw[:, 1] | np.uint64(1)
+
+
+class TermBloomFilter:
+    """
+    글자 n-gram 블룸 필터
+    - from_text(본문): 본문의 서로 다른 n-gram 수에 맞춰 크기 결정 (거짓 양성률 false_positive)
+    - might_contain(검색어): 검색어의 n-gram 이 전부 들어 있으면 True (부분 문자열 검색과 같은 기준)
+    """
+
+    def __init__(self, num_bits, num_hashes, n=BLOOM_NGRAM):
+        self.num_bits = max(8, int(num_bits))
+        self.num_hashes = max(1, int(num_hashes))
+        self.n = n
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def from_text(cls, text, n=BLOOM_NGRAM, false_positive=BLOOM_FALSE_POSITIVE):
+        grams = indexed_grams(text, n)
+        count = max(1, len(grams))
+        num_bits = math.ceil(-count * math.log(false_positive) / math.log(2) ** 2)
+        bloom = cls(num_bits, round(num_bits / count * math.log(2)), n)
+        bloom.add(grams)
+        return bloom
+
+    def _positions(self, items):
+        h1, h2 = _hash_pairs(list(items))
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return ((h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.num_bits)).astype(np.int64)
+
+    def add(self, items):
+        positions = self._positions(items).ravel()
+        np.bitwise_or.at(self.bits, positions >> 3, (128 >> (positions & 7)).astype(np.uint8))
+
+    def might_contain(self, term):
+        grams = ngrams(term, self.n)
+        if not grams:
+            return False
+        positions = self._positions(grams).ravel()
+        return bool(np.all(self.bits[positions >> 3] & (128 >> (positions & 7))))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+def volume_chunks(volumes, chunk_size, overlap=0):
+    """
+    권별 청크 목록 (권을 이어 붙인 본문을 합친 색인과 같은 위치에서 자름)
+    - 권 경계에 걸친 청크는 청크가 끝나는 권으로 (앞 권 끝의 모자란 부분을 다음 권으로 넘김)
+    """
+    text = "".join(volume for _, volume in volumes)
+    ends = []
+    total = 0
+    for _, volume in volumes:
+        total += len(volume)
+        ends.append(total)
+    chunks = [[] for _ in volumes]
+    number = 0
+    for start, end in chunk_spans(text, chunk_size, overlap, skip_blank=False):
+        while end > ends[number]:
+            number += 1
+        chunks[number].append(text[start:end])
+    return chunks
+
+
+class VolumeShard:
+    """권 하나의 청크 색인 + 블룸 필터 (블룸 필터는 청크 본문 기준)"""
+
+    def __init__(self, name, chunks, lowercase=False):
+        self.name = name
+        self.lowercase = lowercase
+        self.index = ChunkTermIndex(chunks, lowercase)
+        text = "".join(chunks)
+        self.bloom = TermBloomFilter.from_text(text.lower() if lowercase else text)
+
+    def __len__(self):
+        return len(self.index)
+
+    def might_contain(self, term):
+        return self.bloom.might_contain(term.lower() if self.lowercase else term)
+
+    def rank(self, terms, k, weighting, proximity):
+        """샤드 안 상위 후보 [(점수, 청크 번호, 위치)] (proximity 면 근접도 재점수화, 위치는 term_offsets)"""
+        pool = k * PROXIMITY_POOL_FACTOR if proximity else k
+        rows, scores = self.index.rank(terms, pool, weighting)
+        results = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            offsets = self.index.term_offsets(row, terms) if proximity else None
+            results.append((proximity_boost(score, offsets) if proximity else score, row, offsets))
+        return results
+
+
+class ShardedIndex:
+    """
+    권별 샤드 모음
+    - route(검색어): 검색어가 있을 수 있는 샤드별 검색어 [(샤드 번호, 검색어)]
+    - rank(검색어, k): 전체 상위 k개 [(점수, 샤드 번호, 청크 번호, 위치)]
+    """
+
+    def __init__(self, volumes, chunk_size=1000, overlap=0, lowercase=False):
+        self.shards = [
+            VolumeShard(name, chunks, lowercase)
+            for (name, _), chunks in zip(volumes, volume_chunks(volumes, chunk_size, overlap))
+        ]
+        self._routes = {}  # 검색어 → 있을 수 있는 샤드 번호 (블룸 필터 조회 결과 재사용)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def stats(self):
+        return [
+            {"권": shard.name, "청크": len(shard), "블룸 필터(KB)": round(shard.bloom.nbytes / 1024, 1)}
+            for shard in self.shards
+        ]
+
+    def shards_for(self, term):
+        numbers = self._routes.get(term)
+        if numbers is None:
+            numbers = frozenset(number for number, shard in enumerate(self.shards) if shard.might_contain(term))
+            self._routes[term] = numbers
+        return numbers
+
+    def route(self, terms):
+        possible = {term: self.shards_for(term) for term in set(terms) if term}
+        routed = []
+        for number in range(len(self.shards)):
+            # 순서/중복 유지 (중복 검색어 가중치는 그대로)
+            candidates = [t for t in terms if t and number in possible[t]]
+            if candidates:
+                routed.append((number, candidates))
+        return routed
+
+    def rank(self, terms, k, weighting="presence", proximity=False):
+        routed = self.route(terms)
+        if not routed:
+            return []
+        if len(routed) == 1:
+            per_shard = [self.shards[routed[0][0]].rank(routed[0][1], k, weighting, proximity)]
+        else:
+            per_shard = list(_shard_pool.map(
+                lambda job: self.shards[job[0]].rank(job[1], k, weighting, proximity), routed
+            ))
+        merged = [
+            (score, number, row, offsets)
+            for (number, _), results in zip(routed, per_shard)
+            for score, row, offsets in results
+        ]
+        merged.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+        return merged[:k]
+
+    def chunk(self, number, row):
+        return self.shards[number].index.chunks[row]
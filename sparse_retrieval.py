@@ -0,0 +1,232 @@
+"""
+희소 행렬 기반 청크 검색 엔진
+- 청크 × 검색어 희소 행렬(검색어 열은 한 번 계산 후 재사용)
+- 질문 점수화는 희소 행렬-벡터 곱 한 번
+- 상위 k개 선택은 argpartition (전체 정렬 없음)
+- 여러 질문을 한 번에 점수화하는 배치 검색 지원
+- 새 검색어 열은 Aho-Corasick 한 번의 스캔으로 한꺼번에 계산
+- 스캔에서 얻은 등장 위치도 보관 (근접도 점수/적중 구간 추출용 위치 색인)
+"""
+import numpy as np
+from scipy import sparse
+
+from multi_pattern import find_all
+
+# 청크를 이어 붙일 때 쓰는 구분자 (검색어가 청크 경계를 넘어 매칭되지 않도록)
+CHUNK_SEPARATOR = "\x00"
+
+# 점수 공식
+# - "frequency": app.py get_smart_context 와 동일 (등장 횟수 × (1 + 길이/10))
+# - "presence": 홈 닥터 get_relevant_content 와 동일 (포함된 검색어 수)
+WEIGHTINGS = ("frequency", "presence")
+
+
+def split_into_chunks(full_text, chunk_size, overlap=0, skip_blank=True):
+    """기존 검색 함수들과 같은 방식으로 텍스트를 청크로 자름"""
+    step = chunk_size - overlap
+    chunks = []
+    for i in range(0, len(full_text), step):
+        chunk = full_text[i:i + chunk_size]
+        if skip_blank and not chunk.strip():
+            continue
+        chunks.append(chunk)
+    return chunks
+
+
+def chunk_spans(full_text, chunk_size, overlap=0, skip_blank=True):
+    """split_into_chunks 와 같은 청크들의 (시작, 끝) 위치"""
+    step = chunk_size - overlap
+    spans = []
+    for i in range(0, len(full_text), step):
+        end = min(i + chunk_size, len(full_text))
+        if skip_blank and not full_text[i:end].strip():
+            continue
+        spans.append((i, end))
+    return spans
+
+
+def top_k_indices(rows, values, k):
+    """
+    점수가 0보다 큰 후보 중 상위 k개의 행 번호를 점수 내림차순으로 반환
+    - rows 는 오름차순이어야 함
+    - 동점은 앞쪽 청크 우선 (기존 list.sort 의 안정 정렬과 같은 순서)
+    """
+    rows = np.asarray(rows)
+    values = np.asarray(values)
+    mask = values > 0
+    rows, values = rows[mask], values[mask]
+    if k <= 0 or rows.size == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if rows.size > k:
+        # k번째 점수를 기준값으로 삼고, 기준값과 같은 후보는 앞쪽부터 채움
+        part = np.argpartition(-values, k - 1)[:k]
+        threshold = values[part].min()
+        above = values > threshold
+        tied = np.flatnonzero(values == threshold)[:k - int(above.sum())]
+        keep = np.concatenate([np.flatnonzero(above), tied])
+        rows, values = rows[keep], values[keep]
+
+    order = np.lexsort((rows, -values))
+    return rows[order]
+
+
+class ChunkTermIndex:
+    """
+    청크 목록 위의 부분 문자열 검색 인덱스
+    - 검색어별 등장 횟수 열(column)을 처음 한 번만 계산하고 캐싱
+    - 점수 계산과 상위 k 선택은 전부 NumPy/SciPy 연산
+    """
+
+    def __init__(self, chunks, lowercase=True):
+        self.chunks = list(chunks)
+        self.lowercase = lowercase
+
+        searchable = [c.lower() for c in self.chunks] if lowercase else self.chunks
+        self._joined = CHUNK_SEPARATOR.join(searchable)
+
+        # 각 청크가 이어 붙인 문자열에서 시작하는 위치
+        lengths = np.fromiter((len(c) + 1 for c in searchable), dtype=np.int64, count=len(searchable))
+        self._starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(searchable) else np.empty(0, dtype=np.int64)
+
+        # 검색어 → (청크 번호 배열, 등장 횟수 배열)
+        self._columns = {}
+        # 검색어 → 이어 붙인 문자열에서의 등장 위치 (오름차순)
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def prime(self, terms):
+        """
+        검색어 열을 미리 계산 (배치/벤치마크 경로에서 질문 전체 어휘를 한 번에 준비)
+        - 아직 없는 검색어 전부를 한 번의 다중 패턴 스캔으로 셈 (str.count 와 같은 비중첩 카운트)
+        """
+        missing = [t for t in dict.fromkeys(terms) if t and t not in self._columns]
+        if not missing:
+            return
+
+        n = len(self.chunks)
+        searchable = [t for t in missing if CHUNK_SEPARATOR not in t]
+        positions = find_all(self._joined, searchable) if searchable else {}
+        for term in missing:
+            starts = np.asarray(positions.get(term, ()), dtype=np.int64)
+            chunk_ids = np.searchsorted(self._starts, starts, side="right") - 1
+            counts = np.bincount(chunk_ids, minlength=n)
+            rows = np.flatnonzero(counts)
+            self._columns[term] = (rows, counts[rows])
+            self._positions[term] = starts
+
+    def term_offsets(self, row, terms):
+        """청크 하나에서 검색어별 등장 위치 {검색어: 청크 안 위치 배열} (위치 색인 조회, 본문 재스캔 없음)"""
+        self.prime(terms)
+        start = self._starts[row]
+        end = start + len(self.chunks[row])
+        offsets = {}
+        for term in dict.fromkeys(terms):
+            if not term:
+                continue
+            positions = self._positions[term]
+            lo, hi = np.searchsorted(positions, [start, end])
+            offsets[term] = positions[lo:hi] - start
+        return offsets
+
+    def term_matrix(self, terms):
+        """청크 × 검색어 희소 행렬 (CSC)"""
+        self.prime(terms)
+        indptr = [0]
+        indices = []
+        data = []
+        for term in terms:
+            rows, counts = self._columns[term]
+            indices.append(rows)
+            data.append(counts)
+            indptr.append(indptr[-1] + rows.size)
+        if indices:
+            indices = np.concatenate(indices)
+            data = np.concatenate(data)
+        return sparse.csc_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(self.chunks), len(terms))
+        )
+
+    def score(self, keyword_lists, weighting="frequency", legacy_float=False):
+        """
+        여러 질문을 한 번의 희소 행렬 곱으로 점수화
+        - keyword_lists: 질문별 (전처리된) 검색어 리스트
+        - legacy_float: 기존 루프와 같은 순서로 부동소수 덧셈 (동점 처리까지 기존 순위와 동일)
+        - 반환: 청크 × 질문 희소 점수 행렬 (CSC)
+        """
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"알 수 없는 점수 공식: {weighting}")
+        if legacy_float and weighting == "frequency":
+            return self._score_legacy_float(keyword_lists)
+
+        vocabulary = {}
+        for keywords in keyword_lists:
+            for keyword in keywords:
+                if keyword:
+                    vocabulary.setdefault(keyword, len(vocabulary))
+        terms = list(vocabulary)
+
+        matrix = self.term_matrix(terms)
+        if weighting == "presence":
+            matrix = matrix.sign()
+
+        # 질문 벡터: 중복 검색어는 기존 루프처럼 가중치가 누적됨
+        # frequency 가중치는 (10 + 길이) 정수로 계산해 동점 판정이 부동소수 오차에 흔들리지 않게 함
+        weights = sparse.lil_matrix((len(terms), len(keyword_lists)), dtype=np.float64)
+        for q, keywords in enumerate(keyword_lists):
+            for keyword in keywords:
+                if keyword:
+                    weights[vocabulary[keyword], q] += (10 + len(keyword)) if weighting == "frequency" else 1
+
+        scores = (matrix @ weights.tocsc()).tocsc()
+        scores.sort_indices()
+        if weighting == "frequency":
+            scores = scores / 10.0
+        return scores
+
+    def _score_legacy_float(self, keyword_lists):
+        """
+        기존 get_smart_context 루프의 덧셈 순서를 그대로 재현
+        (0.1 단위 가중치의 반올림 오차 때문에 정수 연산과 동점 순서가 달라질 수 있음)
+        """
+        self.prime([keyword for keywords in keyword_lists for keyword in keywords])
+        columns = []
+        for keywords in keyword_lists:
+            total = np.zeros(len(self.chunks), dtype=np.float64)
+            for keyword in keywords:
+                rows, counts = self._columns[keyword]
+                total[rows] += counts * (1 + len(keyword) / 10)
+            columns.append(sparse.csc_matrix(total[:, None]))
+        scores = sparse.hstack(columns, format="csc") if columns else sparse.csc_matrix((len(self.chunks), 0))
+        scores.sort_indices()
+        return scores
+
+    def rank_batch(self, keyword_lists, k, weighting="frequency", legacy_float=False):
+        """질문별 상위 k개 (청크 번호 배열, 점수 배열) 리스트"""
+        scores = self.score(keyword_lists, weighting, legacy_float)
+        results = []
+        for q in range(len(keyword_lists)):
+            start, end = scores.indptr[q], scores.indptr[q + 1]
+            rows, values = scores.indices[start:end], scores.data[start:end]
+            top = top_k_indices(rows, values, k)
+            lookup = dict(zip(rows.tolist(), values.tolist()))
+            results.append((top, np.array([lookup[r] for r in top.tolist()])))
+        return results
+
+    def rank(self, keywords, k, weighting="frequency", legacy_float=False):
+        """질문 하나의 상위 k개 (청크 번호 배열, 점수 배열)"""
+        return self.rank_batch([keywords], k, weighting, legacy_float)[0]
+
+    def search_batch(self, keyword_lists, k, weighting="frequency", legacy_float=False):
+        """질문별 상위 k개 청크 텍스트"""
+        return [
+            [self.chunks[i] for i in top.tolist()]
+            for top, _ in self.rank_batch(keyword_lists, k, weighting, legacy_float)
+        ]
+
+    def search(self, keywords, k, weighting="frequency", legacy_float=False):
+        """질문 하나의 상위 k개 청크 텍스트"""
+        return self.search_batch([keywords], k, weighting, legacy_float)[0]
@@ -0,0 +1,222 @@
+"""
+추천 질문 답변 미리 계산 (speculative precomputation)
+- 업로드 처리가 끝나면 추천 질문의 검색 + 답변 생성을 백그라운드에서 미리 수행
+- 사용자 요청이 진행 중이면 양보하고, 레이트 리밋의 여유분 안에서만 호출
+- 시간당 호출 예산으로, 묻지 않는 사용자에게 드는 비용을 제한
+"""
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+
+class SpeculationSkipped(Exception):
+    """예산/만료로 미리 계산을 건너뜀"""
+
+
+class TokenBucket:
+    """
+    분당 요청 수 레이트 리미터 (토큰 버킷)
+    - 사용자 요청은 record() 로 사용량만 기록 (막지 않음)
+    - 백그라운드 작업은 try_acquire(reserve) 로 여유분이 있을 때만 사용
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, reserve=0.0):
+        """토큰을 쓰고 나서도 reserve 개 이상 남을 때만 사용"""
+        with self._lock:
+            self._refill()
+            if self.tokens - 1 >= reserve:
+                self.tokens -= 1
+                return True
+            return False
+
+    def release(self):
+        """쓰지 않은 토큰 1개 반환"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def record(self):
+        """사용자 요청 1건 기록 (음수까지 내려갈 수 있음)"""
+        with self._lock:
+            self._refill()
+            self.tokens = max(-self.capacity, self.tokens - 1)
+
+
+def normalize_question(question):
+    """따옴표/공백/문장부호 차이를 무시한 질문 키"""
+    return re.sub(r"[\s\"'“”‘’?!.,~]+", "", question)
+
+
+class SpeculativePrecomputer:
+    """
+    추천 질문 미리 계산 작업자 (앱 전체에서 하나, 세션 간 결과 공유)
+    - 결과는 (코퍼스 시그니처, 질문) 별 Future 로 보관
+    - 진행 중인 작업이 있으면 사용자는 중복 호출 없이 그 결과를 기다림
+    """
+
+    def __init__(self, limiter, reserve_ratio=0.5, max_per_hour=30, ttl_seconds=3600,
+                 max_entries=64, idle_wait=0.25):
+        self.limiter = limiter
+        self.reserve = limiter.capacity * reserve_ratio
+        self.max_per_hour = max_per_hour
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.idle_wait = idle_wait
+
+        self._jobs = {}          # 키 → (Future, 생성 시각)
+        self._queue = queue.Queue()
+        self._spent = deque()    # 최근 1시간 백그라운드 호출 시각
+        self._foreground = 0
+        self._lock = threading.Lock()
+        self._worker = None
+        self.stats = {"scheduled": 0, "computed": 0, "hits": 0, "skipped": 0, "failed": 0}
+
+    # ------------------------------------------
+    # 사용자 요청 쪽
+    # ------------------------------------------
+    @contextmanager
+    def foreground(self):
+        """사용자 요청 구간 (이 동안 백그라운드 작업은 대기)"""
+        with self._lock:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._foreground -= 1
+
+    def lookup(self, signature, question):
+        """미리 계산된(또는 계산 중인) 결과의 Future, 없으면 None"""
+        key = (signature, normalize_question(question))
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry is None:
+                return None
+            future, created = entry
+            if time.monotonic() - created > self.ttl_seconds or future.cancelled():
+                del self._jobs[key]
+                return None
+            self.stats["hits"] += 1
+            return future
+
+    # ------------------------------------------
+    # 예약/실행
+    # ------------------------------------------
+    def schedule(self, signature, questions, compute_fn):
+        """
+        추천 질문 예약 (같은 시그니처/질문은 한 번만)
+        - compute_fn(question) 은 Streamlit 호출 없이 결과를 반환해야 함
+        """
+        with self._lock:
+            for question in questions:
+                key = (signature, normalize_question(question))
+                if key in self._jobs:
+                    continue
+                future = Future()
+                self._jobs[key] = (future, time.monotonic())
+                self._queue.put((key, question, compute_fn, future))
+                self.stats["scheduled"] += 1
+            self._trim()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _trim(self):
+        """오래된 결과부터 정리 (max_entries 유지)"""
+        overflow = len(self._jobs) - self.max_entries
+        for key, _ in sorted(self._jobs.items(), key=lambda item: item[1][1])[:max(0, overflow)]:
+            future, _ = self._jobs.pop(key)
+            future.cancel()
+
+    def _within_budget(self):
+        now = time.monotonic()
+        while self._spent and now - self._spent[0] > 3600:
+            self._spent.popleft()
+        return len(self._spent) < self.max_per_hour
+
+    def _wait_for_slot(self, created, future):
+        """
+        사용자 요청이 없고 레이트 리밋 여유가 있을 때까지 대기 (예산/만료/취소 시 False)
+        - 취소 여부는 토큰/예산을 쓰기 전에 확인
+        """
+        while True:
+            if future.cancelled():
+                return False
+            with self._lock:
+                if not self._within_budget() or time.monotonic() - created > self.ttl_seconds:
+                    return False
+                idle = self._foreground == 0
+            if idle and self.limiter.try_acquire(self.reserve):
+                with self._lock:
+                    self._spent.append(time.monotonic())
+                return True
+            time.sleep(self.idle_wait)
+
+    def _refund(self):
+        """예약했지만 쓰지 않은 호출 (토큰/예산 반환)"""
+        self.limiter.release()
+        with self._lock:
+            if self._spent:
+                self._spent.pop()
+
+    def _forget(self, key, future):
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry is not None and entry[0] is future:
+                del self._jobs[key]
+
+    def _run(self):
+        while True:
+            key, question, compute_fn, future = self._queue.get()
+            try:
+                self._process(key, question, compute_fn, future)
+            except Exception as e:
+                # 작업자 스레드가 죽으면 남은 예약이 모두 멈추므로 이 작업만 실패 처리
+                self._forget(key, future)
+                self.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+
+    def _process(self, key, question, compute_fn, future):
+        with self._lock:
+            entry = self._jobs.get(key)
+        if entry is None or entry[0] is not future or future.cancelled():
+            return
+
+        slot = self._wait_for_slot(entry[1], future)
+        # 여기서부터는 취소 불가 (대기 중에 취소됐으면 False)
+        if not future.set_running_or_notify_cancel():
+            if slot:
+                self._refund()
+            self._forget(key, future)
+            return
+        if not slot:
+            self._forget(key, future)
+            self.stats["skipped"] += 1
+            future.set_exception(SpeculationSkipped(question))
+            return
+
+        try:
+            result = compute_fn(question)
+        except Exception as e:
+            self._forget(key, future)
+            self.stats["failed"] += 1
+            future.set_exception(e)
+            return
+        future.set_result(result)
+        self.stats["computed"] += 1
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 모듈을 바로 불러오도록 (패키지가 아닌 평평한 모듈 구조)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from block_store import _HAS_ZSTD, BlockCache, block_range, compress_blocks, read_span
+
+CODECS = ["zlib"] + (["zstd"] if _HAS_ZSTD else [])
+TEXT = "".join(random.Random(0).choice("암진단비 약관보험금특약\nabc") for _ in range(10000))
+
+
+def make_loader(blocks, loads):
+    def load_blocks(numbers):
+        loads.append(list(numbers))
+        return {number: blocks[number] for number in numbers}
+    return load_blocks
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_span_round_trip(codec):
+    blocks = compress_blocks(TEXT, 1000, codec)
+    assert len(blocks) == 10
+    loads = []
+    cache = BlockCache()
+    rng = random.Random(1)
+    for _ in range(200):
+        start = rng.randrange(len(TEXT))
+        end = min(len(TEXT), start + rng.randrange(1, 2500))
+        assert read_span("doc", start, end, make_loader(blocks, loads), cache, codec, 1000) == TEXT[start:end]
+    assert read_span("doc", 500, 500, make_loader(blocks, loads), cache, codec, 1000) == ""
+    # 블록마다 한 번만 풀고 나머지는 캐시 적중
+    assert sorted(n for numbers in loads for n in numbers) == list(range(10))
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BlockCache(max_blocks=2)
+    cache.put(("doc", 0), "가")
+    cache.put(("doc", 1), "나")
+    assert cache.get(("doc", 0)) == "가"
+    cache.put(("doc", 2), "다")
+    assert cache.get(("doc", 1)) is None
+    assert cache.get(("doc", 0)) == "가" and cache.get(("doc", 2)) == "다"
+    assert (cache.hits, cache.misses) == (3, 1)
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+
+
+def test_uncached_reads_reload_blocks():
+    blocks = compress_blocks(TEXT, 1000, "zlib")
+    loads = []
+    cache = BlockCache(max_blocks=0)
+    for _ in range(3):
+        assert read_span("doc", 1500, 2500, make_loader(blocks, loads), cache, "zlib", 1000) == TEXT[1500:2500]
+    assert loads == [[1, 2]] * 3
+
+
+def test_block_range():
+    assert list(block_range(0, 1000, 1000)) == [0]
+    assert list(block_range(999, 1001, 1000)) == [0, 1]
+    assert list(block_range(5, 5, 1000)) == []
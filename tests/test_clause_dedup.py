@@ -0,0 +1,79 @@
+from clause_dedup import ClauseIndex, MinHasher, similarity, split_sections
+
+STANDARD = (
+    "제5조 (보험금 지급에 관한 세부규정)\n"
+    "피보험자가 보험기간 중 사망한 경우에는 보험수익자에게 사망보험금을 지급합니다. "
+    "회사는 보험금 청구서류를 접수한 때에는 접수증을 드리고 접수일부터 3영업일 이내에 보험금을 지급합니다. "
+    "다만 보험금 지급사유의 조사나 확인이 필요한 때에는 접수 후 10영업일 이내에 지급합니다. "
+    "회사가 보험금 지급사유를 조사·확인하기 위하여 필요한 기간이 지급기일을 초과할 것이 명백히 예상되는 경우에는 "
+    "그 구체적인 사유와 지급예정일 및 보험금 가지급제도에 대하여 피보험자 또는 보험수익자에게 즉시 통지합니다.\n"
+)
+OWN = (
+    "제3조 (암 진단비의 지급)\n"
+    "회사는 피보험자가 보험기간 중 책임개시일 이후에 암으로 진단 확정되었을 때에는 최초 1회에 한하여 "
+    "보험가입금액의 100%를 암 진단비로 지급합니다. 소액암으로 진단 확정된 경우에는 보험가입금액의 20%를 지급하며 "
+    "계약일부터 1년 미만에 진단 확정된 경우에는 그 금액의 50%를 지급합니다. 유사암 진단비는 별도 특약으로 정하며 "
+    "이 계약의 보장 대상이 아닙니다. 진단 확정은 병리 또는 진단검사의학 전문의 자격을 가진 자에 의하여 내려져야 합니다.\n"
+)
+OTHER = (
+    "제3조 (입원비의 지급)\n"
+    "회사는 피보험자가 질병으로 입원하여 치료를 받은 경우 입원 1일당 보험가입금액의 1%를 입원비로 지급합니다. "
+    "다만 입원일수가 3일 이하인 경우에는 지급하지 않으며 하나의 질병에 대한 지급 한도는 120일로 합니다. "
+    "동일한 질병으로 2회 이상 입원한 경우에는 하나의 입원으로 보아 입원일수를 더하되 퇴원일부터 180일이 지난 뒤 "
+    "다시 입원한 경우에는 새로운 입원으로 봅니다. 요양병원 입원은 입원비 지급 대상에서 제외합니다.\n"
+)
+
+
+def test_split_sections_by_clause_heading():
+    text = "가나생명 암보험 약관\n\n" + OWN + STANDARD + "제9조 (준용규정)\n짧음\n"
+    sections = [text[start:end].strip() for start, end in split_sections(text)]
+    # 머리말 앞부분과 짧은 조항은 빠지고, 조항은 머리부터 다음 머리 앞까지
+    assert sections == [OWN.strip(), STANDARD.strip()]
+
+
+def test_split_sections_without_headings_groups_lines():
+    line = "조항 머리 없이 이어지는 본문 줄입니다. " * 5 + "\n"
+    text = line * 20
+    sections = split_sections(text, min_chars=10)
+    assert sections[0][0] == 0 and sections[-1][1] == len(text)
+    assert all(text[end - 1] == "\n" for _, end in sections)
+    assert all(end - start >= 800 for start, end in sections[:-1])
+
+
+def test_minhash_similarity_separates_near_duplicates():
+    hasher = MinHasher()
+    edited = STANDARD.replace("3영업일", "5영업일").replace("즉시", "지체 없이")
+    assert similarity(hasher.signature(STANDARD), hasher.signature(" ".join(STANDARD.split()))) == 1.0
+    assert similarity(hasher.signature(STANDARD), hasher.signature(edited)) >= 0.8
+    assert similarity(hasher.signature(STANDARD), hasher.signature(OTHER)) < 0.2
+    assert hasher.signature("제1조") is None
+
+
+def test_near_duplicate_clauses_share_a_cluster():
+    index = ClauseIndex()
+    gana = index.assign("a", "가나.txt", OWN + STANDARD)
+    dara = index.assign("b", "다라.txt", OTHER + STANDARD.replace("3영업일", "5영업일"))
+    assert len(gana) == len(dara) == 2
+    shared = gana[1][2]
+    assert dara[1][2] == shared and dara[0][2] not in (gana[0][2], shared)
+    assert set(index.clusters[shared]) == {"signature", "title", "members"}
+    assert index.shared_members(shared, "a") == {"b": "다라.txt"}
+    assert index.shared_members(shared, "a", tombstones=frozenset({"b"})) == {}
+    assert index.shared_clusters() == [("제5조 (보험금 지급에 관한 세부규정)", ["가나.txt", "다라.txt"])]
+
+
+def test_drop_documents_removes_empty_clusters_and_buckets():
+    index = ClauseIndex()
+    gana = index.assign("a", "가나.txt", OWN + STANDARD)
+    index.assign("b", "다라.txt", OTHER + STANDARD)
+    index.drop_documents(["b"])
+    assert set(index.clusters) == {cid for _, _, cid in gana}
+    assert index.shared_clusters() == []
+    live = set(index.clusters)
+    assert all(bucket and bucket <= live for bucket in index._buckets.values())
+
+    # 남은 문서도 지우면 비고, 같은 조항은 새 클러스터로 다시 배정
+    index.drop_documents(["a"])
+    assert index.clusters == {} and index._buckets == {}
+    again = index.assign("c", "마바.txt", STANDARD)
+    assert again[0][2] not in live
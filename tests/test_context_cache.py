@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from context_cache import CacheUnavailable, ContextCacheManager, LocalCacheBackend
+
+PREFIX = "참고 자료 " * 100
+
+
+class SlowBackend(LocalCacheBackend):
+    """생성이 느린 로컬 백엔드 (동시 요청 확인용)"""
+
+    def __init__(self, delay=0.2):
+        super().__init__()
+        self.delay = delay
+
+    def create(self, model_name, system_instruction, prefix_text, ttl):
+        time.sleep(self.delay)
+        return super().create(model_name, system_instruction, prefix_text, ttl)
+
+
+def test_create_then_reuse():
+    backend = LocalCacheBackend()
+    manager = ContextCacheManager(backend, min_tokens=0)
+    text, model, handle = manager.generate("지시문", PREFIX, "질문 1", models=["m1"])
+    assert model == "m1" and text.startswith("[local]")
+    _, _, again = manager.generate("지시문", PREFIX, "질문 2", models=["m1"])
+    assert again is handle
+    assert backend.calls["create"] == 1 and backend.calls["generate"] == 2
+    assert handle.hits == 2
+
+
+def test_refresh_near_expiry_extends_instead_of_recreating():
+    backend = LocalCacheBackend()
+    manager = ContextCacheManager(backend, min_tokens=0, ttl=timedelta(minutes=2),
+                                  refresh_margin=timedelta(minutes=3))
+    first = manager.get_handle("m1", "지시문", PREFIX)
+    second = manager.get_handle("m1", "지시문", PREFIX)
+    assert second is first
+    assert backend.calls["create"] == 1 and backend.calls["extend"] == 1
+
+
+def test_concurrent_requests_create_once_and_do_not_block_other_prefixes():
+    backend = SlowBackend()
+    manager = ContextCacheManager(backend, min_tokens=0)
+    handles = []
+    threads = [threading.Thread(target=lambda: handles.append(manager.get_handle("m1", "지시문", PREFIX)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    # 다른 자료는 같은 모델이어도 첫 자료 생성이 끝나기를 기다리지 않음 (네트워크 호출 중 락을 잡지 않음)
+    start = time.perf_counter()
+    manager.get_handle("m1", "다른 지시문", PREFIX)
+    assert time.perf_counter() - start < 0.35
+    for thread in threads:
+        thread.join()
+    assert len({id(h) for h in handles}) == 1
+    assert backend.calls["create"] == 2
+
+
+def test_generate_failure_deletes_remote_cache_and_backs_off_only_on_missing_cache():
+    backend = LocalCacheBackend()
+    manager = ContextCacheManager(backend, min_tokens=0)
+    _, _, handle = manager.generate("지시문", PREFIX, "질문", models=["m1"])
+
+    # 일시 오류: 핸들과 서버 캐시는 지우지만 모델은 쉬지 않음
+    def disconnected(prompt):
+        raise ConnectionError("끊김")
+
+    backend.generate_fn = disconnected
+    with pytest.raises(CacheUnavailable):
+        manager.generate("지시문", PREFIX, "질문", models=["m1"])
+    assert handle.resource not in backend.contents
+    assert backend.calls["delete"] == 1
+    assert manager.handles() == []
+
+    backend.generate_fn = lambda prompt: "답변"
+    text, _, recreated = manager.generate("지시문", PREFIX, "질문", models=["m1"])
+    assert text == "답변" and recreated is not handle
+
+    # 서버에서 캐시가 사라짐(KeyError): 모델을 retry_after 동안 쉼
+    backend.contents.clear()
+    with pytest.raises(CacheUnavailable):
+        manager.generate("지시문", PREFIX, "질문", models=["m1"])
+    with pytest.raises(CacheUnavailable, match="재시도 대기"):
+        manager.get_handle("m1", "지시문", PREFIX)
+
+
+def test_short_prefix_is_not_cacheable():
+    manager = ContextCacheManager(LocalCacheBackend(), min_tokens=1000)
+    with pytest.raises(CacheUnavailable):
+        manager.generate("지시문", "짧은 자료", "질문", models=["m1"])
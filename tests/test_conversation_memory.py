@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conversation_memory import ConversationMemory, truncate_tokens
+from text_normalization import estimate_tokens
+
+ANSWER = "| 보험사 | 암 진단비 |\n|---|---|\n| A사 | 3000만원 |\n| B사 | 2000만원 |\n**A사가 더 높습니다.**"
+
+
+def test_old_turns_fold_into_topics():
+    memory = ConversationMemory(max_tokens=120)
+    for company in ["A사", "B사", "C사", "D사", "E사"]:
+        memory.record(f"{company} 암 진단비 보장 범위 비교해줘", ANSWER, [f"{company}0000#1"])
+    assert estimate_tokens(memory.prompt_section()) <= memory.max_tokens
+    assert memory.turns[-1]["question"].startswith("E사")
+    assert "A사" in memory.earlier_topics
+
+
+def test_huge_single_turn_fits_the_cap():
+    memory = ConversationMemory(max_tokens=200)
+    question = "유방암 가족력이 있으면 어떤 특약이 필요한지 " * 500
+    memory.record(question, ANSWER * 50, [f"abcd{n:04d}#{n}" for n in range(100)])
+    section = memory.prompt_section()
+    assert estimate_tokens(section) <= memory.max_tokens
+    assert memory.turns and memory.turns[0]["question"].endswith("…")
+    # 검색어 보완용 주제 키워드는 원래 질문 기준 그대로
+    assert "유방암" in memory.turns[0]["topics"]
+
+
+@pytest.mark.parametrize("max_tokens", [0, 5, 30])
+def test_tiny_cap_is_still_respected(max_tokens):
+    memory = ConversationMemory(max_tokens=max_tokens)
+    memory.record("첫 질문 " * 100, ANSWER, ["abcd0000#1"])
+    memory.record("두 번째 질문 " * 100, ANSWER, ["abcd0000#2"])
+    assert estimate_tokens(memory.prompt_section()) <= max_tokens
+
+
+def test_follow_up_carries_previous_topics():
+    memory = ConversationMemory()
+    memory.record("A사 암 진단비 보장 범위 알려줘", ANSWER, ["abcd0000#1"])
+    assert memory.resolve_query("그럼 B사는?") == "그럼 B사는? A사 진단비 보장 범위"
+
+
+def test_truncate_tokens():
+    assert truncate_tokens("짧은 글", 10) == "짧은 글"
+    cut = truncate_tokens("가나다라마바사", 4)
+    assert cut == "가나다…" and estimate_tokens(cut) == 4
+    assert truncate_tokens("가나다", 0) == ""
+
+
+def test_shared_modules_do_not_load_streamlit():
+    # 서비스/작업자 모듈은 Streamlit 없이 불러올 수 있어야 함 (estimate_tokens 는 text_normalization)
+    code = ("import sys, conversation_memory, context_cache, hedged_requests, retrieval_service; "
+            "sys.exit('streamlit' in sys.modules)")
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
@@ -0,0 +1,46 @@
+import pytest
+
+from fts_store import FTSStore
+from sparse_retrieval import chunk_spans
+
+# "보험" 뒤에 서로 다른 글자 700개 → "보험"으로 시작하는 trigram 이 700개
+TEXT = "\n".join(f"{chr(0xAC00 + i)}{chr(0xAC00 + i)} 보험{chr(0xAC00 + i)} 약관" for i in range(700))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FTSStore(str(tmp_path / "corpus.db"), chunk_size=200, overlap=0)
+    store.add_document("a" * 64, "약관.txt", TEXT)
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("term", ["보험", "험"])
+def test_short_terms_find_every_chunk(store, term):
+    # trigram 을 전부 펼치는 경로: 검색어 뒤에 글자가 있는 청크는 trigram 이 몇 개든 모두 찾아야 함
+    store.max_expansion = 10000
+    expected = sum(1 for start, end in chunk_spans(TEXT, 200, 0) if term in TEXT[start:end - 1])
+    results = store.rank([term], 10000)
+    assert len(results) == expected
+    assert all(term in chunk for _, _, chunk, _ in results)
+
+
+@pytest.mark.parametrize("term", ["보험", "험"])
+def test_short_terms_past_expansion_limit_scan_the_scope(store, term):
+    # trigram 700개 > max_expansion(512): MATCH 식은 제한되고, 범위 안 청크를 훑어 청크 맨 끝의 검색어까지 찾음
+    match, complete = store._match_expression([term])
+    assert not complete and len(match.split(" OR ")) <= store.max_expansion
+    expected = sum(1 for start, end in chunk_spans(TEXT, 200, 0) if term in TEXT[start:end])
+    results = store.rank([term], 10000)
+    assert len(results) == expected
+    assert all(term in chunk for _, _, chunk, _ in results)
+
+    # 범위가 크면(bm25 경로) 흔한 trigram 만으로 후보를 뽑는 근사
+    store.exact_scope = 0
+    results = store.rank([term], 10)
+    assert len(results) == 10 and all(term in chunk for _, _, chunk, _ in results)
+
+
+def test_span_text_round_trip(store):
+    start, end = chunk_spans(TEXT, 200, 0)[-1]
+    assert store.read_span("a" * 64, start, end) == TEXT[start:end]
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from hedged_requests import HedgePolicy, hedged_generate
+from llm_executor import RequestCancelled
+
+
+class _Feedback:
+    block_reason = None
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, model, first_token, chunks):
+        self.model = model
+        self.first_token = first_token
+        self.chunks = chunks
+        self.prompt_feedback = _Feedback()
+        self.text = "".join(chunks)
+
+    def __iter__(self):
+        time.sleep(self.first_token)
+        for chunk in self.chunks:
+            self.model.sent += 1
+            yield _Chunk(chunk)
+            time.sleep(0.01)
+
+
+class FakeModel:
+    def __init__(self, name, first_token, error=None):
+        self.name = name
+        self.first_token = first_token
+        self.error = error
+        self.calls = 0
+        self.sent = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self, self.first_token, [f"{self.name} 답변 {i} " for i in range(10)])
+
+
+class FakeClients:
+    def __init__(self, *models):
+        self.models = {model.name: model for model in models}
+        self.model_names = list(self.models)
+
+    def model(self, name, generation_config=None):
+        return self.models[name]
+
+
+def make_policy(**kwargs):
+    kwargs.setdefault("default_delay", 0.05)
+    kwargs.setdefault("min_delay", 0.01)
+    kwargs.setdefault("max_rate", 1.0)
+    return HedgePolicy(**kwargs)
+
+
+def test_fast_primary_is_not_hedged():
+    clients = FakeClients(FakeModel("a", 0.0), FakeModel("b", 0.0))
+    policy = make_policy()
+    text, model = hedged_generate(clients, "질문", policy)
+    assert model == "a" and text.startswith("a 답변 0")
+    assert clients.models["b"].calls == 0
+    assert policy.stats()["hedged"] == 0
+
+
+def test_hedge_wins_and_slow_primary_is_cancelled():
+    slow, fast = FakeModel("a", 0.5), FakeModel("b", 0.0)
+    clients = FakeClients(slow, fast)
+    policy = make_policy()
+    text, model = hedged_generate(clients, "질문 " * 100, policy)
+    assert model == "b" and text.startswith("b 답변 0")
+
+    stats = policy.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1 and stats["extra_calls"] == 1
+    assert stats["extra_input_tokens"] > 0
+
+    # 진 쪽은 첫 조각을 받은 뒤 취소를 보고 스트림을 더 받지 않음
+    time.sleep(0.7)
+    assert slow.sent == 1
+    # 취소된 시도는 실패로 기록하지 않음
+    assert policy.healthy("a")
+
+
+def test_hedge_rate_cap_skips_hedging():
+    slow, fast = FakeModel("a", 0.2), FakeModel("b", 0.0)
+    policy = make_policy(max_rate=0.0)
+    _, model = hedged_generate(FakeClients(slow, fast), "질문", policy)
+    assert model == "a" and fast.calls == 0
+    assert policy.stats()["skipped"] == 1
+
+
+def test_failed_primary_falls_back_to_next_model():
+    broken, backup = FakeModel("a", 0.0, error=RuntimeError("할당량 초과")), FakeModel("b", 0.0)
+    policy = make_policy()
+    _, model = hedged_generate(FakeClients(broken, backup), "질문", policy)
+    assert model == "b"
+    with pytest.raises(Exception, match="모든 모델 시도 실패"):
+        hedged_generate(FakeClients(broken), "질문", policy)
+
+
+def test_cancel_event_cancels_every_attempt():
+    slow_a, slow_b = FakeModel("a", 0.3), FakeModel("b", 0.3)
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+    with pytest.raises(RequestCancelled):
+        hedged_generate(FakeClients(slow_a, slow_b), "질문", make_policy(), cancel_event=cancel_event)
+    time.sleep(0.5)
+    assert slow_a.sent <= 1 and slow_b.sent <= 1
@@ -0,0 +1,52 @@
+from hit_windows import SNIPPET_SEPARATOR, extract_snippets, find_offsets, hit_windows, proximity_score, sentence_spans
+
+SENTENCES = [f"{i}번 문장입니다." for i in range(10)]
+TEXT = " ".join(SENTENCES)
+
+
+def sentence_at(i):
+    start = TEXT.index(SENTENCES[i])
+    return start, start + len(SENTENCES[i])
+
+
+def test_proximity_score_counts_distinct_terms_in_window():
+    assert proximity_score({"유방암": [10], "가족력": [50], "위험": [900]}, window=200) == 0.5
+    assert proximity_score({"유방암": [10], "가족력": [50], "위험": [150]}, window=200) == 1.0
+    assert proximity_score({"유방암": [10], "가족력": [500]}, window=200) == 0.0
+    # 검색어가 하나뿐이거나 한 종류만 나오면 0
+    assert proximity_score({"유방암": [10, 20]}) == 0.0
+    assert proximity_score({"유방암": [10, 20], "가족력": []}) == 0.0
+
+
+def test_sentence_spans_split_on_breaks_and_long_lines():
+    text = "첫 문장. 둘째 문장?\n\n셋째 줄\n" + "가" * 900
+    spans = sentence_spans(text, max_chars=400)
+    assert [text[s:e] for s, e in spans[:3]] == ["첫 문장.", "둘째 문장?", "셋째 줄"]
+    assert [e - s for s, e in spans[3:]] == [400, 400, 100]
+    assert sentence_spans("  \n\n ") == []
+
+
+def test_hit_windows_merge_nearby_hits_and_stop_at_document_edges():
+    offsets = [sentence_at(0)[0], sentence_at(2)[0] + 1, sentence_at(9)[0]]
+    windows = hit_windows(TEXT, offsets, padding=1)
+    # 0번(앞에 붙일 문장 없음)과 2번 적중은 0~3번 한 구간, 9번은 8~9번 (뒤에 붙일 문장 없음)
+    assert windows == [(0, sentence_at(3)[1]), (sentence_at(8)[0], len(TEXT))]
+    assert hit_windows(TEXT, [sentence_at(5)[0]], padding=0) == [sentence_at(5)]
+    assert hit_windows(TEXT, []) == []
+
+
+def test_extract_snippets_keep_hit_terms_and_mark_cuts():
+    text = TEXT.replace(SENTENCES[4], "4번 문장에 유방암 가족력이 있습니다.")
+    snippet = extract_snippets(text, ["유방암", "가족력"], padding=1)
+    assert snippet == "… 3번 문장입니다. 4번 문장에 유방암 가족력이 있습니다. 5번 문장입니다. …"
+
+    # 떨어진 적중은 구분자로 나누고, 청크 처음/끝까지 닿은 쪽에는 잘림 표시를 붙이지 않음
+    snippet = extract_snippets(TEXT, ["0번", "9번"], padding=0)
+    assert snippet == SENTENCES[0] + SNIPPET_SEPARATOR + SENTENCES[9]
+
+
+def test_extract_snippets_uses_given_offsets_and_falls_back_to_chunk():
+    offsets = find_offsets(TEXT, ["7번"])
+    assert extract_snippets(TEXT, ["7번"], padding=0, offsets_by_term=offsets) == f"… {SENTENCES[7]} …"
+    # 적중이 없으면(의미 검색으로만 찾은 청크 등) 청크 그대로
+    assert extract_snippets(TEXT, ["악성신생물"]) == TEXT
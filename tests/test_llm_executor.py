@@ -0,0 +1,98 @@
+import threading
+import time
+
+from llm_executor import LLMExecutor
+
+
+def wait_for(executor, request_id, status, timeout=2):
+    """요청이 status 가 될 때까지 기다림 (poll 하지 않고 상태만 봄)"""
+    deadline = time.monotonic() + timeout
+    while executor._requests[request_id].status != status:
+        assert time.monotonic() < deadline, f"{request_id}: {executor._requests[request_id].status} != {status}"
+        time.sleep(0.005)
+
+
+def blocking(started, release):
+    """시작을 알리고 release 나 취소 신호를 기다리는 작업"""
+    def fn(cancel_event):
+        started.set()
+        while not release.is_set() and not cancel_event.is_set():
+            time.sleep(0.005)
+        return "답변"
+    return fn
+
+
+def test_per_session_limit_queues_extra_requests():
+    executor = LLMExecutor(max_workers=4, max_per_session=1)
+    release = threading.Event()
+    first = executor.submit("session-a", blocking(threading.Event(), release), supersede=False)
+    second = executor.submit("session-a", lambda cancel_event: "둘째", supersede=False)
+    other = executor.submit("session-b", lambda cancel_event: "다른 세션")
+
+    wait_for(executor, first, "running")
+    wait_for(executor, other, "done")  # 다른 세션은 한도와 상관없이 실행
+    assert executor._requests[second].status == "queued"
+    release.set()
+    wait_for(executor, second, "done")
+    assert executor.poll(first).result == "답변"
+    assert executor.poll(second).result == "둘째"
+    assert executor._running == {} and executor._slots == set()
+
+
+def test_supersede_cancels_earlier_requests_of_the_session():
+    executor = LLMExecutor(max_workers=4, max_per_session=1)
+    started = threading.Event()
+    first = executor.submit("session-a", blocking(started, threading.Event()))
+    second = executor.submit("session-a", lambda cancel_event: "둘째", supersede=False)  # 한도 때문에 대기
+    assert started.wait(2)
+    third = executor.submit("session-a", lambda cancel_event: "셋째")
+
+    wait_for(executor, third, "done")
+    assert executor.poll(first).status == "cancelled"
+    assert executor.poll(second).status == "cancelled"
+    assert executor.poll(third).result == "셋째"
+    assert executor.stats["superseded"] == 2 and executor.stats["cancelled"] == 2
+
+
+def test_cancel_before_start_never_runs():
+    executor = LLMExecutor(max_workers=4, max_per_session=1)
+    release = threading.Event()
+    first = executor.submit("session-a", blocking(threading.Event(), release), supersede=False)
+    ran = threading.Event()
+    second = executor.submit("session-a", lambda cancel_event: ran.set(), supersede=False)
+
+    assert executor.cancel(second)
+    assert not executor.cancel(second)  # 이미 끝난 요청
+    release.set()
+    wait_for(executor, first, "done")
+    time.sleep(0.05)
+    assert not ran.is_set()
+    assert executor.poll(second).status == "cancelled"
+
+
+def test_cancel_while_running_releases_the_session_slot_at_once():
+    executor = LLMExecutor(max_workers=4, max_per_session=1)
+    started, stuck = threading.Event(), threading.Event()
+
+    def ignores_cancel(cancel_event):
+        # 취소 신호를 늦게 확인하는 작업 (모델 응답을 기다리는 중 등)
+        started.set()
+        stuck.wait(2)
+        return "버려질 답변"
+
+    first = executor.submit("session-a", ignores_cancel, supersede=False)
+    second = executor.submit("session-a", lambda cancel_event: "둘째", supersede=False)
+    assert started.wait(2)
+
+    assert executor.cancel(first)
+    assert executor._requests[first].status == "cancelled"
+    # 첫 작업이 아직 돌고 있어도 대기하던 요청이 바로 실행됨
+    wait_for(executor, second, "done")
+    assert not stuck.is_set()
+
+    stuck.set()
+    executor._pool.shutdown(wait=True)  # 첫 작업이 늦게 돌려준 결과는 버려짐
+    request = executor.poll(first)
+    assert request.status == "cancelled" and request.result is None
+    assert executor.stats["cancelled"] == 1 and executor.stats["done"] == 1
+    assert executor._running == {} and executor._slots == set()
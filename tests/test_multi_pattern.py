@@ -0,0 +1,28 @@
+import pytest
+
+import multi_pattern
+from multi_pattern import expand_synonyms, find_all
+
+TEXT = "암 진단비는 악성신생물 진단 시 지급. 진단비진단비 aaaa 유사암 진단비 " * 5
+PATTERNS = ["진단비", "진단비진단비", "암", "악성신생물", "aa", "없는말"]
+
+
+@pytest.fixture(params=["pyahocorasick", "fallback"])
+def backend(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(multi_pattern, "ahocorasick", None)
+    elif multi_pattern.ahocorasick is None:
+        pytest.skip("pyahocorasick 미설치")
+    return request.param
+
+
+def test_find_all_matches_str_count(backend):
+    positions = find_all(TEXT, PATTERNS + ["", "암"])
+    assert set(positions) == set(PATTERNS)
+    for pattern in PATTERNS:
+        assert len(positions[pattern]) == TEXT.count(pattern)
+        assert all(TEXT.startswith(pattern, start) for start in positions[pattern])
+
+
+def test_expand_synonyms():
+    assert expand_synonyms(["진단금과", "암"]) == ["진단비", "진단자금", "진단급여금", "악성신생물", "악성종양"]
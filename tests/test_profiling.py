@@ -0,0 +1,47 @@
+import tracemalloc
+
+import pytest
+
+from profiling import profile_request
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    yield
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_writes_profile_and_stops_own_tracing(tmp_path):
+    sink = []
+    with profile_request("질문", "암 진단비", sink=sink, directory=str(tmp_path)) as report:
+        data = [bytes(1000) for _ in range(100)]
+    assert sink == [report] and report.note is None
+    assert report.path.endswith(".prof") and report.alloc_path.endswith(".alloc.txt")
+    assert report.peak_kb >= 100
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_overlapping_requests_keep_tracing_and_peak(tmp_path):
+    with profile_request("질문", "첫 요청", directory=str(tmp_path)) as first:
+        big = bytes(2_000_000)
+        del big
+        with profile_request("질문", "둘째 요청", directory=str(tmp_path)) as second:
+            pass
+        # 둘째 요청이 끝나도 첫 요청의 추적과 최대값은 그대로
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert first.peak_kb >= 1900
+    assert first.note is None
+    assert "겹쳐" in second.note
+
+
+def test_host_tracing_is_left_running(tmp_path):
+    tracemalloc.start()
+    with profile_request("업로드", "약관.pdf", directory=str(tmp_path)) as report:
+        pass
+    assert tracemalloc.is_tracing()
+    assert "겹쳐" in report.note
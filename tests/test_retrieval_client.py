@@ -0,0 +1,73 @@
+import socket
+import threading
+
+import pytest
+
+from retrieval_client import DocumentsMissing, RetrievalClient, RetrievalUnavailable
+from retrieval_service import RetrievalService, make_server
+
+TEXT = "유방암 가족력이 있으면 정기 검진을 권합니다. 두통이 오래가면 진료를 받으세요. " * 20
+
+
+@pytest.fixture
+def server():
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def restart(server):
+    """서비스 재시작 흉내 (적재한 문서와 코퍼스가 모두 없어짐)"""
+    server.RequestHandlerClass.service = RetrievalService()
+
+
+def test_search_restores_documents_after_restart(server):
+    client = RetrievalClient(f"http://127.0.0.1:{server.server_port}", timeout=10)
+    data = TEXT.encode("utf-8")
+    key = client.ingest("건강.txt", data, "txt")["key"]
+    restored = []
+
+    def restore(keys):
+        restored.extend(keys)
+        client.ingest("건강.txt", data, "txt")
+
+    corpus = client.open_corpus([key], chunk_size=200, overlap=0, restore=restore)
+    assert corpus.search(["유방암"], 3)
+
+    restart(server)
+    results = corpus.search(["유방암"], 3)
+    assert restored == [key]
+    assert results and "유방암" in results[0][1]
+
+
+def test_missing_documents_without_restore(server):
+    client = RetrievalClient(f"http://127.0.0.1:{server.server_port}", timeout=10)
+    key = client.ingest("건강.txt", TEXT.encode("utf-8"), "txt")["key"]
+    restart(server)
+    with pytest.raises(DocumentsMissing) as error:
+        client.open_corpus([key], chunk_size=200, overlap=0)
+    assert error.value.keys == [key]
+
+
+def test_connection_errors_become_unavailable():
+    # 응답 헤더만 보내고 본문 중간에 연결을 끊는 서버
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def respond():
+        connection, _ = listener.accept()
+        connection.recv(65536)
+        connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 100\r\n\r\n{")
+        connection.close()
+
+    threading.Thread(target=respond, daemon=True).start()
+    client = RetrievalClient(f"http://127.0.0.1:{listener.getsockname()[1]}", timeout=5)
+    with pytest.raises(RetrievalUnavailable):
+        client.health()
+    listener.close()
+
+    with pytest.raises(RetrievalUnavailable):
+        client.health()  # 서비스가 내려가 있음
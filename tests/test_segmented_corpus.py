@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+import segmented_corpus
+from dense_retrieval import EmbeddingStore, HashingEmbedder
+from segmented_corpus import SegmentedCorpus
+
+DOCS = {
+    "a" * 64: ("A사.txt", "A사 암 진단비 3000만원. 유사암 진단비 300만원. " * 10),
+    "b" * 64: ("B사.txt", "B사 뇌졸중 진단비 1000만원. 수술비 100만원. " * 10),
+    "c" * 64: ("C사.txt", "C사 입원비 일당 5만원. 암 수술비 200만원. " * 10),
+}
+
+
+def make_corpus(**kwargs):
+    kwargs.setdefault("background", False)
+    return SegmentedCorpus(chunk_size=100, overlap=20, **kwargs)
+
+
+def test_tombstone_hides_document_until_compaction():
+    corpus = make_corpus(max_dead_ratio=1.0)
+    corpus.sync([(key, name, text) for key, (name, text) in DOCS.items()])
+    before = {span_id for _, _, span_id in corpus.search(["암"], 50)}
+
+    corpus.remove_document("a" * 64)
+    assert corpus.stats()["tombstoned_chunks"] > 0
+    assert all(name != "A사.txt" for name, _, _ in corpus.search(["암"], 50))
+
+    corpus.compact()
+    stats = corpus.stats()
+    assert stats["segments"] == 1 and stats["tombstoned_chunks"] == 0
+    after = {span_id for _, _, span_id in corpus.search(["암"], 50)}
+    # 압축 후에도 남은 문서의 구간 ID 는 그대로
+    assert after == {span_id for span_id in before if not span_id.startswith("a" * 8)}
+
+
+def test_readd_before_compaction_clears_tombstone():
+    corpus = make_corpus(max_dead_ratio=1.0)
+    key, (name, text) = next(iter(DOCS.items()))
+    corpus.add_document(key, name, text)
+    corpus.remove_document(key)
+    assert corpus.add_document(key, name, text)
+    assert corpus.document_keys() == [key]
+    assert corpus.stats()["segments"] == 1
+
+
+def test_compaction_keeps_and_fills_dense_vectors(tmp_path):
+    corpus = make_corpus(max_segments=8)
+    (key_a, (name_a, text_a)), (key_b, (name_b, text_b)) = list(DOCS.items())[:2]
+    corpus.add_document(key_a, name_a, text_a)
+    # 임베딩을 켜고 나서 추가된 세그먼트만 임베딩이 있는 상태
+    corpus.embedder, corpus.store = HashingEmbedder(), EmbeddingStore(str(tmp_path))
+    corpus.add_document(key_b, name_b, text_b)
+
+    corpus.compact()
+    segments, _ = corpus._snapshot()
+    assert len(segments) == 1 and segments[0].codes is not None
+    assert len(segments[0].codes) == len(segments[0])
+    assert {name for name, _, _ in corpus.hybrid_search(["암"], "암 진단비", 50)} == {name_a, name_b}
+
+
+def test_enable_dense_during_compaction_does_not_duplicate_documents(tmp_path, monkeypatch):
+    corpus = make_corpus(max_segments=8)
+    documents = list(DOCS.items())[:2]
+    for key, (name, text) in documents:
+        corpus.add_document(key, name, text)
+    original = segmented_corpus.Segment.merge
+    calls = []
+
+    def merge_with_enable_dense(segments, dropped_keys):
+        # 백그라운드 압축이 합치는 중에 다른 스레드가 임베딩을 켠 상황
+        if not calls:
+            corpus.enable_dense(HashingEmbedder(), EmbeddingStore(str(tmp_path)))
+        calls.append(len(segments))
+        return original(segments, dropped_keys)
+
+    monkeypatch.setattr(segmented_corpus.Segment, "merge", merge_with_enable_dense)
+    corpus.compact()
+
+    assert corpus.document_keys() == [key for key, _ in documents]
+    assert len(calls) == 2
+    spans = [span_id for _, _, span_id in corpus.search(["진단비"], 50)]
+    assert len(spans) == len(set(spans))
+    segments, _ = corpus._snapshot()
+    assert len(segments) == 1 and segments[0].codes is not None
+
+
+def test_concurrent_adds_of_the_same_file_index_once(monkeypatch):
+    original = segmented_corpus.Segment.from_document
+
+    def slow_from_document(*args, **kwargs):
+        time.sleep(0.05)  # 중복 확인과 추가 사이에 다른 스레드가 끼어들 시간
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(segmented_corpus.Segment, "from_document", slow_from_document)
+    corpus = make_corpus()
+    key, (name, text) = next(iter(DOCS.items()))
+    start = threading.Barrier(8)
+    added = []
+
+    def add():
+        start.wait()
+        added.append(corpus.add_document(key, name, text))
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert added.count(True) == 1
+    assert corpus.stats()["segments"] == 1
+    assert corpus.document_keys() == [key]
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_sync_adds_and_removes(dedup):
+    corpus = make_corpus(dedup=dedup)
+    documents = [(key, name, text) for key, (name, text) in DOCS.items()]
+    assert corpus.sync(documents) == ([key for key, _, _ in documents], [])
+    assert corpus.sync(documents[1:]) == ([], ["a" * 64])
+    assert corpus.document_keys() == [key for key, _, _ in documents[1:]]
@@ -0,0 +1,44 @@
+from sharded_index import ShardedIndex, TermBloomFilter
+from sparse_retrieval import split_into_chunks
+
+VOLUMES = [
+    ("권1", "두통이 심하면 진통제를 먹는다. " * 30),
+    ("권2", "암 진단을 받으면 치료 계획을 세운다. " * 30),
+]
+
+
+def test_bloom_has_no_false_negatives_for_short_terms():
+    bloom = TermBloomFilter.from_text("위암 수술")
+    for term in ("암", "위", "위암", "암 수술", "수술"):
+        assert bloom.might_contain(term)
+
+
+def test_one_character_term_is_routed_to_the_volume_that_has_it():
+    index = ShardedIndex(VOLUMES, chunk_size=60)  # 권1(540자) 끝이 청크 경계
+    assert index.route(["암", "두통"]) == [(0, ["두통"]), (1, ["암"])]
+    ranked = index.rank(["암"], 10)
+    assert ranked
+    assert all(shard == 1 and "암" in index.chunk(shard, row) for _, shard, row, _ in ranked)
+
+
+def test_rank_matches_substring_lookup():
+    index = ShardedIndex(VOLUMES, chunk_size=100)
+    for term in ("암", "두통", "진통제"):
+        expected = {
+            (number, row)
+            for number, shard in enumerate(index.shards)
+            for row, chunk in enumerate(shard.index.chunks) if term in chunk
+        }
+        found = {(shard, row) for _, shard, row, _ in index.rank([term], len(index))}
+        assert found == expected
+
+
+def test_chunks_match_the_merged_index_across_volume_boundaries():
+    volumes = [("권1", "가" * 250), ("권2", "나" * 30), ("권3", "다" * 140)]
+    index = ShardedIndex(volumes, chunk_size=100)
+    merged = split_into_chunks("".join(text for _, text in volumes), 100, skip_blank=False)
+    assert [chunk for shard in index.shards for chunk in shard.index.chunks] == merged
+    # 권 경계에 걸친 청크는 끝나는 권으로 (권2 는 청크 없이 권3 첫 청크에 들어감)
+    assert [len(shard) for shard in index.shards] == [2, 0, 3]
+    assert index.route(["가나", "나다"]) == [(2, ["가나", "나다"])]
+    assert [(shard, row) for _, shard, row, _ in index.rank(["가나", "나다"], 10)] == [(2, 0)]
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from sparse_retrieval import ChunkTermIndex, chunk_spans, split_into_chunks, top_k_indices
+
+WORDS = ["암", "진단비", "유사암", "수술비", "입원비", "특약", "갱신형", "보험금", "면책", "Cancer", "약관"]
+
+
+def make_text(seed, length=20000):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length // 3))
+
+
+def legacy_smart(chunks, query, k):
+    """기존 app.py get_smart_context 루프"""
+    keywords = [word.lower() for word in query.split() if len(word) > 1]
+    scored = []
+    for chunk in chunks:
+        lowered = chunk.lower()
+        score = 0
+        for keyword in keywords:
+            score += lowered.count(keyword) * (1 + len(keyword) / 10)
+        if score > 0:
+            scored.append((score, chunk))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [chunk for _, chunk in scored[:k]]
+
+
+def legacy_relevant(chunks, query, k):
+    """기존 홈 닥터 get_relevant_content 루프"""
+    scored = []
+    for chunk in chunks:
+        score = sum(1 for word in query.split() if word in chunk)
+        if score > 0:
+            scored.append((score, chunk))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [chunk for _, chunk in scored[:k]]
+
+
+QUERIES = ["암 진단비 비교", "유사암 수술비 특약", "cancer 약관 면책 면책", "갱신형", "없는말"]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_frequency_ranking_matches_legacy_loop(seed):
+    chunks = split_into_chunks(make_text(seed), 250, 50)
+    index = ChunkTermIndex(chunks, lowercase=True)
+    for query in QUERIES:
+        keywords = [word.lower() for word in query.split() if len(word) > 1]
+        assert index.search(keywords, 15, legacy_float=True) == legacy_smart(chunks, query, 15)
+        # 정수 가중치 경로는 점수 집합이 같음 (동점 순서만 다를 수 있음)
+        top, scores = index.rank(keywords, 15)
+        expected = sorted((round(sum(c.lower().count(w) * (1 + len(w) / 10) for w in keywords), 6)
+                           for c in chunks), reverse=True)[:len(top)]
+        assert np.allclose(scores, expected)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_presence_ranking_matches_legacy_loop(seed):
+    chunks = split_into_chunks(make_text(seed), 100, skip_blank=False)
+    index = ChunkTermIndex(chunks, lowercase=False)
+    for query in QUERIES:
+        assert index.search(query.split(), 10, weighting="presence") == legacy_relevant(chunks, query, 10)
+
+
+def test_batch_equals_single_queries():
+    index = ChunkTermIndex(split_into_chunks(make_text(3), 250, 50))
+    keyword_lists = [query.lower().split() for query in QUERIES]
+    batch = index.rank_batch(keyword_lists, 10)
+    for keywords, (top, scores) in zip(keyword_lists, batch):
+        single_top, single_scores = index.rank(keywords, 10)
+        assert top.tolist() == single_top.tolist() and np.allclose(scores, single_scores)
+
+
+def test_top_k_keeps_earlier_rows_on_ties():
+    rows = np.arange(6)
+    values = np.array([1.0, 3.0, 3.0, 0.0, 3.0, 2.0])
+    assert top_k_indices(rows, values, 2).tolist() == [1, 2]
+    assert top_k_indices(rows, values, 10).tolist() == [1, 2, 4, 5, 0]
+
+
+def test_chunk_spans_match_chunks():
+    text = make_text(4, 3000)
+    assert [text[s:e] for s, e in chunk_spans(text, 250, 50)] == split_into_chunks(text, 250, 50)
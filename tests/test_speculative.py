@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from speculative import SpeculationSkipped, SpeculativePrecomputer, TokenBucket
+
+
+def make_precomputer(**kwargs):
+    limiter = TokenBucket(60, capacity=10)
+    kwargs.setdefault("reserve_ratio", 0.0)
+    kwargs.setdefault("idle_wait", 0.01)
+    return limiter, SpeculativePrecomputer(limiter, **kwargs)
+
+
+def lookup_before_run(precomputer, question, compute_fn):
+    """앞 작업이 끝나기 전에 예약하고 Future 를 받아 둠 (결과가 정리되기 전에)"""
+    release = threading.Event()
+    precomputer.schedule("sig", ["앞 작업"], lambda _: release.wait(2))
+    precomputer.schedule("sig", [question], compute_fn)
+    future = precomputer.lookup("sig", question)
+    release.set()
+    return future
+
+
+def test_precomputed_result_is_shared():
+    limiter, precomputer = make_precomputer()
+    precomputer.schedule("sig", ["유방암 가족력이 있으면?"], lambda question: f"답변: {question}")
+    future = precomputer.lookup("sig", "유방암 가족력이 있으면")
+    assert future.result(timeout=2) == "답변: 유방암 가족력이 있으면?"
+    assert precomputer.stats["computed"] == 1 and precomputer.stats["hits"] == 1
+
+
+def test_cancel_while_waiting_keeps_worker_alive_and_spends_nothing():
+    limiter, precomputer = make_precomputer()
+    with precomputer.foreground():
+        precomputer.schedule("sig", ["질문 1"], lambda question: question)
+        time.sleep(0.05)
+        assert precomputer.lookup("sig", "질문 1").cancel()
+    time.sleep(0.05)
+
+    # 취소된 작업은 토큰/예산을 쓰지 않고, 작업자는 다음 예약을 계속 처리
+    assert limiter.tokens == pytest.approx(limiter.capacity)
+    assert len(precomputer._spent) == 0
+    precomputer.schedule("sig", ["질문 2"], lambda question: question)
+    assert precomputer.lookup("sig", "질문 2").result(timeout=2) == "질문 2"
+    assert precomputer._worker.is_alive()
+    assert precomputer.stats["skipped"] == 0
+
+
+def test_skipped_when_budget_is_spent():
+    limiter, precomputer = make_precomputer(max_per_hour=1)
+    future = lookup_before_run(precomputer, "질문", lambda question: question)
+    with pytest.raises(SpeculationSkipped):
+        future.result(timeout=2)
+    assert precomputer.stats["skipped"] == 1
+    assert precomputer.lookup("sig", "질문") is None
+
+
+def test_compute_failure_is_reported_and_forgotten():
+    limiter, precomputer = make_precomputer()
+
+    def broken(question):
+        raise RuntimeError("검색 실패")
+
+    future = lookup_before_run(precomputer, "질문", broken)
+    with pytest.raises(RuntimeError):
+        future.result(timeout=2)
+    assert precomputer.stats["failed"] == 1
+    assert precomputer.lookup("sig", "질문") is None
@@ -0,0 +1,205 @@
+"""
+추출 텍스트 정리 (추출 → 정리 → 색인)
+- 페이지마다 반복되는 머리말/꼬리말을 페이지 간 등장 빈도로 찾아 제거
+- 쪽 번호 줄 제거
+- 줄 끝에서 강제로 끊긴 문장(한글 줄바꿈)을 다시 이어 붙임
+- 연속 공백/빈 줄 정리
+- 정리된 텍스트의 위치 → 원래 페이지/페이지 내 위치 매핑 유지 (줄 단위 정밀도)
+- 대략적인 토큰 수 추정 (estimate_tokens, 앱/서비스 공용)
+"""
+import math
+import re
+from bisect import bisect_right
+from collections import Counter
+
+# 머리말/꼬리말을 찾는 페이지 위/아래 줄 수
+HEADER_ZONE = 3
+
+PAGE_NUMBER_RE = re.compile(
+    r"^[\s\-–—\[\]()<>|·.]*(?:page\s*)?\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?[\s\-–—\[\]()<>|·.]*(?:쪽|페이지)?$",
+    re.IGNORECASE,
+)
+
+# 새 문단/항목 시작 (앞 줄과 잇지 않음)
+STRUCTURE_RE = re.compile(
+    r"^(?:제\s*\d+\s*[조항관장절]|[①-⑳]|\(?\d{1,2}[.)]\s|[가-하][.)]\s|[-•·※■□○◦▶▷◆◇*「『<〈\[])"
+)
+
+SENTENCE_END = (".", "?", "!", ":", ";", "。")
+
+
+def estimate_tokens(text):
+    """
+    대략적인 토큰 수 추정 (한글은 글자당 약 1토큰, 그 외는 4자당 1토큰)
+    - 컨텍스트 캐시/대화 메모리/헤지 비용/검색 서비스가 모두 이 함수를 사용 (Streamlit 없이 불러올 수 있게 여기 둠)
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def _boilerplate_key(line):
+    """숫자만 다른 줄(쪽 번호가 들어간 머리말 등)은 같은 줄로 봄"""
+    return re.sub(r"\d+", "#", " ".join(line.split()))
+
+
+def _is_hangul(ch):
+    return "가" <= ch <= "힣"
+
+
+def _core(token):
+    return token.strip(".,?!:;\"'()[]<>“”‘’「」『』")
+
+
+class NormalizedDocument:
+    """
+    정리된 문서
+    - text: 정리된 텍스트
+    - anchors: (정리된 텍스트 위치, 페이지 번호(0부터), 원래 페이지 내 위치) 목록, 줄마다 하나
+    - stats: 원래/정리 후 글자 수, 제거한 머리말·꼬리말/쪽 번호 줄 수, 이어 붙인 줄 수
+    """
+
+    def __init__(self, text, anchors, page_count, stats):
+        self.text = text
+        self.anchors = anchors
+        self.page_count = page_count
+        self.stats = stats
+        self._starts = [anchor[0] for anchor in anchors]
+
+    def locate(self, offset):
+        """정리된 텍스트 위치 → (페이지 번호(1부터), 원래 페이지 내 대략적 위치)"""
+        if not self.anchors:
+            return None
+        idx = max(bisect_right(self._starts, offset) - 1, 0)
+        start, page, original = self.anchors[idx]
+        return page + 1, original + max(offset - start, 0)
+
+    def page_of(self, offset):
+        """정리된 텍스트 위치가 속한 페이지 번호 (1부터)"""
+        located = self.locate(offset)
+        return located[0] if located else None
+
+    def page_range(self, start, end):
+        """정리된 텍스트 구간이 걸친 페이지 범위 (첫 페이지, 끝 페이지)"""
+        first = self.page_of(start)
+        last = self.page_of(max(start, end - 1))
+        return first, last
+
+    def page_spans(self):
+        """페이지별 정리된 텍스트 구간 [(페이지 번호(1부터), 시작, 끝)] (내용이 남은 페이지만)"""
+        spans = []
+        for offset, page, _ in self.anchors:
+            if spans and spans[-1][0] == page + 1:
+                continue
+            if spans:
+                spans[-1] = (spans[-1][0], spans[-1][1], offset)
+            spans.append((page + 1, offset, len(self.text)))
+        return spans
+
+
+def _split_lines(page):
+    """(페이지 내 위치, 줄) 목록"""
+    lines = []
+    pos = 0
+    for line in page.split("\n"):
+        lines.append((pos, line))
+        pos += len(line) + 1
+    return lines
+
+
+def detect_boilerplate(page_lines, min_repeat_ratio=0.4, min_repeat_pages=3):
+    """페이지 위/아래 영역에 반복해서 나오는 줄 (정규화 키 집합)"""
+    if len(page_lines) < min_repeat_pages:
+        return set()
+    counts = Counter()
+    for lines in page_lines:
+        filled = [line for _, line in lines if line.strip()]
+        zone = filled[:HEADER_ZONE] + filled[-HEADER_ZONE:]
+        counts.update({_boilerplate_key(line) for line in zone})
+    threshold = max(min_repeat_pages, math.ceil(min_repeat_ratio * len(page_lines)))
+    return {key for key, count in counts.items() if count >= threshold and key}
+
+
+def normalize_pages(pages, min_repeat_ratio=0.4, min_repeat_pages=3, join_wraps=True):
+    """
+    페이지별 텍스트 → NormalizedDocument
+    - min_repeat_ratio: 전체 페이지 중 이 비율 이상에서 위/아래에 반복되면 머리말/꼬리말
+    - join_wraps: 줄바꿈으로 끊긴 문장을 이어 붙임
+    """
+    page_lines = [_split_lines(page or "") for page in pages]
+    boilerplate = detect_boilerplate(page_lines, min_repeat_ratio, min_repeat_pages)
+
+    # 1. 머리말/꼬리말/쪽 번호 제거 + 줄 안의 공백 정리
+    kept = []  # (페이지, 원래 위치, 정리된 줄)
+    removed_boilerplate = removed_page_numbers = 0
+    for page_no, lines in enumerate(page_lines):
+        filled = [i for i, (_, line) in enumerate(lines) if line.strip()]
+        zone = set(filled[:HEADER_ZONE] + filled[-HEADER_ZONE:])
+        for i in filled:
+            pos, line = lines[i]
+            if i in zone:
+                if _boilerplate_key(line) in boilerplate:
+                    removed_boilerplate += 1
+                    continue
+                if PAGE_NUMBER_RE.match(line.strip()):
+                    removed_page_numbers += 1
+                    continue
+            kept.append((page_no, pos + len(line) - len(line.lstrip()), " ".join(line.split())))
+
+    # 2. 줄바꿈 복원 기준: 본문 줄의 보통 길이, 줄 안에서 쓰인 어절
+    lengths = sorted(len(line) for _, _, line in kept)
+    full_width = lengths[len(lengths) // 2] * 0.6 if lengths else 0
+    vocabulary = Counter()
+    for _, _, line in kept:
+        vocabulary.update(_core(token) for token in line.split()[1:-1])
+
+    # 3. 줄 이어 붙이기
+    parts = []
+    anchors = []
+    offset = 0
+    joined = 0
+    for idx, (page_no, pos, line) in enumerate(kept):
+        if idx:
+            prev = kept[idx - 1][2]
+            if join_wraps and len(prev) >= full_width and not prev.endswith(SENTENCE_END) \
+                    and not STRUCTURE_RE.match(line):
+                separator = " "
+                if _is_hangul(prev[-1]) and _is_hangul(line[0]):
+                    # 한글은 어절 중간에서도 줄이 끊기므로 기본은 붙여 씀
+                    # (부분 문자열 검색이 깨지지 않음). 다음 줄 첫 어절이 본문에서
+                    # 단독 어절로 자주 쓰이고 붙인 형태는 없을 때만 띄어 씀
+                    tail = _core(prev.split()[-1])
+                    head = _core(line.split()[0])
+                    if not (len(head) >= 2 and vocabulary[head] >= 2 and not vocabulary[tail + head]):
+                        separator = ""
+                elif prev.endswith("-") and prev[-2:-1].isalpha() and line[0].isalpha():
+                    prev_part = parts.pop()
+                    parts.append(prev_part[:-1])
+                    offset -= 1
+                    separator = ""
+                joined += 1
+            else:
+                separator = "\n"
+            parts.append(separator)
+            offset += len(separator)
+        anchors.append((offset, page_no, pos))
+        parts.append(line)
+        offset += len(line)
+
+    text = "".join(parts) + ("\n" if parts else "")
+    original_chars = sum(len(page or "") for page in pages)
+    stats = {
+        "original_chars": original_chars,
+        "normalized_chars": len(text),
+        "boilerplate_lines": removed_boilerplate,
+        "page_number_lines": removed_page_numbers,
+        "joined_lines": joined,
+        "boilerplate_patterns": sorted(boilerplate),
+    }
+    return NormalizedDocument(text, anchors, len(pages), stats)
+
+
+def normalize_text(text):
+    """페이지 구분이 없는 텍스트(TXT 등) 정리 (한 페이지로 취급, 반복 머리말 검출 없음)"""
+    return normalize_pages([text])
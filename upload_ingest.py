@@ -0,0 +1,124 @@
+"""
+업로드 파일 한 번 읽기 처리
+- 파일마다 내용을 한 번만 훑으면서 SHA-256(문서 키)을 계산
+- Streamlit 업로드(BytesIO)는 getvalue() 가 업로드 버퍼와 같은 bytes 객체를 돌려주므로
+  (CPython, 수정되지 않은 BytesIO) 그대로 추출기에 넘김. getbuffer() 는 쓰지 않음
+  (쓰기 가능한 뷰를 만들려고 버퍼 전체를 복사함)
+- 스트림(HTTP 본문, 디스크 파일)은 블록 단위로 읽어 SPOOL_THRESHOLD 까지는 메모리,
+  넘으면 임시 파일로 내려 쓰고 추출기에는 파일 경로를 넘김
+- 크기는 업로드 정보(size)나 읽은 길이로 (크기를 알려고 내용을 복사하지 않음)
+"""
+import codecs
+import hashlib
+import io
+import os
+import tempfile
+
+# 이보다 큰 스트림은 임시 파일로 내려 씀
+SPOOL_THRESHOLD = int(os.environ.get("NOTEBOOK_AI_SPOOL_MB", "32")) * 1024 * 1024
+
+# 스트림을 읽는 블록 크기
+READ_BLOCK = 1024 * 1024
+
+
+class UploadSource:
+    """
+    한 번 읽은 업로드 파일
+    - data(bytes) 또는 path(임시/원본 파일 경로) 중 하나를 가짐
+    - source: extract_pages 에 그대로 넘기는 값 (bytes 또는 경로)
+    - 임시 파일은 close() (또는 with 블록 종료) 때 삭제
+    """
+
+    def __init__(self, name, size, key, data=None, path=None, temporary=False):
+        self.name = name
+        self.size = size
+        self.key = key
+        self.data = data
+        self.path = path
+        self.temporary = temporary
+
+    @property
+    def is_pdf(self):
+        return self.name.lower().endswith(".pdf")
+
+    @property
+    def source(self):
+        return self.data if self.data is not None else self.path
+
+    def open(self):
+        """내용을 읽는 바이너리 파일 객체 (HTTP 업로드 본문 등, 복사 없음)"""
+        return io.BytesIO(self.data) if self.data is not None else open(self.path, "rb")
+
+    def text(self, encoding="utf-8"):
+        """텍스트 파일 내용 (디코딩 결과 문자열 하나만 만듦)"""
+        if self.data is not None:
+            return codecs.decode(self.data, encoding)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parts = []
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                parts.append(decoder.decode(block))
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+
+    def close(self):
+        if self.temporary and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def from_uploaded_file(uploaded_file):
+    """Streamlit UploadedFile → UploadSource (업로드 버퍼를 복사하지 않음)"""
+    data = uploaded_file.getvalue()
+    return UploadSource(uploaded_file.name, getattr(uploaded_file, "size", len(data)),
+                        hashlib.sha256(data).hexdigest(), data=data)
+
+
+def from_stream(name, stream, length=None, threshold=SPOOL_THRESHOLD, spool_dir=None):
+    """
+    스트림을 한 번 읽어 UploadSource 로 (읽으면서 해시 계산)
+    - length: 읽을 바이트 수 (HTTP Content-Length), 없으면 끝까지
+    - threshold 를 넘으면 임시 파일로 내려 쓰고 path 로 넘김
+    """
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    spool = None
+    size = 0
+    try:
+        while length is None or size < length:
+            block = stream.read(READ_BLOCK if length is None else min(READ_BLOCK, length - size))
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+            if spool is None and size > threshold:
+                spool = tempfile.NamedTemporaryFile(prefix="upload-", suffix=os.path.splitext(name)[1],
+                                                    dir=spool_dir, delete=False)
+                spool.write(buffer.getbuffer())
+                buffer = None
+            (spool or buffer).write(block)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+        raise
+    if spool is not None:
+        spool.close()
+        return UploadSource(name, size, digest.hexdigest(), path=spool.name, temporary=True)
+    # 쓰기로 만든 BytesIO 의 getvalue() 는 내부 버퍼를 그대로 돌려줌 (복사 없음)
+    return UploadSource(name, size, digest.hexdigest(), data=buffer.getvalue())
+
+
+def from_path(path, name=None):
+    """디스크 파일 → UploadSource (블록 단위로 해시만 계산, 내용은 메모리에 올리지 않음)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            digest.update(block)
+    return UploadSource(name or os.path.basename(path), os.path.getsize(path), digest.hexdigest(), path=path)